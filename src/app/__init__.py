@@ -1,3 +1,7 @@
 """
 Módulo __init_.py para a pasta app se tornar um pacote Python
-"""
\ No newline at end of file
+"""
+import time
+
+# Início do import do pacote: o /health/ready mede a inicialização do worker a partir daqui
+IMPORT_STARTED = time.perf_counter()
@@ -0,0 +1,313 @@
+"""
+Controle de admissão: limita o que entra antes de chegar ao pool de conexões.
+
+Sem limite, num pico as requisições se acumulam esperando uma conexão do pool
+(até DB_POOL_TIMEOUT) e a latência sobe para todo mundo. Com ADMISSION_ENABLED=true
+um middleware ASGI decide na entrada de cada requisição:
+
+- limite de concorrência global (ADMISSION_MAX_CONCURRENCY, padrão: o tamanho do
+  pool + overflow) e por rota (ADMISSION_ROUTE_CONCURRENCY, com limites menores para
+  as rotas que seguram uma conexão por muito tempo: /stream, /export e /bulk).
+  Quem passa do limite espera na fila da rota por até ADMISSION_MAX_WAIT_MS; se a
+  espera passar disso (ou a fila já tiver ADMISSION_MAX_QUEUE requisições) a resposta
+  é 503 com Retry-After, na hora, em vez de uma resposta lenta ou um timeout do pool;
+- token bucket por usuário nas escritas (POST/PATCH/PUT/DELETE): ADMISSION_USER_RATE
+  requisições por segundo, com rajadas de até ADMISSION_USER_BURST. O usuário é o
+  {user_id} da rota (ou o IP do cliente nas rotas sem usuário). Sem token: 429 com
+  Retry-After.
+
+Os limites, a ocupação e as recusas aparecem no /metrics (admission_*) e em
+GET /api/admission/stats.
+"""
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional, Tuple
+import asyncio
+import math
+import os
+import time
+
+from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
+from starlette.routing import Match
+
+from . import metrics
+from .database import DB_MAX_OVERFLOW, DB_POOL_SIZE
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "false").lower() in ("1", "true", "yes")
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", str(DB_POOL_SIZE + DB_MAX_OVERFLOW)))
+ADMISSION_ROUTE_CONCURRENCY = int(os.getenv("ADMISSION_ROUTE_CONCURRENCY", str(ADMISSION_MAX_CONCURRENCY)))
+ADMISSION_MAX_WAIT_MS = float(os.getenv("ADMISSION_MAX_WAIT_MS", "100"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "100"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1")) # Segundos (503)
+ADMISSION_USER_RATE = float(os.getenv("ADMISSION_USER_RATE", "20")) # Escritas por segundo por usuário (0 desliga)
+ADMISSION_USER_BURST = float(os.getenv("ADMISSION_USER_BURST", "40"))
+ADMISSION_MAX_BUCKETS = int(os.getenv("ADMISSION_MAX_BUCKETS", "10000")) # Usuários guardados (os menos recentes saem)
+
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+# Rotas que seguram uma conexão por muito tempo começam com limites menores
+DEFAULT_ROUTE_LIMITS = {
+    "GET /api/users/{user_id}/transactions/stream": 2,
+    "GET /api/users/{user_id}/transactions/export": 2,
+    "GET /api/transactions/export": 1,
+    "POST /api/users/{user_id}/transactions/bulk": 2,
+}
+
+# Rotas sem limite de concorrência: a conexão fica aberta por horas, mas só usa o banco
+# em leituras curtas (o feed de mudanças abre uma sessão por leitura)
+UNLIMITED_ROUTES = {
+    "GET /api/users/{user_id}/transactions/events",
+}
+
+
+# Lê ADMISSION_ROUTE_LIMITS: "GET /api/transactions/export=2,POST /api/users/=10"
+def parse_route_limits(value: str) -> Dict[str, int]:
+    limits = {}
+    for item in value.split(","):
+        if item.strip():
+            route, limit = item.rsplit("=", 1)
+            limits[" ".join(route.split())] = int(limit)
+    return limits
+
+ROUTE_LIMITS = {**DEFAULT_ROUTE_LIMITS, **parse_route_limits(os.getenv("ADMISSION_ROUTE_LIMITS", ""))}
+
+WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+REJECTED = metrics.Counter("admission_rejected_total", "Requests rejected by admission control", ("route", "reason"))
+QUEUE_WAIT = metrics.Histogram("admission_queue_wait_seconds", "Time admitted requests waited for a concurrency slot", ("route",), WAIT_BUCKETS)
+
+
+class ConcurrencyLimit:
+    """Limite de requisições simultâneas com fila de espera (usado só no event loop)."""
+
+    def __init__(self, limit: int, max_queue: int = ADMISSION_MAX_QUEUE):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    # Devolve "ok", "queue_full" (fila cheia, nem espera) ou "timeout" (esperou 'timeout' segundos)
+    async def acquire(self, timeout: float) -> str:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return "ok"
+        if len(self._waiters) >= self.max_queue:
+            return "queue_full"
+        if timeout <= 0:
+            return "timeout"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            return "timeout"
+        except asyncio.CancelledError: # O cliente desistiu
+            self._discard(waiter)
+            raise
+        #? O release passou a vaga direto para este waiter ('active' não mudou)
+        return "ok"
+
+    #* Com fila, a vaga passa direto para o primeiro da fila (FIFO): quem chega depois não a pega
+    #* antes dele, e os pedidos mais antigos não ficam sem vez
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    # Tira da fila quem desistiu. Se ele recebeu a vaga ao mesmo tempo em que desistiu, passa a vaga adiante
+    def _discard(self, waiter: asyncio.Future):
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+        elif waiter.done() and not waiter.cancelled():
+            self.release()
+
+
+@dataclass
+class TokenBucket:
+    tokens: float
+    updated: float = field(default_factory=time.monotonic)
+
+
+class UserRateLimiter:
+    """Token bucket por usuário (usado só no event loop). Guarda no máximo 'max_buckets' usuários."""
+
+    def __init__(self, rate: float = ADMISSION_USER_RATE, burst: float = ADMISSION_USER_BURST, max_buckets: int = ADMISSION_MAX_BUCKETS):
+        self.rate = rate
+        self.burst = burst
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    # Gasta um token. Devolve 0 se passou, ou quantos segundos faltam para o próximo token
+    def take(self, key: str) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(tokens=self.burst, updated=now)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return 0.0
+        return (1 - bucket.tokens) / self.rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AdmissionController:
+    def __init__(self, max_concurrency: int = ADMISSION_MAX_CONCURRENCY, route_concurrency: int = ADMISSION_ROUTE_CONCURRENCY,
+                 route_limits: Optional[Dict[str, int]] = None, max_wait: float = ADMISSION_MAX_WAIT_MS / 1000,
+                 max_queue: int = ADMISSION_MAX_QUEUE, user_rate: float = ADMISSION_USER_RATE, user_burst: float = ADMISSION_USER_BURST):
+        self.route_concurrency = route_concurrency
+        self.route_limits = ROUTE_LIMITS if route_limits is None else route_limits
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.total = ConcurrencyLimit(max_concurrency, max_queue)
+        self.routes: Dict[str, ConcurrencyLimit] = {}
+        self.users = UserRateLimiter(user_rate, user_burst) if user_rate > 0 else None
+        self.rejected: Dict[Tuple[str, str], int] = {}
+
+    def route_limit(self, route: str) -> ConcurrencyLimit:
+        limit = self.routes.get(route)
+        if limit is None:
+            limit = self.routes[route] = ConcurrencyLimit(self.route_limits.get(route, self.route_concurrency), self.max_queue)
+        return limit
+
+    def reject(self, route: str, reason: str):
+        self.rejected[(route, reason)] = self.rejected.get((route, reason), 0) + 1
+        REJECTED.inc(route, reason)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.total.limit,
+            "in_flight": self.total.active,
+            "queued": self.total.queued,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_queue": self.max_queue,
+            "user_rate": self.users.rate if self.users else None,
+            "user_burst": self.users.burst if self.users else None,
+            "tracked_users": len(self.users) if self.users else 0,
+            "routes": {
+                route: {"limit": limit.limit, "in_flight": limit.active, "queued": limit.queued}
+                for route, limit in sorted(self.routes.items())
+            },
+            "rejected": [
+                {"route": route, "reason": reason, "count": count}
+                for (route, reason), count in sorted(self.rejected.items())
+            ],
+        }
+
+
+controller = AdmissionController()
+
+
+#? Limites e ocupação no /metrics (as recusas e a espera já são métricas próprias)
+def _admission_metrics():
+    yield from REJECTED.render()
+    yield from QUEUE_WAIT.render()
+    yield "# TYPE admission_limit gauge"
+    yield "# TYPE admission_in_flight gauge"
+    yield "# TYPE admission_queued gauge"
+    limits = [("*", controller.total)] + sorted(controller.routes.items())
+    for route, limit in limits:
+        yield f'admission_limit{{route="{route}"}} {limit.limit}'
+        yield f'admission_in_flight{{route="{route}"}} {limit.active}'
+        yield f'admission_queued{{route="{route}"}} {limit.queued}'
+
+if ADMISSION_ENABLED:
+    metrics.register_collector(_admission_metrics)
+
+
+def _match_route(routes, scope) -> Tuple[Optional[Any], Dict[str, Any]]:
+    for route in routes:
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            return route, child_scope.get("path_params", {})
+    return None, {}
+
+
+def _rejection(status_code: int, detail: str, retry_after: float) -> ORJSONResponse:
+    return ORJSONResponse({"detail": detail}, status_code=status_code, headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI que aplica o AdmissionController antes do roteamento.
+
+    'routes' é a lista de rotas do app (app.router.routes), usada para descobrir a
+    rota da requisição (o limite é por caminho da rota, não por URL).
+    """
+
+    def __init__(self, app, routes, controller: AdmissionController = controller, exclude_paths: Tuple[str, ...] = ()):
+        self.app = app
+        self.routes = routes
+        self.controller = controller
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        route, path_params = _match_route(self.routes, scope)
+        if route is None: # 404/405: o roteador responde sem tocar no banco
+            await self.app(scope, receive, send)
+            return
+        scope["route"] = route # O MetricsMiddleware rotula também as requisições recusadas
+        name = f"{scope['method']} {route.path}"
+        controller = self.controller
+        if name in UNLIMITED_ROUTES:
+            await self.app(scope, receive, send)
+            return
+
+        #* Token bucket por usuário nas escritas
+        if controller.users is not None and scope["method"] in WRITE_METHODS:
+            client = scope.get("client")
+            key = f"user:{path_params['user_id']}" if "user_id" in path_params else f"client:{client[0] if client else '-'}"
+            wait = controller.users.take(key)
+            if wait:
+                controller.reject(name, "rate_limited")
+                await _rejection(429, "Too many requests", wait)(scope, receive, send)
+                return
+
+        #* Primeiro a vaga da rota, depois a global: quem espera por uma rota cheia não ocupa vaga global
+        started = time.perf_counter()
+        route_limit = controller.route_limit(name)
+        result = await route_limit.acquire(controller.max_wait)
+        if result == "ok":
+            result = await controller.total.acquire(max(0.0, controller.max_wait - (time.perf_counter() - started)))
+            if result != "ok":
+                route_limit.release()
+        if result != "ok":
+            controller.reject(name, result)
+            await _rejection(503, "Server overloaded, try again later", ADMISSION_RETRY_AFTER)(scope, receive, send)
+            return
+
+        QUEUE_WAIT.observe(time.perf_counter() - started, name)
+        try:
+            await self.app(scope, receive, send) # Respostas em streaming seguram a vaga até o fim
+        finally:
+            controller.total.release()
+            route_limit.release()
+
+
+router = APIRouter()
+
+#* Limites, ocupação e recusas do controle de admissão deste worker
+@router.get("/api/admission/stats")
+async def get_admission_stats_endpoint():
+    return controller.stats()
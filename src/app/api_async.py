@@ -0,0 +1,275 @@
+"""
+Endpoints 'async def' dos recursos principais, usando AsyncSession.
+
+Só são registrados quando DATABASE_ASYNC está ligado. Eles são incluídos antes
+das rotas síncronas do main.py, então respondem no lugar delas sem mudar o
+contrato da API (mesmos caminhos, parâmetros, respostas e erros). Por isso
+ficam fora do OpenAPI: a documentação das rotas síncronas vale para as duas.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from datetime import date
+
+from . import crud, crud_async, fastjson, purge, schemas, versions
+from .database import get_async_db, get_async_read_db
+
+router = APIRouter(include_in_schema=False)
+
+
+### ======= Endpoints para o recurso 'User' ======= ###
+
+@router.get("/api/users/", response_model=List[schemas.UserSchema])
+async def get_users_endpoint(ids: Optional[str] = None, db: AsyncSession = Depends(get_async_read_db)):
+    try:
+        user_ids = None if ids is None else crud.parse_ids(ids)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    users = await crud_async.get_users(db) if user_ids is None else await crud_async.get_users_by_ids(db, user_ids)
+    return fastjson.json_response(fastjson.dumps_rows(users))
+
+"""#! ROTA ESPECIFICA -> VIR PRIMEIRO SEMPRE #!"""
+@router.get("/api/users/by_email/", response_model=schemas.UserSchema)
+async def get_user_by_email_endpoint(email: str, db: AsyncSession = Depends(get_async_read_db)):
+    user_by_email = await crud_async.get_user_by_email(db, email=email)
+
+    if user_by_email is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return user_by_email
+
+@router.get("/api/users/{user_id}/", response_model=schemas.UserSchema)
+async def get_user_endpoint(user_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    user = await crud_async.get_user(db, user_id=user_id)
+
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return user
+
+@router.post("/api/users/", response_model=schemas.UserSchema, status_code=status.HTTP_201_CREATED)
+async def create_user_endpoint(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing_user = await crud_async.get_user_by_email(db, email=user.email)
+
+    if existing_user:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already registered")
+
+    return await crud_async.create_user(db, user=user)
+
+@router.patch("/api/users/{user_id}/", response_model=schemas.UserPatch)
+async def update_user_endpoint(user_id: int, user_update: schemas.UserPatch, db: AsyncSession = Depends(get_async_db)):
+    updated_user = await crud_async.update_user(db, user_id=user_id, user_update=user_update)
+
+    if updated_user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return updated_user
+
+@router.delete("/api/users/{user_id}/", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_user_endpoint(user_id: int, mode: Literal["sync", "async"] = "sync", db: AsyncSession = Depends(get_async_db)):
+    if mode == "async":
+        job = await crud_async.create_purge_job(db, "user", user_id)
+        if job is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        purge.worker.submit(job.id)
+        return purge.accepted(job)
+
+    deleted_user = await crud_async.delete_user(db, user_id=user_id)
+    if deleted_user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return
+
+
+### === Endpoints para o recurso 'Transactions' === ###
+
+"""#! ROTA ESPECIFICA -> VIR PRIMEIRO SEMPRE #!"""
+@router.get("/api/users/{user_id}/transactions/search", response_model=List[schemas.TransactionExpandedSchema])
+async def search_transactions_endpoint(
+    user_id: int,
+    request: Request,
+    q: Optional[str] = Query(None, min_length=1, max_length=200),
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    category_id: Optional[int] = None,
+    limit: int = Query(crud.DEFAULT_PAGE_SIZE, ge=1, le=crud.MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    expand: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    try:
+        expand_names = crud.parse_expand(expand)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    etag = versions.make_etag(await crud_async.get_transaction_list_versions(db, user_id=user_id), request.url.query)
+    if versions.etag_matches(request.headers.get("if-none-match"), etag):
+        return versions.not_modified(etag)
+
+    try:
+        transactions, next_cursor = await crud_async.search_transactions(
+            db, user_id=user_id, limit=limit, after=after, expand=expand_names,
+            q=q, min_amount=min_amount, max_amount=max_amount, start=start, end=end, category_id=category_id,
+        )
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    headers = {"ETag": etag}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    return fastjson.json_response(fastjson.dumps_rows(transactions), headers=headers)
+
+@router.get("/api/users/{user_id}/transactions/", response_model=List[schemas.TransactionExpandedSchema])
+async def get_all_transactions_by_user_endpoint(
+    user_id: int,
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=crud.MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    expand: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    try:
+        expand_names = crud.parse_expand(expand)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    #? A versão é lida antes da listagem: se algo mudar no meio, o próximo pedido não recebe 304
+    etag = versions.make_etag(await crud_async.get_transaction_list_versions(db, user_id=user_id), request.url.query)
+    if versions.etag_matches(request.headers.get("if-none-match"), etag):
+        return versions.not_modified(etag)
+
+    if limit is None and after is None:
+        transactions = await crud_async.get_all_transactions_by_user(db, user_id=user_id, start=start, end=end, expand=expand_names)
+        return fastjson.json_response(fastjson.dumps_rows(transactions), headers={"ETag": etag})
+
+    try:
+        transactions, next_cursor = await crud_async.get_transactions_page(
+            db, user_id=user_id, limit=limit or crud.DEFAULT_PAGE_SIZE, after=after, start=start, end=end, expand=expand_names
+        )
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    headers = {"ETag": etag}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    return fastjson.json_response(fastjson.dumps_rows(transactions), headers=headers)
+
+@router.get("/api/users/{user_id}/transactions/{transaction_id}/", response_model=schemas.TransactionSchema)
+async def get_transaction_by_user_endpoint(user_id: int, transaction_id: int, expand: Optional[str] = None, db: AsyncSession = Depends(get_async_read_db)):
+    try:
+        expand_names = crud.parse_expand(expand)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    user = await crud_async.get_user(db, user_id=user_id)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    if expand_names:
+        transaction = await crud_async.get_transaction_row(db, user_id=user_id, transaction_id=transaction_id, expand=expand_names)
+        if transaction is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found")
+        return fastjson.json_response(fastjson.dumps_row(transaction))
+
+    return await crud_async.get_transaction_by_user(db, user_id=user_id, transaction_id=transaction_id)
+
+@router.post("/api/users/{user_id}/transactions/", response_model=schemas.TransactionSchema, status_code=status.HTTP_201_CREATED)
+async def create_transaction_endpoint(user_id: int, transaction: schemas.TransactionCreate, db: AsyncSession = Depends(get_async_db)):
+    try:
+        return await crud_async.create_transaction(db, transaction=transaction, owner_id=user_id)
+    except crud.ForeignKeyNotFound as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{exc.resource} not found")
+
+@router.patch("/api/users/{user_id}/transactions/{transaction_id}/", response_model=schemas.TransactionPatch)
+async def update_transaction_endpoint(user_id: int, transaction_id: int, transaction_update: schemas.TransactionPatch, db: AsyncSession = Depends(get_async_db)):
+    try:
+        updated_transaction = await crud_async.update_transaction(db, user_id=user_id, transaction_id=transaction_id, transaction_update=transaction_update)
+    except crud.ForeignKeyNotFound as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{exc.resource} not found")
+
+    if updated_transaction is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found or does not belong to the user.")
+    return updated_transaction
+
+@router.delete("/api/users/{user_id}/transactions/{transaction_id}/", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_transaction_endpoint(user_id: int, transaction_id: int, db: AsyncSession = Depends(get_async_db)):
+    deleted_transaction = await crud_async.delete_transaction(user_id=user_id, transaction_id=transaction_id, db=db)
+    if deleted_transaction is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Transaction not found or does not belong to the specified user."
+        )
+    return
+
+
+## === Endpoints para o recurso 'Categories' === ##
+
+@router.get("/api/categories/", response_model=List[schemas.CategorySchema])
+async def get_all_categories_endpoint(request: Request, ids: Optional[str] = None, db: AsyncSession = Depends(get_async_read_db)):
+    try:
+        category_ids = None if ids is None else crud.parse_ids(ids)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    if category_ids is None:
+        version, categories = await crud_async.get_cached_categories_json(db)
+    else:
+        version, categories = await crud_async.get_cached_categories_by_ids_json(db, category_ids)
+
+    etag = versions.make_etag({versions.CATEGORIES_KEY: version}, request.url.query)
+    if versions.etag_matches(request.headers.get("if-none-match"), etag):
+        return versions.not_modified(etag)
+
+    return fastjson.json_response(categories, headers={"ETag": etag})
+
+@router.get("/api/categories/{category_id}/", response_model=schemas.CategorySchema)
+async def get_category_by_id_endpoint(category_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    category = await crud_async.get_cached_category(db, category_id=category_id)
+    if category is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category doesn't exist")
+    return category
+
+@router.post("/api/categories/", response_model=schemas.CategorySchema, status_code=status.HTTP_201_CREATED)
+async def create_category_endpoint(category: schemas.CategoryCreate, db: AsyncSession = Depends(get_async_db)):
+    existing_category = await crud_async.get_cached_category_by_name(db, category_name=category.name)
+
+    if existing_category:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Category {category.name} already registered"
+        )
+
+    return await crud_async.create_category(db, category=category)
+
+@router.patch("/api/categories/{category_id}/", response_model=schemas.CategorySchema)
+async def update_category_endpoint(category_id: int, category_update: schemas.CategoryPatch, db: AsyncSession = Depends(get_async_db)):
+    updated_category = await crud_async.update_category(db, category_id=category_id, category_update=category_update)
+
+    if updated_category is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
+    return updated_category
+
+@router.delete("/api/categories/{category_id}/", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_category(category_id: int, mode: Literal["sync", "async"] = "sync", db: AsyncSession = Depends(get_async_db)):
+    if mode == "async":
+        job = await crud_async.create_purge_job(db, "category", category_id)
+        if job is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category doesn't exist.")
+        purge.worker.submit(job.id)
+        return purge.accepted(job)
+
+    deleted_category = await crud_async.delete_category(db, category_id=category_id)
+    if deleted_category is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category doesn't exist.")
+    return
+
+
+### ======= Endpoints para os jobs de exclusão ======= ###
+
+@router.get("/api/jobs/{job_id}/", response_model=schemas.PurgeJobSchema)
+async def get_purge_job_endpoint(job_id: int, db: AsyncSession = Depends(get_async_db)):
+    job = await crud_async.get_purge_job(db, job_id=job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
@@ -0,0 +1,110 @@
+"""
+Cache em memória (por processo) com expiração por tempo e limite de tamanho.
+
+Usado para a tabela de categorias, que é pequena e quase nunca muda, mas é
+consultada em toda criação de transação.
+"""
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable
+import os
+import time
+
+from . import metrics
+
+# Marca de "não encontrado" (None é um valor válido para guardar)
+MISSING = object()
+
+
+class TTLCache:
+    """Cache LRU com TTL. Seguro para uso por várias threads."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        #? Geração: muda a cada clear(). Quem carregou um valor antes de um clear() não pode
+        #? guardá-lo depois, senão o cache volta a ter as linhas antigas
+        self.generation = 0
+
+    # Devolve o valor guardado ou MISSING (se não existir ou tiver expirado)
+    def get(self, key: Hashable) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    # Guarda um valor, removendo os menos usados quando passa do tamanho máximo.
+    # Com 'generation' (lida antes de carregar o valor), recusa guardar se o cache foi limpo no meio.
+    def set(self, key: Hashable, value: Any, generation: int = None) -> bool:
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return False
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    # Lê do cache e, se não tiver, chama o 'loader' e guarda o resultado (None não é guardado)
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is not MISSING:
+            return value
+        generation = self.generation
+        value = loader()
+        if value is not None:
+            self.set(key, value, generation=generation)
+        return value
+
+    # Limpa o cache inteiro
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "generation": self.generation,
+            }
+
+
+# Cache das categorias (por ID, por nome e a lista completa)
+CATEGORY_CACHE_TTL = float(os.getenv("CATEGORY_CACHE_TTL", "60"))
+CATEGORY_CACHE_MAXSIZE = int(os.getenv("CATEGORY_CACHE_MAXSIZE", "1024"))
+
+category_cache = TTLCache(maxsize=CATEGORY_CACHE_MAXSIZE, ttl=CATEGORY_CACHE_TTL)
+
+
+#? Contadores do cache de categorias no /metrics
+def _category_cache_metrics():
+    stats = category_cache.stats()
+    for name in ("hits", "misses", "evictions", "invalidations"):
+        yield f"# TYPE category_cache_{name}_total counter"
+        yield f"category_cache_{name}_total {stats[name]}"
+    yield "# TYPE category_cache_size gauge"
+    yield f"category_cache_size {stats['size']}"
+
+metrics.register_collector(_category_cache_metrics)
@@ -0,0 +1,283 @@
+"""
+Feed de mudanças das transações de cada usuário (Server-Sent Events).
+
+Com CHANGE_FEED_ENABLED=true, as escritas do crud gravam um evento em
+'transaction_events' na mesma transação do banco:
+
+- created / updated / deleted: a transação como na API (em 'deleted', como era);
+- reload: muitas linhas mudaram de uma vez (importação em lote, exclusão de
+  categoria, exclusão em segundo plano) e o cliente deve recarregar a lista.
+
+GET /api/users/{user_id}/transactions/events envia esses eventos em text/event-stream.
+O id de cada evento é o token para retomar: ao reconectar, o cliente manda o último
+id recebido (header Last-Event-ID, que o EventSource do navegador envia sozinho, ou
+?after=) e recebe o que perdeu. Sem token, o feed começa com um evento 'ready' e o
+cliente carrega a lista depois dele. Se o token for mais antigo que os eventos
+guardados (CHANGE_FEED_RETENTION_HOURS), o feed manda 'reset': recarregue a lista.
+
+Quem avisa as conexões abertas é o 'broker' em memória, logo depois do commit. Com
+vários workers no PostgreSQL (PG_NOTIFY_ENABLED=true), o aviso chega aos outros
+workers por LISTEN/NOTIFY. Sem isso, cada conexão também confere a tabela a cada
+CHANGE_FEED_HEARTBEAT_SECONDS, quando envia o keep-alive.
+
+Limpeza dos eventos antigos (dentro de src/, ex.: em um cron):
+    python -m app.changefeed prune
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+import argparse
+import asyncio
+import os
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+import orjson
+
+from . import metrics, models, versions
+from .database import SessionLocal, get_db
+from .notifications import notify
+
+CHANGE_FEED_ENABLED = os.getenv("CHANGE_FEED_ENABLED", "false").lower() in ("1", "true", "yes")
+CHANGE_FEED_RETENTION_HOURS = float(os.getenv("CHANGE_FEED_RETENTION_HOURS", "24"))
+CHANGE_FEED_HEARTBEAT_SECONDS = float(os.getenv("CHANGE_FEED_HEARTBEAT_SECONDS", "15"))
+CHANGE_FEED_BATCH_SIZE = 500
+
+# Canal do NOTIFY (payload: ids dos usuários com eventos novos, separados por vírgula)
+CHANGE_FEED_CHANNEL = "transaction_events"
+
+# Maior id já apagado pela limpeza (guardado em 'ledger_versions')
+PRUNED_KEY = "transaction_events:pruned"
+
+# Usuários com eventos novos na sessão, avisados no commit
+_PENDING = "changefeed_owners"
+
+
+### ============ Gravação (chamada pelas escritas do crud) ============ ###
+
+def _as_data(row: Row) -> dict:
+    data = row._asdict()
+    data["created_at"] = data["created_at"].isoformat()
+    return data
+
+# Grava um evento por transação ('rows' com as colunas de crud.TRANSACTION_COLUMNS).
+#? Chamado depois do versions.bump: a linha "user:{id}" fica travada até o commit,
+#? então os ids dos eventos de um usuário seguem a ordem dos commits.
+def record(db: Session, event_type: str, rows: Sequence[Row]):
+    if not CHANGE_FEED_ENABLED or not rows:
+        return
+    now = datetime.now()
+    db.execute(insert(models.TransactionEvent), [
+        {"owner_id": row.owner_id, "transaction_id": row.id, "type": event_type, "data": _as_data(row), "created_at": now}
+        for row in rows
+    ])
+    _changed(db, {row.owner_id for row in rows})
+
+# Grava um 'reload' para cada usuário (muitas transações mudaram de uma vez)
+def record_reload(db: Session, owner_ids: Iterable[int]):
+    owner_ids = set(owner_ids)
+    if not CHANGE_FEED_ENABLED or not owner_ids:
+        return
+    now = datetime.now()
+    db.execute(insert(models.TransactionEvent), [
+        {"owner_id": owner_id, "transaction_id": None, "type": "reload", "data": {}, "created_at": now}
+        for owner_id in sorted(owner_ids)
+    ])
+    _changed(db, owner_ids)
+
+def _changed(db: Session, owner_ids: Set[int]):
+    db.info.setdefault(_PENDING, set()).update(owner_ids)
+    owners = sorted(owner_ids)
+    for start in range(0, len(owners), 500): # O payload do NOTIFY tem limite de tamanho
+        notify(db, CHANGE_FEED_CHANNEL, ",".join(map(str, owners[start:start + 500])))
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session):
+    owner_ids = session.info.pop(_PENDING, None)
+    if owner_ids:
+        broker.publish(owner_ids)
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session):
+    session.info.pop(_PENDING, None)
+
+
+### ============ Leitura ============ ###
+
+# Onde o feed começa e o aviso inicial: 'ready' (sem token), 'reset' (token anterior
+# à limpeza: eventos podem ter se perdido) ou None (retoma do token)
+def start_position(db: Session, owner_id: int, after: Optional[int]) -> Tuple[int, Optional[str]]:
+    pruned = versions.get_versions(db, [PRUNED_KEY])[PRUNED_KEY]
+    if after is not None and after >= pruned:
+        return after, None
+    latest = db.scalar(select(func.max(models.TransactionEvent.id)).where(models.TransactionEvent.owner_id == owner_id)) or 0
+    return max(latest, pruned), ("ready" if after is None else "reset")
+
+# Eventos de um usuário depois do id 'after', em ordem
+def get_events(db: Session, owner_id: int, after: int, limit: int = CHANGE_FEED_BATCH_SIZE) -> List[Row]:
+    event_ = models.TransactionEvent
+    return db.execute(
+        select(event_.id, event_.type, event_.data)
+        .where(event_.owner_id == owner_id, event_.id > after)
+        .order_by(event_.id)
+        .limit(limit)
+    ).all()
+
+# Apaga os eventos anteriores a 'before' e guarda até onde apagou (para o 'reset')
+def prune(db: Session, before: datetime) -> int:
+    event_ = models.TransactionEvent
+    cutoff = db.scalar(select(func.max(event_.id)).where(event_.created_at < before))
+    if cutoff is None:
+        return 0
+    deleted = db.execute(delete(event_).where(event_.id <= cutoff)).rowcount
+    versions.raise_to(db, PRUNED_KEY, cutoff)
+    db.commit()
+    return deleted
+
+
+### ============ Avisos entre as escritas e as conexões abertas ============ ###
+
+class ChangeBroker:
+    """Acorda as conexões do feed de um usuário quando ele tem eventos novos.
+
+    'publish' pode ser chamado de qualquer thread (endpoints síncronos, group commit,
+    worker de exclusão, PgListener); cada conexão espera no próprio event loop.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._subscribers: Dict[int, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = defaultdict(set)
+
+    @contextmanager
+    def subscribe(self, owner_id: int) -> Iterator[asyncio.Event]:
+        subscriber = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._subscribers[owner_id].add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(owner_id)
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[owner_id]
+
+    def publish(self, owner_ids: Iterable[int]):
+        with self._lock:
+            targets = [subscriber for owner_id in owner_ids for subscriber in self._subscribers.get(owner_id, ())]
+        self._wake(targets)
+
+    # Acorda todas as conexões (ex.: o LISTEN reconectou e avisos podem ter se perdido)
+    def publish_all(self):
+        with self._lock:
+            targets = [subscriber for subscribers in self._subscribers.values() for subscriber in subscribers]
+        self._wake(targets)
+
+    @staticmethod
+    def _wake(targets):
+        for loop, wake in targets:
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError: # Event loop já fechado
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"users": len(self._subscribers), "connections": sum(len(s) for s in self._subscribers.values())}
+
+
+broker = ChangeBroker()
+
+
+# Callback do PgListener: eventos gravados por outros workers
+def on_notify(payload: Optional[str]):
+    if payload is None:
+        broker.publish_all()
+    else:
+        broker.publish(int(owner_id) for owner_id in payload.split(",") if owner_id)
+
+
+### ============ Server-Sent Events ============ ###
+
+def _message(event_id: int, event_type: str, data: bytes) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event_id, event_type.encode(), data)
+
+# Gera o corpo text/event-stream. Cada leitura abre uma sessão curta (no primário:
+# a réplica pode estar atrasada em relação ao aviso), então a conexão aberta do
+# cliente não segura uma conexão do pool enquanto espera.
+async def stream_events(session_factory: Callable[[], Session], owner_id: int, after: Optional[int]):
+    def read(function, *args):
+        def call():
+            with session_factory() as db:
+                return function(db, *args)
+        return run_in_threadpool(call)
+
+    with broker.subscribe(owner_id) as wake: # Inscreve antes de ler: nenhum aviso se perde
+        position, notice = await read(start_position, owner_id, after)
+        if notice is not None:
+            yield _message(position, notice, b"{}")
+
+        while True:
+            wake.clear()
+            events = await read(get_events, owner_id, position, CHANGE_FEED_BATCH_SIZE)
+            for item in events:
+                yield _message(item.id, item.type, orjson.dumps(item.data))
+            if events:
+                position = events[-1].id
+            if len(events) == CHANGE_FEED_BATCH_SIZE:
+                continue # Ainda tem eventos para enviar
+            try:
+                await asyncio.wait_for(wake.wait(), CHANGE_FEED_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n" # Mantém proxies sem fechar a conexão (e confere a tabela de novo)
+
+
+#? Conexões abertas no /metrics
+def _changefeed_metrics():
+    stats = broker.stats()
+    yield "# TYPE changefeed_connections gauge"
+    yield f"changefeed_connections {stats['connections']}"
+    yield "# TYPE changefeed_users gauge"
+    yield f"changefeed_users {stats['users']}"
+
+metrics.register_collector(_changefeed_metrics)
+
+
+router = APIRouter()
+
+#* Feed de mudanças das transações de um usuário (text/event-stream)
+#? Retoma do header Last-Event-ID (enviado pelo EventSource ao reconectar) ou do ?after=
+@router.get("/api/users/{user_id}/transactions/events")
+def transaction_events_endpoint(user_id: int, after: Optional[str] = None, last_event_id: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    token = last_event_id or after
+    try:
+        position = int(token) if token is not None else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid event id")
+
+    if db.scalar(select(models.User.id).where(models.User.id == user_id)) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    return StreamingResponse(
+        stream_events(SessionLocal, user_id, position),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}, # Sem buffer no proxy (nginx)
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Change feed maintenance")
+    parser.add_argument("command", choices=["prune"])
+    parser.add_argument("--hours", type=float, default=CHANGE_FEED_RETENTION_HOURS, help="keep events newer than this")
+    args = parser.parse_args()
+
+    with SessionLocal() as session:
+        deleted = prune(session, datetime.now() - timedelta(hours=args.hours))
+        print(f"Deleted {deleted} change feed events older than {args.hours:g}h")
@@ -1,14 +1,62 @@
+from sqlalchemy import and_, or_, select, insert, update, delete, func
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from . import models, schemas
-from typing import List, Optional, Dict, Any
-
+from . import models, schemas, rollups, fastjson, search, versions, changefeed
+from .cache import category_cache
+from .notifications import notify, CATEGORY_CACHE_CHANNEL
+from typing import List, Optional, Dict, Any, Iterator, Sequence, Tuple
+from datetime import date, datetime, time, timedelta
+import base64
+
+
+# Erro de chave estrangeira: o usuário ou a categoria referenciados não existem
+class ForeignKeyNotFound(Exception):
+    def __init__(self, resource: str):
+        self.resource = resource # "User" ou "Category"
+        super().__init__(f"{resource} not found")
+
+# Converte uma violação de chave estrangeira em ForeignKeyNotFound.
+# Só roda no caminho de erro: a sessão já voltou (rollback) e uma única consulta
+# descobre qual das referências falhou, mantendo a ordem antiga (usuário primeiro).
+def _foreign_key_error(db: Session, exc: IntegrityError, owner_id: int) -> Exception:
+    is_foreign_key = getattr(exc.orig, "pgcode", None) == "23503" or "FOREIGN KEY" in str(exc.orig).upper()
+    if not is_foreign_key:
+        return exc
+    if db.scalar(select(models.User.id).where(models.User.id == owner_id)) is None:
+        return ForeignKeyNotFound("User")
+    return ForeignKeyNotFound("Category")
 
 
 ### ============ Funções de CRUD (USER) ============ ###
 
+# Colunas expostas pelo UserSchema (devolvidas pelo UPDATE ... RETURNING)
+USER_COLUMNS = (models.User.id, models.User.name, models.User.email)
+
+# Máximo de ids por busca em lote (?ids=1,2,3)
+MAX_IDS = 1000
+
+# Lê a lista de ids de '?ids=1,2,3' (lança ValueError se vier vazia, inválida ou grande demais)
+def parse_ids(ids: str) -> List[int]:
+    try:
+        parsed = sorted({int(value) for value in ids.split(",") if value.strip()})
+    except ValueError as exc:
+        raise ValueError("Invalid ids") from exc
+    if not parsed:
+        raise ValueError("Invalid ids")
+    if len(parsed) > MAX_IDS:
+        raise ValueError(f"At most {MAX_IDS} ids per request")
+    return parsed
+
 # Pega todos usuários (GET)
+#? Listagens trazem só as colunas (tuplas) e executam direto na conexão (Core),
+#? sem montar objetos ORM nem passar pela camada de carregamento do ORM
 def get_users(db: Session):
-    return db.query(models.User).all()
+    return db.connection().execute(select(*USER_COLUMNS).order_by(models.User.id)).all()
+
+# Pega vários usuários de uma vez, em uma consulta (GET ?ids=). Ids que não existem ficam de fora.
+def get_users_by_ids(db: Session, user_ids: List[int]):
+    return db.connection().execute(select(*USER_COLUMNS).where(models.User.id.in_(user_ids)).order_by(models.User.id)).all()
 
 # Pega um usuário específico (GET)
 def get_user(db: Session, user_id: int):
@@ -28,98 +76,463 @@ def create_user(db: Session, user: schemas.UserCreate):
 
 
 # Atualiza um usuario (PATCH)
-def update_user(db: Session, db_user: models.User, user_update: schemas.UserPatch) -> Optional[models.User]:
+# Um único UPDATE ... RETURNING: devolve None se o usuário não existir.
+def update_user(db: Session, user_id: int, user_update: schemas.UserPatch):
     # Adiciona em um dicionário apenas os campos que vieram preenchidos.
     user_data: Dict[str, Any] = user_update.model_dump(exclude_unset=True)
 
-    # Aplica a atualização
-    for key, value in user_data.items():
-        setattr(db_user, key, value)
+    if not user_data:
+        return get_user(db, user_id=user_id)
 
-    # Faz a alteração no banco
-    db.add(db_user)
+    # Faz a alteração no banco e já recebe a linha atualizada
+    updated_user = db.execute(
+        update(models.User)
+        .where(models.User.id == user_id)
+        .values(**user_data)
+        .returning(*USER_COLUMNS)
+        .execution_options(synchronize_session=False)
+    ).one_or_none()
+
+    if updated_user is not None:
+        versions.bump(db, [versions.user_key(user_id)]) # Invalida o ETag das listagens com ?expand=owner
     db.commit()
-    db.refresh(db_user)
 
-    return db_user
+    return updated_user
 
 # Deleta um usuario (DELETE)
+#? DELETE ... RETURNING direto no banco: as transações do usuário são apagadas pelo
+#? ON DELETE CASCADE, sem o ORM carregar nenhuma delas na sessão
 def delete_user(db: Session, user_id: int):
-
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-
-    if user is None:
+    deleted_user = db.execute(
+        delete(models.User)
+        .where(models.User.id == user_id)
+        .returning(*USER_COLUMNS)
+        .execution_options(synchronize_session=False)
+    ).one_or_none()
+
+    if deleted_user is None:
+        db.rollback()
         return None
-    
-    deleted_user = user
-    
-    db.delete(user) # Deleta a informação
+
+    db.query(models.TransactionRollup).filter(models.TransactionRollup.owner_id == user_id).delete(synchronize_session=False) # Remove os resumos do usuário
+    versions.bump(db, [versions.user_key(user_id)]) # Invalida o ETag da listagem de transações
     db.commit() # Salva no banco
     return deleted_user
 
 ### ============ Funções de CRUD (TRANSACTIONS) ============ ###
 
-# Pega todas as transações (GET)
-def get_all_transactions_by_user(db: Session, user_id: int):
-    return db.query(models.Transaction).filter(models.Transaction.owner_id == user_id).all()
+# Colunas expostas pelo TransactionSchema (usadas quando não precisamos do objeto ORM)
+TRANSACTION_COLUMNS = (
+    models.Transaction.id,
+    models.Transaction.description,
+    models.Transaction.amount,
+    models.Transaction.created_at,
+    models.Transaction.owner_id,
+    models.Transaction.category_id,
+)
+
+# Colunas expostas pelo CategorySchema
+CATEGORY_COLUMNS = (models.Category.id, models.Category.name)
+
+# Objetos que podem vir embutidos em cada transação (?expand=category,owner):
+# nome -> (tabela, colunas do schema, chave estrangeira na transação)
+EXPANDABLE = {
+    "category": (models.Category, CATEGORY_COLUMNS, models.Transaction.category_id),
+    "owner": (models.User, USER_COLUMNS, models.Transaction.owner_id),
+}
+
+# Lê o '?expand=category,owner' (lança ValueError se pedir algo que não existe)
+def parse_expand(expand: Optional[str]) -> Tuple[str, ...]:
+    if not expand:
+        return ()
+    names = {name.strip() for name in expand.split(",") if name.strip()}
+    unknown = names - EXPANDABLE.keys()
+    if unknown:
+        raise ValueError(f"Cannot expand: {', '.join(sorted(unknown))}")
+    return tuple(name for name in EXPANDABLE if name in names)
+
+# Embute os objetos pedidos na mesma consulta (LEFT JOIN), sem uma consulta por linha.
+# As colunas vêm como 'category.id', 'category.name'... e o fastjson monta o objeto aninhado.
+def expand_statement(stmt, expand: Sequence[str] = ()):
+    for name in expand:
+        model, columns, foreign_key = EXPANDABLE[name]
+        stmt = stmt.outerjoin(model, foreign_key == model.id).add_columns(*(column.label(f"{name}.{column.key}") for column in columns))
+    return stmt
+
+# Tamanho padrão e máximo das páginas da listagem paginada
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Gera o cursor opaco a partir da última transação da página: (created_at, id)
+def encode_cursor(created_at: datetime, transaction_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{transaction_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+# Lê o cursor opaco de volta (lança ValueError se o cursor for inválido)
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, transaction_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(transaction_id)
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
+
+# Filtro de keyset: tudo que vem depois de (created_at, id) na ordenação.
+# O 'created_at >= ...' separado deixa o banco usar o intervalo no índice e
+# descartar as partições mensais anteriores (ver partitions.py).
+def _after_cursor(cursor: str):
+    created_at, transaction_id = decode_cursor(cursor)
+    return and_(
+        models.Transaction.created_at >= created_at,
+        or_(models.Transaction.created_at > created_at, models.Transaction.id > transaction_id),
+    )
+
+# Filtro de período ('start' e 'end' são datas e incluem o dia inteiro). Com a
+# tabela particionada por mês, o banco só lê as partições do período.
+def created_between(start: Optional[date] = None, end: Optional[date] = None) -> list:
+    conditions = []
+    if start is not None:
+        conditions.append(models.Transaction.created_at >= datetime.combine(start, time.min))
+    if end is not None:
+        conditions.append(models.Transaction.created_at < datetime.combine(end + timedelta(days=1), time.min))
+    return conditions
+
+# Versões que definem a listagem de transações de um usuário: as transações dele e
+# as categorias (excluir uma categoria remove transações). Uma consulta pela chave primária.
+def get_transaction_list_versions(db: Session, user_id: int) -> Dict[str, int]:
+    return versions.get_versions(db, [versions.user_key(user_id), versions.CATEGORIES_KEY])
+
+# Pega todas as transações, opcionalmente de um período (GET)
+def get_all_transactions_by_user(db: Session, user_id: int, start: Optional[date] = None, end: Optional[date] = None, expand: Sequence[str] = ()):
+    stmt = select(*TRANSACTION_COLUMNS).where(models.Transaction.owner_id == user_id, *created_between(start, end))
+    return db.connection().execute(expand_statement(stmt, expand)).all()
+
+# Ordena por (created_at, id), aplica o cursor e busca um item a mais só para
+# saber se existe uma próxima página
+def page_statement(stmt, limit: int, after: Optional[str] = None):
+    if after is not None:
+        stmt = stmt.where(_after_cursor(after))
+    return stmt.order_by(models.Transaction.created_at, models.Transaction.id).limit(limit + 1)
+
+# Separa a página do item extra e gera o cursor da próxima página (None na última)
+def split_page(transactions: List[Row], limit: int) -> Tuple[List[Row], Optional[str]]:
+    if len(transactions) <= limit:
+        return transactions, None
+    transactions = transactions[:limit]
+    last = transactions[-1]
+    return transactions, encode_cursor(last.created_at, last.id)
+
+# Pega uma página de transações de um usuário ordenada por (created_at, id) (GET)
+def get_transactions_page(
+    db: Session, user_id: int, limit: int, after: Optional[str] = None, start: Optional[date] = None, end: Optional[date] = None,
+    expand: Sequence[str] = (),
+) -> Tuple[List[Row], Optional[str]]:
+    stmt = select(*TRANSACTION_COLUMNS).where(models.Transaction.owner_id == user_id, *created_between(start, end))
+    stmt = page_statement(expand_statement(stmt, expand), limit, after)
+    return split_page(db.connection().execute(stmt).all(), limit)
+
+# Monta a busca de transações de um usuário: todos os filtros vão para o SQL.
+# 'q' busca na descrição pelo índice de texto (ver search.py); 'start' e 'end' incluem o dia inteiro.
+def search_statement(
+    dialect: str,
+    user_id: int,
+    q: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    category_id: Optional[int] = None,
+):
+    transaction = models.Transaction
+    stmt = select(*TRANSACTION_COLUMNS).where(transaction.owner_id == user_id, *created_between(start, end))
+    if q:
+        stmt = stmt.where(search.contains(dialect, user_id, q))
+    if min_amount is not None:
+        stmt = stmt.where(transaction.amount >= min_amount)
+    if max_amount is not None:
+        stmt = stmt.where(transaction.amount <= max_amount)
+    if category_id is not None:
+        stmt = stmt.where(transaction.category_id == category_id)
+    return stmt
+
+# Busca transações de um usuário, paginada por cursor como a listagem (GET)
+def search_transactions(
+    db: Session, user_id: int, limit: int, after: Optional[str] = None, expand: Sequence[str] = (), **filters
+) -> Tuple[List[Row], Optional[str]]:
+    connection = db.connection()
+    stmt = page_statement(expand_statement(search_statement(connection.dialect.name, user_id, **filters), expand), limit, after)
+    return split_page(connection.execute(stmt).all(), limit)
+
+# Percorre as transações de um usuário em lotes usando um cursor do lado do servidor.
+# Retorna tuplas (sem objetos ORM), então a memória fica limitada ao tamanho do lote.
+def iter_transactions_by_user(db: Session, user_id: int, batch_size: int = 1000, after: Optional[str] = None) -> Iterator[Sequence]:
+    stmt = select(*TRANSACTION_COLUMNS).where(models.Transaction.owner_id == user_id)
+    if after is not None:
+        stmt = stmt.where(_after_cursor(after))
+    stmt = stmt.order_by(models.Transaction.created_at, models.Transaction.id)
+
+    result = db.execute(stmt.execution_options(stream_results=True, yield_per=batch_size))
+    try:
+        for rows in result.partitions():
+            yield rows
+    finally:
+        result.close()
+
+# Percorre as transações para exportação, em lotes, usando um cursor do lado do servidor.
+# Sem 'user_id' percorre as transações de todos os usuários no período.
+def iter_transactions_for_export(db: Session, user_id: Optional[int] = None, start: Optional[date] = None, end: Optional[date] = None, batch_size: int = 10000) -> Iterator[Sequence]:
+    stmt = select(*TRANSACTION_COLUMNS).where(*created_between(start, end))
+    if user_id is not None:
+        stmt = stmt.where(models.Transaction.owner_id == user_id).order_by(models.Transaction.created_at, models.Transaction.id)
+
+    result = db.execute(stmt.execution_options(stream_results=True, yield_per=batch_size))
+    try:
+        for rows in result.partitions():
+            yield rows
+    finally:
+        result.close()
 
 # Pega uma transação de um usuário (GET)
 def get_transaction_by_user(db: Session, user_id: int, transaction_id: int):
     return db.query(models.Transaction).filter(models.Transaction.owner_id == user_id, models.Transaction.id == transaction_id).first() # Valida se o user_id é igual ao User.id do banco
 
+# Pega uma transação de um usuário com os objetos pedidos em '?expand' (uma consulta com JOIN) (GET)
+def get_transaction_row(db: Session, user_id: int, transaction_id: int, expand: Sequence[str] = ()) -> Optional[Row]:
+    stmt = select(*TRANSACTION_COLUMNS).where(models.Transaction.owner_id == user_id, models.Transaction.id == transaction_id)
+    return db.connection().execute(expand_statement(stmt, expand)).first()
+
 # Cria uma transação (POST)
+# Um único INSERT ... RETURNING. Não consulta usuário nem categoria antes:
+# se algum não existir, a chave estrangeira falha e vira ForeignKeyNotFound.
 def create_transaction(db: Session, transaction: schemas.TransactionCreate, owner_id: int):
-
-    # Criando uma nova transação
-    db_transaction = models.Transaction(
-        description=transaction.description,
-        amount=transaction.amount,
-        owner_id=owner_id,
-        category_id=transaction.category_id
-    )
-
-    db.add(db_transaction) # Adiciona a transação ao banco
-    db.commit() # Salva os dados da transação no banco
-    db.refresh(db_transaction) # Atualiza a transação criada no Banco
-    return db_transaction # Retorna o objeto para a FastAPI
-
-def update_transaction(db: Session, db_transaction: models.Transaction, transaction_update: schemas.TransactionPatch):
+    values = {
+        "description": transaction.description,
+        "amount": transaction.amount,
+        "owner_id": owner_id,
+        "category_id": transaction.category_id,
+        "created_at": datetime.now(),
+    }
+
+    try:
+        # Cria a transação e já recebe a linha gravada
+        created_transaction = db.execute(
+            insert(models.Transaction).values(**values).returning(*TRANSACTION_COLUMNS)
+        ).one()
+
+        # Atualiza o resumo mensal na mesma transação do banco
+        deltas = rollups.RollupDeltas()
+        deltas.add(owner_id, transaction.category_id, values["created_at"], transaction.amount)
+        rollups.apply_deltas(db, deltas)
+        versions.bump(db, [versions.user_key(owner_id)]) # Invalida o ETag da listagem de transações
+        changefeed.record(db, "created", [created_transaction]) # Depois do bump (ver changefeed.record)
+
+        db.commit() # Salva os dados da transação no banco
+    except IntegrityError as exc:
+        db.rollback()
+        raise _foreign_key_error(db, exc, owner_id) from exc
+
+    return created_transaction # Retorna a linha para a FastAPI
+
+# Cria as transações de várias requisições com um único commit (group commit).
+# Usuários e categorias são validados em conjunto (uma consulta para cada) e as
+# linhas válidas entram em um INSERT de várias linhas com RETURNING. Devolve, na
+# ordem recebida, a linha criada ou o erro (ForeignKeyNotFound) de cada item.
+def create_transactions_batch(db: Session, items: List[Dict[str, Any]]) -> List[Any]:
+    existing_users = set(db.scalars(select(models.User.id).where(models.User.id.in_({item["owner_id"] for item in items}))))
+    existing_categories = get_existing_category_ids(db, {item["category_id"] for item in items})
+
+    results: List[Any] = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        if item["owner_id"] not in existing_users:
+            results[index] = ForeignKeyNotFound("User")
+        elif item["category_id"] not in existing_categories:
+            results[index] = ForeignKeyNotFound("Category")
+        else:
+            valid.append(index)
+
+    if not valid:
+        db.rollback()
+        return results
+
+    stmt = insert(models.Transaction).returning(*TRANSACTION_COLUMNS, sort_by_parameter_order=True)
+    try:
+        rows = db.execute(stmt, [items[index] for index in valid]).all()
+    except IntegrityError:
+        #? Algo sumiu entre a validação e o INSERT (ou a categoria estava no cache e foi
+        #? excluída): grava um item por vez, cada um em um savepoint, para isolar o erro
+        db.rollback()
+        rows = []
+        for index in valid:
+            try:
+                with db.begin_nested():
+                    rows.append(db.execute(insert(models.Transaction).values(**items[index]).returning(*TRANSACTION_COLUMNS)).one())
+            except IntegrityError as exc:
+                rows.append(_foreign_key_error(db, exc, items[index]["owner_id"]))
+
+    deltas = rollups.RollupDeltas()
+    for index, row in zip(valid, rows):
+        results[index] = row
+        if not isinstance(row, Exception):
+            deltas.add(row.owner_id, row.category_id, row.created_at, row.amount)
+
+    if deltas.has_changes():
+        rollups.apply_deltas(db, deltas)
+        versions.bump(db, {versions.user_key(row.owner_id) for row in rows if not isinstance(row, Exception)})
+        changefeed.record(db, "created", [row for row in rows if not isinstance(row, Exception)])
+    db.commit()
+    return results
+
+# Quantidade de linhas enviadas por INSERT na importação em lote
+BULK_INSERT_BATCH_SIZE = 5000
+
+# Pega quais dos IDs de categoria existem. Usa a lista em cache e só vai ao
+# banco (em uma única consulta) para os IDs que não estão nela.
+# Com cached=False tudo vem do banco (ex.: o cache tinha uma categoria já excluída).
+def get_existing_category_ids(db: Session, category_ids, cached: bool = True) -> set:
+    category_ids = set(category_ids)
+    if not category_ids:
+        return set()
+
+    cached_ids = {category.id for category in get_cached_categories(db)} if cached else set()
+    existing = category_ids & cached_ids
+    missing = category_ids - cached_ids
+    if missing:
+        existing |= set(db.scalars(select(models.Category.id).where(models.Category.id.in_(missing))))
+    return existing
+
+# Cria várias transações de uma vez (POST em lote)
+# Cada item é um dicionário com description, amount, category_id, owner_id e created_at.
+# Os INSERTs são enviados em lotes (executemany) e tudo é salvo com um único commit.
+# Se um usuário ou categoria não existir, nada é gravado e a chave estrangeira vira ForeignKeyNotFound.
+def bulk_create_transactions(db: Session, transactions: List[Dict[str, Any]]) -> int:
+    try:
+        deltas = rollups.RollupDeltas()
+        for start in range(0, len(transactions), BULK_INSERT_BATCH_SIZE):
+            batch = transactions[start:start + BULK_INSERT_BATCH_SIZE]
+            db.execute(insert(models.Transaction), batch)
+            for item in batch:
+                deltas.add(item["owner_id"], item["category_id"], item["created_at"], item["amount"])
+
+        rollups.apply_deltas(db, deltas) # Um upsert por (usuário, categoria, mês) do lote
+        versions.bump(db, {versions.user_key(item["owner_id"]) for item in transactions})
+        changefeed.record_reload(db, {item["owner_id"] for item in transactions}) # Um 'reload' por usuário, não um evento por linha
+        db.commit() # Salva todas as transações no banco de uma vez
+    except IntegrityError as exc:
+        db.rollback()
+        owner_ids = {item["owner_id"] for item in transactions}
+        #? Com vários usuários no lote não dá para apontar qual referência sumiu
+        raise (_foreign_key_error(db, exc, owner_ids.pop()) if len(owner_ids) == 1 else exc) from exc
+    return len(transactions)
+
+# Atualiza uma transação de um usuário (PATCH)
+# UPDATE ... RETURNING devolve a linha nova; a linha antiga só é lida (com lock)
+# quando o valor ou a categoria mudam, pois o resumo mensal precisa dela.
+def update_transaction(db: Session, user_id: int, transaction_id: int, transaction_update: schemas.TransactionPatch):
     # Adiciona em um dicionário apenas os campos que vieram preenchidos.
     transaction_data = transaction_update.model_dump(exclude_unset=True, exclude_none=True) 
 
-    # Atualiza os valores
-    for key, value in transaction_data.items(): 
-        setattr(db_transaction, key, value)
-
-    db.commit() # Salva no banco
-    db.refresh(db_transaction) # Atualiza uma transação de um usuário no Banco
-    return db_transaction
+    if not transaction_data:
+        return get_transaction_by_user(db, user_id=user_id, transaction_id=transaction_id)
+
+    belongs_to_user = and_(models.Transaction.owner_id == user_id, models.Transaction.id == transaction_id)
+    deltas = rollups.RollupDeltas()
+
+    try:
+        # Tira o valor antigo do resumo mensal antes de alterar
+        if "amount" in transaction_data or "category_id" in transaction_data:
+            old = db.execute(
+                select(models.Transaction.category_id, models.Transaction.amount, models.Transaction.created_at)
+                .where(belongs_to_user)
+                .with_for_update()
+            ).one_or_none()
+            if old is None:
+                db.rollback()
+                return None
+            deltas.remove(user_id, old.category_id, old.created_at, old.amount)
+
+        # Atualiza os valores e já recebe a linha atualizada
+        updated_transaction = db.execute(
+            update(models.Transaction)
+            .where(belongs_to_user)
+            .values(**transaction_data)
+            .returning(*TRANSACTION_COLUMNS)
+            .execution_options(synchronize_session=False)
+        ).one_or_none()
+
+        if updated_transaction is None:
+            db.rollback()
+            return None
+
+        # Soma o valor novo no resumo mensal
+        if deltas.has_changes():
+            deltas.add(user_id, updated_transaction.category_id, updated_transaction.created_at, updated_transaction.amount)
+            rollups.apply_deltas(db, deltas)
+
+        versions.bump(db, [versions.user_key(user_id)])
+        changefeed.record(db, "updated", [updated_transaction])
+        db.commit() # Salva no banco
+    except IntegrityError as exc:
+        db.rollback()
+        raise _foreign_key_error(db, exc, user_id) from exc
+
+    return updated_transaction
 
 
 # Deleta uma transação (DELETE)
+# Um único DELETE ... RETURNING: a linha removida traz o que o resumo mensal precisa.
 def delete_transaction(user_id:int, transaction_id:int, db: Session):
-    # Filtra a query do banco pelo id do usuario e id de transação igual ao do Banco.
-    transaction = db.query(models.Transaction).filter(
-        models.Transaction.owner_id == user_id, 
-        models.Transaction.id == transaction_id
-        ).first()
-    
-    if transaction is None:
+    # Filtra pelo id do usuario e id de transação igual ao do Banco.
+    del_transaction = db.execute(
+        delete(models.Transaction)
+        .where(models.Transaction.owner_id == user_id, models.Transaction.id == transaction_id)
+        .returning(*TRANSACTION_COLUMNS)
+        .execution_options(synchronize_session=False)
+    ).one_or_none()
+
+    if del_transaction is None:
+        db.rollback()
         return None
-    
-    del_transaction = transaction
 
-    db.delete(del_transaction) # Deleta a informação
+    # Tira a transação do resumo mensal
+    deltas = rollups.RollupDeltas()
+    deltas.remove(del_transaction.owner_id, del_transaction.category_id, del_transaction.created_at, del_transaction.amount)
+    rollups.apply_deltas(db, deltas)
+    versions.bump(db, [versions.user_key(user_id)])
+    changefeed.record(db, "deleted", [del_transaction])
+
     db.commit() # Salva no banco
 
     return del_transaction
 
 
+### ============ Funções de Resumo (SUMMARY) ============ ###
+
+# Soma as transações de um usuário por categoria ou por mês a partir dos resumos mensais (GET)
+# O período é em meses inteiros: 'start' é o primeiro dia de um mês e 'end' o último (o endpoint valida).
+def get_summary(db: Session, user_id: int, group_by: str, start: Optional[date] = None, end: Optional[date] = None):
+    rollup = models.TransactionRollup
+    group_column = rollup.category_id if group_by == "category" else rollup.month
+
+    query = db.query(
+        group_column,
+        func.sum(rollup.total_amount).label("total"),
+        func.sum(rollup.transaction_count).label("count"),
+    ).filter(rollup.owner_id == user_id)
+
+    if start is not None:
+        query = query.filter(rollup.month >= rollups.month_of(start))
+    if end is not None:
+        query = query.filter(rollup.month <= rollups.month_of(end))
+
+    return query.group_by(group_column).having(func.sum(rollup.transaction_count) > 0).order_by(group_column).all()
+
+
 ### ============ Funções de CRUD (CATEGORIES) ============ ###
 
 # Pega todas as categorias (GET)
 def get_all_categories(db: Session):
-    return db.query(models.Category).all()
+    return db.connection().execute(select(*CATEGORY_COLUMNS).order_by(models.Category.id)).all()
 
 # Pega a categoria pelo ID (GET)
 def get_category_by_id(db: Session, category_id: int):
@@ -131,38 +544,146 @@ def get_category_by_name(db: Session, category_name: str):
     # Busca uma categoria pelo ID
     return db.query(models.Category).filter(models.Category.name == category_name).first()
 
+# Pega a versão das categorias, a lista delas e o JSON da lista, carregados juntos e guardados
+# numa única entrada do cache: o ETag sempre corresponde ao corpo devolvido.
+# O cache guarda cópias (CategorySchema), não objetos ORM ligados a uma sessão.
+def get_cached_categories_snapshot(db: Session) -> Tuple[int, List[schemas.CategorySchema], bytes]:
+    def load():
+        #? A versão é lida antes das linhas: o corpo nunca é mais antigo que o ETag
+        version = versions.get_versions(db, [versions.CATEGORIES_KEY])[versions.CATEGORIES_KEY]
+        categories = [schemas.CategorySchema.model_validate(category, from_attributes=True) for category in get_all_categories(db)]
+        return version, categories, fastjson.dumps_models(categories)
+    return category_cache.get_or_load(("all",), load)
+
+# Pega todas as categorias passando pelo cache (GET)
+def get_cached_categories(db: Session) -> List[schemas.CategorySchema]:
+    return get_cached_categories_snapshot(db)[1]
+
+# Pega a versão das categorias e a lista delas já em JSON (bytes) (GET)
+def get_cached_categories_json(db: Session) -> Tuple[int, bytes]:
+    version, _, payload = get_cached_categories_snapshot(db)
+    return version, payload
+
+# Pega a versão das categorias e as categorias de 'category_ids' em JSON, a partir da lista
+# em cache: com o cache quente, a busca em lote (GET ?ids=) não consulta o banco
+def get_cached_categories_by_ids_json(db: Session, category_ids: List[int]) -> Tuple[int, bytes]:
+    version, categories, _ = get_cached_categories_snapshot(db)
+    wanted = set(category_ids)
+    return version, fastjson.dumps_models(category for category in categories if category.id in wanted)
+
+# Pega a categoria pelo ID passando pelo cache (GET)
+def get_cached_category(db: Session, category_id: int) -> Optional[schemas.CategorySchema]:
+    def load():
+        category = get_category_by_id(db, category_id=category_id)
+        return None if category is None else schemas.CategorySchema.model_validate(category, from_attributes=True)
+    return category_cache.get_or_load(("id", category_id), load)
+
+# Pega a categoria pelo nome passando pelo cache (GET)
+def get_cached_category_by_name(db: Session, category_name: str) -> Optional[schemas.CategorySchema]:
+    def load():
+        category = get_category_by_name(db, category_name=category_name)
+        return None if category is None else schemas.CategorySchema.model_validate(category, from_attributes=True)
+    return category_cache.get_or_load(("name", category_name), load)
+
 # Cria uma categoria (POST)
 def create_category(db: Session, category: schemas.CategoryCreate):
         
     # Criando uma nova categoria
     db_category = models.Category(name=category.name)
     db.add(db_category) # Adiciona a categoria ao banco.
+    versions.bump(db, [versions.CATEGORIES_KEY]) # Invalida o ETag das categorias (e das listagens de transações)
+    notify(db, CATEGORY_CACHE_CHANNEL) # Avisa os outros workers no commit
     db.commit() # Salva o banco
+    category_cache.clear() # Invalida o cache de categorias
     db.refresh(db_category) # Atualiza a categoria dentro do banco 
     return db_category
 
 # Atualiza uma categoria existente (PATCH)
-def update_category(db: Session, db_category: models.Category, category_update: schemas.CategoryPatch) -> Optional[models.Category]:
+# Um único UPDATE ... RETURNING: devolve None se a categoria não existir.
+def update_category(db: Session, category_id: int, category_update: schemas.CategoryPatch):
     # Adiciona em um dicionário apenas os campos que vieram preenchidos.
     category_data: Dict[str, Any] = category_update.model_dump(exclude_unset=True)
 
-    # Aplica a atualização
-    for key, value in category_data.items(): 
-        setattr(db_category, key, value)
+    if not category_data:
+        return get_category_by_id(db, category_id=category_id)
+
+    # Aplica a atualização e já recebe a linha atualizada
+    updated_category = db.execute(
+        update(models.Category)
+        .where(models.Category.id == category_id)
+        .values(**category_data)
+        .returning(models.Category.id, models.Category.name)
+        .execution_options(synchronize_session=False)
+    ).one_or_none()
 
+    if updated_category is None:
+        db.rollback()
+        return None
+
+    versions.bump(db, [versions.CATEGORIES_KEY]) # Invalida o ETag das categorias (e das listagens de transações)
+    notify(db, CATEGORY_CACHE_CHANNEL) # Avisa os outros workers no commit
     db.commit() # Salva no banco
-    db.refresh(db_category) # Atualiza uma alteração de uma categoria no Banco
-    return db_category
+    category_cache.clear() # Invalida o cache de categorias
+    return updated_category
 
 # Deleta uma categoria (DELETE)
+#? Como em delete_user: as transações da categoria saem pelo ON DELETE CASCADE do banco
 def delete_category(db: Session, category_id: int):
-    del_category = db.query(models.Category).filter(models.Category.id == category_id).first()
+    #? Donos das transações que o CASCADE vai apagar (lidos dos resumos antes que saiam também)
+    owner_ids = set()
+    if changefeed.CHANGE_FEED_ENABLED:
+        owner_ids = set(db.scalars(select(models.TransactionRollup.owner_id).where(models.TransactionRollup.category_id == category_id).distinct()))
+
+    deleted_category = db.execute(
+        delete(models.Category)
+        .where(models.Category.id == category_id)
+        .returning(models.Category.id, models.Category.name)
+        .execution_options(synchronize_session=False)
+    ).one_or_none()
+
+    if deleted_category is None:
+        db.rollback()
+        return None
+
+    db.query(models.TransactionRollup).filter(models.TransactionRollup.category_id == category_id).delete(synchronize_session=False) # Remove os resumos da categoria
+    versions.bump(db, [versions.CATEGORIES_KEY, *map(versions.user_key, owner_ids)]) # Invalida o ETag das categorias (e das listagens de transações)
+    changefeed.record_reload(db, owner_ids)
+    notify(db, CATEGORY_CACHE_CHANNEL) # Avisa os outros workers no commit
+    db.commit()
+    category_cache.clear() # Invalida o cache de categorias
+    return deleted_category
+
+
+### ============ Funções de CRUD (PURGE JOBS) ============ ###
 
-    if del_category is None:
+# Coluna das transações que aponta para o alvo de cada tipo de job
+PURGE_TARGETS = {
+    "user": (models.User, models.Transaction.owner_id),
+    "category": (models.Category, models.Transaction.category_id),
+}
+
+# Registra a exclusão em segundo plano de um usuário ou categoria (DELETE ?mode=async).
+# Se já existir um job em andamento para o mesmo alvo, devolve esse job.
+def create_purge_job(db: Session, resource: str, resource_id: int):
+    model, column = PURGE_TARGETS[resource]
+    if db.scalar(select(model.id).where(model.id == resource_id)) is None:
         return None
 
-    deleted_category = del_category
-    
-    db.delete(del_category)
+    job = db.query(models.PurgeJob).filter(
+        models.PurgeJob.resource == resource,
+        models.PurgeJob.resource_id == resource_id,
+        models.PurgeJob.status.in_(("pending", "running")),
+    ).first()
+    if job is not None:
+        return job
+
+    total = db.scalar(select(func.count()).select_from(models.Transaction).where(column == resource_id))
+    job = models.PurgeJob(resource=resource, resource_id=resource_id, status="pending", total=total, deleted=0)
+    db.add(job)
     db.commit()
-    return deleted_category
\ No newline at end of file
+    db.refresh(job)
+    return job
+
+# Pega o andamento de um job de exclusão (GET)
+def get_purge_job(db: Session, job_id: int):
+    return db.get(models.PurgeJob, job_id)
@@ -0,0 +1,198 @@
+"""
+Versões assíncronas das funções de CRUD (usadas com AsyncSession).
+
+As leituras são consultas nativas assíncronas. As escritas reaproveitam as
+funções do 'crud' através de 'AsyncSession.run_sync', assim a regra de negócio
+de cada escrita continua existindo em um lugar só.
+"""
+from sqlalchemy import select
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional, Sequence, Tuple
+from datetime import date
+
+from . import crud, fastjson, models, schemas, versions
+from .cache import MISSING, category_cache
+
+
+### ============ Funções de CRUD (USER) ============ ###
+
+# Pega todos usuários (GET)
+async def get_users(db: AsyncSession):
+    connection = await db.connection()
+    return (await connection.execute(select(*crud.USER_COLUMNS).order_by(models.User.id))).all()
+
+# Pega vários usuários de uma vez, em uma consulta (GET ?ids=)
+async def get_users_by_ids(db: AsyncSession, user_ids: List[int]):
+    connection = await db.connection()
+    return (await connection.execute(select(*crud.USER_COLUMNS).where(models.User.id.in_(user_ids)).order_by(models.User.id))).all()
+
+# Pega um usuário específico (GET)
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.scalar(select(models.User).where(models.User.id == user_id))
+
+# Pega um usuario pelo email (GET)
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(models.User).where(models.User.email == email))
+
+# Cria um usuario (POST)
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    return await db.run_sync(crud.create_user, user=user)
+
+# Atualiza um usuario (PATCH)
+async def update_user(db: AsyncSession, user_id: int, user_update: schemas.UserPatch):
+    return await db.run_sync(crud.update_user, user_id=user_id, user_update=user_update)
+
+# Deleta um usuario (DELETE)
+async def delete_user(db: AsyncSession, user_id: int):
+    return await db.run_sync(crud.delete_user, user_id=user_id)
+
+
+### ============ Funções de CRUD (TRANSACTIONS) ============ ###
+
+# Versões das chaves (as que não existem valem 0)
+async def _get_versions(db: AsyncSession, keys: List[str]) -> Dict[str, int]:
+    found = dict((await db.execute(versions.select_versions(keys))).all())
+    return {key: found.get(key, 0) for key in keys}
+
+# Versões que definem a listagem de transações de um usuário (GET)
+async def get_transaction_list_versions(db: AsyncSession, user_id: int) -> Dict[str, int]:
+    return await _get_versions(db, [versions.user_key(user_id), versions.CATEGORIES_KEY])
+
+# Pega todas as transações, opcionalmente de um período (GET)
+async def get_all_transactions_by_user(
+    db: AsyncSession, user_id: int, start: Optional[date] = None, end: Optional[date] = None, expand: Sequence[str] = ()
+):
+    stmt = select(*crud.TRANSACTION_COLUMNS).where(models.Transaction.owner_id == user_id, *crud.created_between(start, end))
+    connection = await db.connection()
+    return (await connection.execute(crud.expand_statement(stmt, expand))).all()
+
+# Pega uma página de transações de um usuário ordenada por (created_at, id) (GET)
+async def get_transactions_page(
+    db: AsyncSession, user_id: int, limit: int, after: Optional[str] = None, start: Optional[date] = None, end: Optional[date] = None,
+    expand: Sequence[str] = (),
+) -> Tuple[List[Row], Optional[str]]:
+    stmt = select(*crud.TRANSACTION_COLUMNS).where(models.Transaction.owner_id == user_id, *crud.created_between(start, end))
+    stmt = crud.page_statement(crud.expand_statement(stmt, expand), limit, after)
+    connection = await db.connection()
+    return crud.split_page(list((await connection.execute(stmt)).all()), limit)
+
+# Busca transações de um usuário, paginada por cursor (GET)
+async def search_transactions(
+    db: AsyncSession, user_id: int, limit: int, after: Optional[str] = None, expand: Sequence[str] = (), **filters
+) -> Tuple[List[Row], Optional[str]]:
+    connection = await db.connection()
+    stmt = crud.search_statement(connection.dialect.name, user_id, **filters)
+    stmt = crud.page_statement(crud.expand_statement(stmt, expand), limit, after)
+    return crud.split_page(list((await connection.execute(stmt)).all()), limit)
+
+# Pega uma transação de um usuário (GET)
+async def get_transaction_by_user(db: AsyncSession, user_id: int, transaction_id: int):
+    return await db.scalar(
+        select(models.Transaction).where(models.Transaction.owner_id == user_id, models.Transaction.id == transaction_id)
+    )
+
+# Pega uma transação de um usuário com os objetos pedidos em '?expand' (GET)
+async def get_transaction_row(db: AsyncSession, user_id: int, transaction_id: int, expand: Sequence[str] = ()) -> Optional[Row]:
+    stmt = select(*crud.TRANSACTION_COLUMNS).where(models.Transaction.owner_id == user_id, models.Transaction.id == transaction_id)
+    connection = await db.connection()
+    return (await connection.execute(crud.expand_statement(stmt, expand))).first()
+
+# Cria uma transação (POST)
+async def create_transaction(db: AsyncSession, transaction: schemas.TransactionCreate, owner_id: int):
+    return await db.run_sync(crud.create_transaction, transaction=transaction, owner_id=owner_id)
+
+# Atualiza uma transação (PATCH)
+async def update_transaction(db: AsyncSession, user_id: int, transaction_id: int, transaction_update: schemas.TransactionPatch):
+    return await db.run_sync(crud.update_transaction, user_id=user_id, transaction_id=transaction_id, transaction_update=transaction_update)
+
+# Deleta uma transação (DELETE)
+async def delete_transaction(user_id: int, transaction_id: int, db: AsyncSession):
+    return await db.run_sync(lambda sync_db: crud.delete_transaction(user_id=user_id, transaction_id=transaction_id, db=sync_db))
+
+
+### ============ Funções de CRUD (CATEGORIES) ============ ###
+
+# Pega todas as categorias (GET)
+async def get_all_categories(db: AsyncSession):
+    connection = await db.connection()
+    return (await connection.execute(select(*crud.CATEGORY_COLUMNS).order_by(models.Category.id))).all()
+
+# Pega a categoria pelo ID (GET)
+async def get_category_by_id(db: AsyncSession, category_id: int):
+    return await db.scalar(select(models.Category).where(models.Category.id == category_id))
+
+# Pega a categoria pelo nome (GET)
+async def get_category_by_name(db: AsyncSession, category_name: str):
+    return await db.scalar(select(models.Category).where(models.Category.name == category_name))
+
+# Lê do cache de categorias e, se não tiver, busca no banco com 'load' e guarda uma cópia
+async def _cached(key, load):
+    cached = category_cache.get(key)
+    if cached is not MISSING:
+        return cached
+    generation = category_cache.generation # Lida antes do 'load' (ver TTLCache.set)
+    value = await load()
+    if value is not None:
+        category_cache.set(key, value, generation=generation)
+    return value
+
+# Pega a versão das categorias, a lista delas e o JSON da lista numa única entrada do cache (ver crud)
+async def get_cached_categories_snapshot(db: AsyncSession) -> Tuple[int, List[schemas.CategorySchema], bytes]:
+    async def load():
+        version = (await _get_versions(db, [versions.CATEGORIES_KEY]))[versions.CATEGORIES_KEY] # Antes das linhas
+        categories = [schemas.CategorySchema.model_validate(category, from_attributes=True) for category in await get_all_categories(db)]
+        return version, categories, fastjson.dumps_models(categories)
+    return await _cached(("all",), load)
+
+# Pega todas as categorias passando pelo cache (GET)
+async def get_cached_categories(db: AsyncSession) -> List[schemas.CategorySchema]:
+    return (await get_cached_categories_snapshot(db))[1]
+
+# Pega a versão das categorias e a lista delas já em JSON (bytes) (GET)
+async def get_cached_categories_json(db: AsyncSession) -> Tuple[int, bytes]:
+    version, _, payload = await get_cached_categories_snapshot(db)
+    return version, payload
+
+# Pega a versão das categorias e as categorias de 'category_ids' em JSON, a partir da lista em cache (GET ?ids=)
+async def get_cached_categories_by_ids_json(db: AsyncSession, category_ids: List[int]) -> Tuple[int, bytes]:
+    version, categories, _ = await get_cached_categories_snapshot(db)
+    wanted = set(category_ids)
+    return version, fastjson.dumps_models(category for category in categories if category.id in wanted)
+
+# Pega a categoria pelo ID passando pelo cache (GET)
+async def get_cached_category(db: AsyncSession, category_id: int) -> Optional[schemas.CategorySchema]:
+    async def load():
+        category = await get_category_by_id(db, category_id=category_id)
+        return None if category is None else schemas.CategorySchema.model_validate(category, from_attributes=True)
+    return await _cached(("id", category_id), load)
+
+# Pega a categoria pelo nome passando pelo cache (GET)
+async def get_cached_category_by_name(db: AsyncSession, category_name: str) -> Optional[schemas.CategorySchema]:
+    async def load():
+        category = await get_category_by_name(db, category_name=category_name)
+        return None if category is None else schemas.CategorySchema.model_validate(category, from_attributes=True)
+    return await _cached(("name", category_name), load)
+
+# Cria uma categoria (POST)
+async def create_category(db: AsyncSession, category: schemas.CategoryCreate):
+    return await db.run_sync(crud.create_category, category=category)
+
+# Atualiza uma categoria existente (PATCH)
+async def update_category(db: AsyncSession, category_id: int, category_update: schemas.CategoryPatch):
+    return await db.run_sync(crud.update_category, category_id=category_id, category_update=category_update)
+
+# Deleta uma categoria (DELETE)
+async def delete_category(db: AsyncSession, category_id: int):
+    return await db.run_sync(crud.delete_category, category_id=category_id)
+
+
+### ============ Funções de CRUD (PURGE JOBS) ============ ###
+
+# Registra a exclusão em segundo plano (DELETE ?mode=async)
+async def create_purge_job(db: AsyncSession, resource: str, resource_id: int):
+    return await db.run_sync(crud.create_purge_job, resource=resource, resource_id=resource_id)
+
+# Pega o andamento de um job de exclusão (GET)
+async def get_purge_job(db: AsyncSession, job_id: int):
+    return await db.get(models.PurgeJob, job_id)
@@ -1,20 +1,247 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
+from fastapi import Request, Response
+from starlette.datastructures import MutableHeaders
+from threading import Lock
+from typing import Optional
 import os
+import time
+
+from . import metrics
 
 DATABASE_URL=os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Réplica de leitura (opcional). Sem ela, leituras e escritas usam o mesmo banco
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+
+# Cria as tabelas direto pelos modelos ao iniciar (só para desenvolvimento local/testes).
+# Em produção a estrutura do banco vem das migrações: alembic upgrade head
+DATABASE_AUTO_CREATE = os.getenv("DATABASE_AUTO_CREATE", "false").lower() in ("1", "true", "yes")
+
+# Liga o modo assíncrono (AsyncEngine/AsyncSession) nos endpoints principais
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() in ("1", "true", "yes")
+
+#* Configuração do pool de conexões (valem para o primário e para a réplica)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1")) # Em segundos (-1 = nunca recicla)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+
+# Por quantos segundos, depois de uma escrita, as leituras do mesmo cliente/usuário vão para o primário
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+READ_PRIMARY_COOKIE = "read_primary"
+
+def _pool_options(url: str) -> dict:
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    #? SQLite em memória usa um pool de uma conexão só, que não aceita tamanho/overflow
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return options
+    options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    return options
+
+# O SQLite só aplica as chaves estrangeiras (e o ON DELETE CASCADE) com este PRAGMA ligado
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+# Troca o driver síncrono da URL pelo equivalente assíncrono (asyncpg / aiosqlite)
+def _to_async_url(url: str) -> str:
+    drivers = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in drivers:
+        return url
+    return parsed.set(drivername=drivers[backend]).render_as_string(hide_password=False)
+
+
+#* Os engines são criados só no primeiro uso (init_engines), não no import: importar
+#* o app (testes, --reload, scripts) não exige DATABASE_URL nem o driver do banco.
+#* As fábricas de sessão abaixo já existem e se ligam ao engine na primeira sessão.
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+class _LazySessionmaker(sessionmaker):
+    def __call__(self, **local_kw):
+        init_engines()
+        return super().__call__(**local_kw)
+
+class _LazyAsyncSessionmaker(async_sessionmaker):
+    def __call__(self, **local_kw):
+        init_engines()
+        return super().__call__(**local_kw)
+
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
+ReadSessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
+AsyncSessionLocal = _LazyAsyncSessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = _LazyAsyncSessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
-# Função de Dependência (Usada pelos endpoints)
-def get_db():
+_ENGINE_NAMES = ("engine", "read_engine", "async_engine", "async_read_engine", "ASYNC_DATABASE_URL", "ASYNC_DATABASE_REPLICA_URL")
+_init_lock = Lock()
+_initialized = False
+
+def init_engines():
+    global engine, read_engine, async_engine, async_read_engine, ASYNC_DATABASE_URL, ASYNC_DATABASE_REPLICA_URL, _initialized
+    if _initialized:
+        return
+    with _init_lock:
+        if _initialized:
+            return
+        if not DATABASE_URL:
+            raise RuntimeError("DATABASE_URL is not set")
+
+        engine = create_engine(DATABASE_URL, **_pool_options(DATABASE_URL))
+        read_engine = create_engine(DATABASE_REPLICA_URL, **_pool_options(DATABASE_REPLICA_URL)) if DATABASE_REPLICA_URL else engine
+
+        ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _to_async_url(DATABASE_URL)
+        ASYNC_DATABASE_REPLICA_URL = os.getenv("ASYNC_DATABASE_REPLICA_URL") or (_to_async_url(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None)
+
+        async_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_options(ASYNC_DATABASE_URL)) if DATABASE_ASYNC else None
+        async_read_engine = (
+            create_async_engine(ASYNC_DATABASE_REPLICA_URL, **_pool_options(ASYNC_DATABASE_REPLICA_URL))
+            if DATABASE_ASYNC and ASYNC_DATABASE_REPLICA_URL else async_engine
+        )
+
+        for sync_engine in {engine, read_engine} | {e.sync_engine for e in (async_engine, async_read_engine) if e is not None}:
+            if sync_engine.dialect.name == "sqlite":
+                event.listen(sync_engine, "connect", _enable_sqlite_foreign_keys)
+
+        SessionLocal.configure(bind=engine)
+        ReadSessionLocal.configure(bind=read_engine)
+        AsyncSessionLocal.configure(bind=async_engine)
+        AsyncReadSessionLocal.configure(bind=async_read_engine)
+        _initialized = True
+
+# 'from .database import engine' (e os outros engines) inicializa na hora do acesso
+def __getattr__(name: str):
+    if name in _ENGINE_NAMES:
+        init_engines()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+### ======= Leitura das próprias escritas (read-your-writes) ======= ###
+#* Depois de uma escrita, as leituras do mesmo cliente (cookie) ou do mesmo usuário
+#* (mapa em memória, por worker) vão para o primário até a réplica alcançar.
+
+_recent_writes: dict = {} # user_id -> instante (monotonic) até quando ler do primário
+_recent_writes_lock = Lock()
+
+#? A escrita só é marcada no estado da requisição: o ReadYourWritesMiddleware põe o cookie na
+#? resposta que for enviada, inclusive nas que o endpoint monta sozinho (202 do purge, json_response)
+def _mark_write(request: Request):
+    request.state.wrote_to_primary = True
+    user_id = request.path_params.get("user_id")
+    if user_id is None:
+        return
+    now = time.monotonic()
+    with _recent_writes_lock:
+        _recent_writes[str(user_id)] = now + READ_YOUR_WRITES_SECONDS
+        #? Limpa as entradas vencidas para o mapa não crescer sem limite
+        if len(_recent_writes) > 10000:
+            for key in [key for key, until in _recent_writes.items() if until <= now]:
+                del _recent_writes[key]
+
+# Para escritas gravadas fora do get_db (ex.: group commit): as próximas leituras vão para o primário
+def mark_write(request: Request):
+    init_engines()
+    if read_engine is not engine:
+        _mark_write(request)
+
+# Cabeçalho Set-Cookie do read_primary (montado com o set_cookie do Starlette)
+def _read_primary_cookie() -> str:
+    response = Response()
+    response.set_cookie(READ_PRIMARY_COOKIE, "1", max_age=max(int(READ_YOUR_WRITES_SECONDS), 1), httponly=True, samesite="lax")
+    return response.headers["set-cookie"]
+
+class ReadYourWritesMiddleware:
+    """Middleware ASGI que põe o cookie read_primary nas respostas das requisições que gravaram no primário."""
+
+    def __init__(self, app):
+        self.app = app
+        self.cookie = _read_primary_cookie()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and scope.get("state", {}).get("wrote_to_primary"):
+                MutableHeaders(scope=message).append("set-cookie", self.cookie)
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+def _reads_from_primary(request: Request) -> bool:
+    if request.cookies.get(READ_PRIMARY_COOKIE):
+        return True
+    user_id = request.path_params.get("user_id")
+    if user_id is None:
+        return False
+    with _recent_writes_lock:
+        until = _recent_writes.get(str(user_id))
+    return until is not None and until > time.monotonic()
+
+# Fábrica de sessões para uma leitura desta requisição (réplica, ou primário se o cliente escreveu há pouco)
+def read_sessionmaker(request: Request) -> sessionmaker:
+    init_engines()
+    if read_engine is engine or _reads_from_primary(request):
+        return SessionLocal
+    return ReadSessionLocal
+
+def _measure_pool_wait(db: Session):
+    #? Pega a conexão do pool já aqui para medir quanto tempo a requisição esperou por ela
+    started = time.perf_counter()
+    db.connection()
+    metrics.record_pool_wait(time.perf_counter() - started)
+
+# Função de Dependência (Usada pelos endpoints de escrita -> primário)
+def get_db(request: Request):
     db = SessionLocal() # Classe do Alchemy (Cria uma nova sessão do banco)
+    if read_engine is not engine:
+        event.listen(db, "after_commit", lambda session: _mark_write(request))
     try:
+        if metrics.METRICS_ENABLED:
+            _measure_pool_wait(db)
         yield db # Ele entrega a sessão do banco para fazermos um crud após pausa-la
     finally:
-        db.close() # Fecha a sessão do banco
\ No newline at end of file
+        db.close() # Fecha a sessão do banco
+
+# Função de Dependência para os endpoints só de leitura (GET) -> réplica
+def get_read_db(request: Request):
+    db = read_sessionmaker(request)()
+    try:
+        if metrics.METRICS_ENABLED:
+            _measure_pool_wait(db)
+        yield db
+    finally:
+        db.close()
+
+# Função de Dependência assíncrona (Usada pelos endpoints 'async def')
+async def get_async_db(request: Request):
+    async with AsyncSessionLocal() as db:
+        if async_read_engine is not async_engine:
+            event.listen(db.sync_session, "after_commit", lambda session: _mark_write(request))
+        if metrics.METRICS_ENABLED:
+            started = time.perf_counter()
+            await db.connection()
+            metrics.record_pool_wait(time.perf_counter() - started)
+        yield db
+
+async def get_async_read_db(request: Request):
+    init_engines()
+    factory = AsyncReadSessionLocal
+    if async_read_engine is async_engine or _reads_from_primary(request):
+        factory = AsyncSessionLocal
+    async with factory() as db:
+        if metrics.METRICS_ENABLED:
+            started = time.perf_counter()
+            await db.connection()
+            metrics.record_pool_wait(time.perf_counter() - started)
+        yield db
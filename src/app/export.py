@@ -0,0 +1,127 @@
+"""
+Exportação das transações em CSV, Apache Arrow (IPC stream) e Parquet.
+
+As linhas vêm do banco em lotes (cursor do lado do servidor com yield_per) como
+tuplas simples, sem criar objetos ORM nem modelos Pydantic por linha. Cada lote
+é convertido em colunas e escrito no formato pedido, então a memória usada fica
+limitada ao tamanho do lote, qualquer que seja o total exportado.
+
+Arrow e Parquet dependem do pacote 'pyarrow' (opcional).
+"""
+from typing import Iterable, Iterator, Sequence
+import csv
+import io
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError: # pragma: no cover - pyarrow é opcional
+    pa = None
+    pq = None
+
+# Colunas exportadas (mesma ordem do crud.TRANSACTION_COLUMNS)
+COLUMNS = ("id", "description", "amount", "created_at", "owner_id", "category_id")
+
+# Formatos aceitos: media type e extensão do arquivo
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def is_available(export_format: str) -> bool:
+    return export_format == "csv" or pa is not None
+
+
+class _ChunkSink:
+    """Arquivo em memória que entrega e descarta o que já foi escrito."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _csv(batches: Iterable[Sequence]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+
+    for rows in batches:
+        writer.writerows((row[0], row[1], row[2], row[3].isoformat(), row[4], row[5]) for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _arrow_schema():
+    return pa.schema([
+        ("id", pa.int64()),
+        ("description", pa.string()),
+        ("amount", pa.float64()),
+        ("created_at", pa.timestamp("us")),
+        ("owner_id", pa.int64()),
+        ("category_id", pa.int64()),
+    ])
+
+
+# Transforma um lote de tuplas em um RecordBatch (uma lista por coluna)
+def _record_batch(rows: Sequence, schema) -> "pa.RecordBatch":
+    columns = list(zip(*rows))
+    return pa.record_batch([pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema)
+
+
+def _arrow(batches: Iterable[Sequence]) -> Iterator[bytes]:
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+
+    with pa.ipc.new_stream(sink, schema) as writer:
+        yield sink.drain()
+        for rows in batches:
+            writer.write_batch(_record_batch(rows, schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _parquet(batches: Iterable[Sequence]) -> Iterator[bytes]:
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+
+    # Cada lote vira um row group; o rodapé do arquivo é escrito no close
+    with pq.ParquetWriter(sink, schema) as writer:
+        for rows in batches:
+            writer.write_batch(_record_batch(rows, schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+# Escreve os lotes de linhas no formato pedido, devolvendo os bytes aos poucos
+def write(export_format: str, batches: Iterable[Sequence]) -> Iterator[bytes]:
+    writers = {"csv": _csv, "arrow": _arrow, "parquet": _parquet}
+    for chunk in writers[export_format](batches):
+        if chunk:
+            yield chunk
@@ -0,0 +1,66 @@
+"""
+Serialização rápida das listagens: linhas (tuplas de colunas) direto para bytes JSON.
+
+O caminho padrão do FastAPI valida cada objeto ORM de novo pelos schemas Pydantic
+e só então gera o JSON. Aqui as linhas da consulta viram dicionários e o orjson
+gera os bytes de uma vez: mesmas chaves e ordem dos schemas, datas em ISO 8601 e
+JSON compacto em UTF-8.
+
+O JSON é equivalente ao do json padrão, mas não é igual byte a byte: os floats
+saem na forma do orjson (1e20, não 1e+20) e NaN/Infinity viram null (o json
+padrão recusava esses valores e a resposta dava 500).
+"""
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from fastapi.responses import Response
+import orjson
+
+
+# Monta os dicionários de linhas com objetos embutidos (?expand): as colunas
+# 'category.id', 'category.name'... viram {"category": {"id": ..., "name": ...}}.
+# Sem par no LEFT JOIN (id nulo) o objeto vira null.
+def _nested(fields: Sequence[str]) -> Callable[[Sequence], dict]:
+    flat = [(index, field) for index, field in enumerate(fields) if "." not in field]
+    groups: Dict[str, List[Tuple[int, str]]] = {}
+    for index, field in enumerate(fields):
+        if "." in field:
+            group, key = field.split(".", 1)
+            groups.setdefault(group, []).append((index, key))
+
+    def build(row: Sequence) -> dict:
+        item = {field: row[index] for index, field in flat}
+        for group, columns in groups.items():
+            item[group] = {key: row[index] for index, key in columns} if row[columns[0][0]] is not None else None
+        return item
+    return build
+
+# Converte linhas do SQLAlchemy (Row) em bytes JSON de uma lista de objetos
+def dumps_rows(rows: Sequence) -> bytes:
+    if not rows:
+        return b"[]"
+    #? zip com os nomes das colunas é bem mais rápido que Row._asdict() linha a linha
+    fields = rows[0]._fields
+    if any("." in field for field in fields):
+        build = _nested(fields)
+        return orjson.dumps([build(row) for row in rows])
+    return orjson.dumps([dict(zip(fields, row)) for row in rows])
+
+# Converte linhas do SQLAlchemy (Row) em NDJSON: um objeto JSON por linha, cada um terminado em \n
+def dumps_ndjson(rows: Sequence) -> bytes:
+    if not rows:
+        return b""
+    fields = rows[0]._fields
+    return b"".join(orjson.dumps(dict(zip(fields, row))) + b"\n" for row in rows)
+
+# Converte uma linha (Row) em bytes JSON de um objeto
+def dumps_row(row) -> bytes:
+    return orjson.dumps(_nested(row._fields)(row))
+
+# Converte modelos Pydantic (ex.: cópias guardadas no cache) em bytes JSON
+def dumps_models(items: Iterable) -> bytes:
+    return orjson.dumps([item.model_dump() for item in items])
+
+# Resposta com o JSON já pronto. O FastAPI não revalida nem reserializa um Response
+# devolvido pelo endpoint, então os headers extras precisam ir por aqui.
+def json_response(content: bytes, headers: Optional[Mapping[str, str]] = None) -> Response:
+    return Response(content=content, media_type="application/json", headers=headers)
@@ -0,0 +1,191 @@
+"""
+Group commit para a criação de transações (opcional).
+
+Com GROUP_COMMIT_ENABLED=true, o POST /api/users/{user_id}/transactions/ não abre
+uma sessão por requisição: a transação entra em uma fila e uma thread grava as
+que chegaram juntas em um único commit (crud.create_transactions_batch). O lote
+fecha quando chega a GROUP_COMMIT_MAX_BATCH itens ou quando o primeiro item esperou
+GROUP_COMMIT_MAX_WAIT_MS. Cada requisição recebe a própria linha criada (ou o
+próprio erro, 404), e o contrato do endpoint não muda.
+
+Um commit (e um flush do WAL) por lote em vez de um por requisição: mais vazão em
+picos de escrita, ao custo de até GROUP_COMMIT_MAX_WAIT_MS de latência a mais.
+Tamanho dos lotes, espera na fila e duração de cada gravação aparecem no /metrics.
+"""
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import datetime
+from queue import Empty, Queue
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import logging
+import os
+import time
+
+from fastapi import APIRouter, HTTPException, Request, status
+from sqlalchemy.orm import Session
+
+from . import crud, metrics, schemas
+from .database import SessionLocal, mark_write
+
+logger = logging.getLogger(__name__)
+
+GROUP_COMMIT_ENABLED = os.getenv("GROUP_COMMIT_ENABLED", "false").lower() in ("1", "true", "yes")
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "100"))
+GROUP_COMMIT_MAX_WAIT_MS = float(os.getenv("GROUP_COMMIT_MAX_WAIT_MS", "2"))
+
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+WAIT_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+BATCH_SIZE = metrics.Histogram("group_commit_batch_size", "Transactions written per group commit", buckets=BATCH_BUCKETS)
+QUEUE_WAIT = metrics.Histogram("group_commit_queue_wait_seconds", "Time a transaction waited in the queue before its batch was written", buckets=WAIT_BUCKETS)
+FLUSH_TIME = metrics.Histogram("group_commit_flush_seconds", "Time to validate, insert and commit one batch")
+
+
+@dataclass
+class _Pending:
+    values: Dict[str, Any]
+    future: Future = field(default_factory=Future)
+    enqueued: float = field(default_factory=time.perf_counter)
+
+
+class GroupCommitQueue:
+    """Fila de criação de transações gravadas em lotes por uma única thread."""
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal,
+                 max_batch: int = GROUP_COMMIT_MAX_BATCH, max_wait: float = GROUP_COMMIT_MAX_WAIT_MS / 1000):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "Queue[_Pending]" = Queue()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        self._lock = Lock()
+        self.batches = 0
+        self.items = 0
+        self.errors = 0 # Itens que voltaram com erro (ex.: usuário não existe)
+        self.failed_batches = 0 # Lotes em que o banco falhou (todos os itens recebem o erro)
+
+    def start(self):
+        with self._lock: # Várias requisições podem chegar juntas na primeira vez
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = Thread(target=self._run, name="group-commit", daemon=True)
+            self._thread.start()
+
+    # Para a thread depois de gravar o que ainda está na fila
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # Coloca uma transação na fila; o Future recebe a linha criada ou o erro
+    def submit(self, transaction: schemas.TransactionCreate, owner_id: int) -> Future:
+        pending = _Pending({
+            "description": transaction.description,
+            "amount": transaction.amount,
+            "owner_id": owner_id,
+            "category_id": transaction.category_id,
+            "created_at": datetime.now(),
+        })
+        self._queue.put(pending)
+        self.start()
+        return pending.future
+
+    # Versão bloqueante (para quem não está em um event loop, ex.: benchmarks)
+    def create(self, transaction: schemas.TransactionCreate, owner_id: int):
+        return self.submit(transaction, owner_id).result()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "errors": self.errors,
+                "failed_batches": self.failed_batches,
+                "average_batch": self.items / self.batches if self.batches else 0.0,
+                "queued": self._queue.qsize(),
+            }
+
+    # Junta o primeiro item com os que chegarem até o lote encher ou o prazo acabar
+    def _collect(self, first: _Pending) -> List[_Pending]:
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except Empty:
+                break
+        return batch
+
+    def _flush(self, batch: List[_Pending]):
+        started = time.perf_counter()
+        for pending in batch:
+            QUEUE_WAIT.observe(started - pending.enqueued)
+
+        try:
+            with self.session_factory() as db:
+                results = crud.create_transactions_batch(db, [pending.values for pending in batch])
+        except Exception as exc:
+            logger.exception("Group commit of %d transactions failed", len(batch))
+            results = [exc] * len(batch)
+            with self._lock:
+                self.failed_batches += 1
+
+        FLUSH_TIME.observe(time.perf_counter() - started)
+        BATCH_SIZE.observe(len(batch))
+        with self._lock:
+            self.batches += 1
+            self.items += len(batch)
+            self.errors += sum(isinstance(result, Exception) for result in results)
+
+        for pending, result in zip(batch, results):
+            if isinstance(result, Exception):
+                pending.future.set_exception(result)
+            else:
+                pending.future.set_result(result)
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=0.5)
+            except Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            self._flush(self._collect(first))
+
+
+queue = GroupCommitQueue()
+
+
+#? Contadores da fila no /metrics (os histogramas acima e os totais)
+def _group_commit_metrics():
+    for histogram in (BATCH_SIZE, QUEUE_WAIT, FLUSH_TIME):
+        yield from histogram.render()
+    stats = queue.stats()
+    for name in ("batches", "items", "errors", "failed_batches"):
+        yield f"# TYPE group_commit_{name}_total counter"
+        yield f"group_commit_{name}_total {stats[name]}"
+
+if GROUP_COMMIT_ENABLED:
+    metrics.register_collector(_group_commit_metrics)
+
+
+### ======= Endpoint (registrado no lugar do POST normal quando ligado) ======= ###
+
+router = APIRouter()
+
+@router.post("/api/users/{user_id}/transactions/", response_model=schemas.TransactionSchema, status_code=status.HTTP_201_CREATED)
+async def create_transaction_endpoint(user_id: int, transaction: schemas.TransactionCreate, request: Request):
+    try:
+        created_transaction = await asyncio.wrap_future(queue.submit(transaction, owner_id=user_id))
+    except crud.ForeignKeyNotFound as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{exc.resource} not found")
+
+    mark_write(request) # Leituras seguintes do cliente vão para o primário
+    return created_transaction
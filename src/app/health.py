@@ -0,0 +1,160 @@
+"""
+Inicialização do worker: aquecimento do pool e endpoints de saúde.
+
+- GET /health/live: o processo está de pé (sempre 200);
+- GET /health/ready: 200 quando o worker pode receber tráfego (aquecimento
+  concluído e banco respondendo); antes disso, ou se o banco falhar, 503.
+
+O aquecimento roda em segundo plano logo depois do startup, então o worker sobe
+sem esperar o banco: abre DB_POOL_WARMUP conexões do pool (no primário e na
+réplica) e executa em cada uma as consultas mais usadas com um id que não existe.
+Assim as primeiras requisições já encontram conexões abertas, o SQL compilado no
+cache do SQLAlchemy e, no modo assíncrono, os prepared statements do asyncpg.
+
+As duas respostas trazem os tempos de inicialização (import, startup, aquecimento),
+que também aparecem no /metrics como worker_startup_seconds.
+"""
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+import logging
+import os
+import time
+
+from fastapi import APIRouter, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from . import IMPORT_STARTED, crud, database, metrics
+
+logger = logging.getLogger(__name__)
+
+# Conexões abertas por engine no aquecimento (no máximo DB_POOL_SIZE; 0 desliga)
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", "2"))
+
+# Consultas das rotas mais chamadas (id 0 não existe: nenhuma linha é lida)
+HOT_STATEMENTS: List[Callable[[Session], Any]] = [
+    lambda db: crud.get_user(db, user_id=0),
+    lambda db: crud.get_transaction_list_versions(db, user_id=0),
+    lambda db: crud.get_all_transactions_by_user(db, user_id=0),
+    lambda db: crud.get_transactions_page(db, user_id=0, limit=1),
+    lambda db: crud.get_transaction_by_user(db, user_id=0, transaction_id=0),
+    lambda db: crud.get_summary(db, user_id=0, group_by="category"),
+    lambda db: crud.get_cached_categories_json(db), # Também carrega o cache de categorias
+]
+
+
+@dataclass
+class StartupState:
+    lifespan_started: Optional[float] = None
+    serving: Optional[float] = None # Fim do startup (o worker já aceita requisições)
+    warmed_up: Optional[float] = None
+    warmup_error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.warmed_up is not None
+
+    def timings(self) -> Dict[str, Optional[float]]:
+        def between(start: Optional[float], end: Optional[float]) -> Optional[float]:
+            return round(end - start, 4) if start is not None and end is not None else None
+        return {
+            "import_seconds": between(IMPORT_STARTED, self.lifespan_started),
+            "startup_seconds": between(self.lifespan_started, self.serving),
+            "warmup_seconds": between(self.serving, self.warmed_up),
+            "ready_seconds": between(IMPORT_STARTED, self.warmed_up),
+        }
+
+
+state = StartupState()
+
+
+def _pool_warmup_size(engine: Engine, connections: int) -> int:
+    pool_size = getattr(engine.pool, "size", None)
+    #? Pools sem tamanho (ex.: SQLite em memória) têm uma conexão só
+    return min(connections, pool_size()) if callable(pool_size) else min(connections, 1)
+
+
+# Abre as conexões ao mesmo tempo (para serem conexões diferentes) e roda as consultas em cada uma
+def warm_up_engine(engine: Engine, connections: int = DB_POOL_WARMUP):
+    sessions = []
+    try:
+        for _ in range(_pool_warmup_size(engine, connections)):
+            db = Session(bind=engine, autoflush=False)
+            sessions.append(db)
+            for statement in HOT_STATEMENTS:
+                statement(db) # A sessão segura a conexão até o fim (a próxima abre outra)
+    finally:
+        for db in sessions:
+            db.close() # Devolve as conexões ao pool (continuam abertas)
+
+
+async def warm_up_async_engine(engine, connections: int = DB_POOL_WARMUP):
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    sessions = []
+    try:
+        for _ in range(_pool_warmup_size(engine.sync_engine, connections)):
+            db = AsyncSession(bind=engine, autoflush=False)
+            sessions.append(db)
+            for statement in HOT_STATEMENTS:
+                await db.run_sync(statement)
+    finally:
+        for db in sessions:
+            await db.close()
+
+
+async def warm_up(connections: int = DB_POOL_WARMUP):
+    started = time.perf_counter()
+    try:
+        if connections > 0:
+            for engine in {database.engine, database.read_engine}:
+                await run_in_threadpool(warm_up_engine, engine, connections)
+            for engine in {database.async_engine, database.async_read_engine} - {None}:
+                await warm_up_async_engine(engine, connections)
+    except Exception as exc:
+        #? O worker fica pronto mesmo assim: o /health/ready ainda checa o banco a cada chamada
+        logger.exception("Connection pool warm-up failed")
+        state.warmup_error = str(exc)
+    state.warmed_up = time.perf_counter()
+    timings = state.timings()
+    logger.info(
+        "Worker ready in %.2fs (import %.2fs, startup %.2fs, warm-up %.2fs)",
+        timings["ready_seconds"], timings["import_seconds"] or 0, timings["startup_seconds"] or 0, time.perf_counter() - started,
+    )
+
+
+def _check_database():
+    with database.engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+
+#? Tempos de inicialização no /metrics
+def _startup_metrics():
+    yield "# TYPE worker_startup_seconds gauge"
+    for phase, seconds in state.timings().items():
+        if seconds is not None:
+            yield f'worker_startup_seconds{{phase="{phase[:-len("_seconds")]}"}} {seconds}'
+    yield "# TYPE worker_ready gauge"
+    yield f"worker_ready {int(state.ready)}"
+
+metrics.register_collector(_startup_metrics)
+
+
+router = APIRouter()
+
+@router.get("/health/live")
+async def live():
+    return {"status": "alive", **state.timings()}
+
+@router.get("/health/ready")
+async def ready():
+    if not state.ready:
+        return ORJSONResponse({"status": "warming_up", **state.timings()}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    try:
+        await run_in_threadpool(_check_database)
+    except Exception as exc:
+        return ORJSONResponse({"status": "database_unavailable", "detail": str(exc)}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return {"status": "ready", "warmup_error": state.warmup_error, **state.timings()}
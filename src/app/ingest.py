@@ -0,0 +1,81 @@
+"""
+Leitura dos arquivos de importação em lote de transações (JSON, NDJSON e CSV).
+"""
+import csv
+import io
+import itertools
+import json
+import os
+from typing import Any, Iterator, List, Tuple
+
+# Máximo de linhas por importação: um arquivo maior responde 413 (divida em várias importações)
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "10000"))
+
+# Content-Types aceitos pelo endpoint de importação em lote
+JSON_TYPES = ("application/json",)
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/jsonlines")
+CSV_TYPES = ("text/csv", "application/csv")
+
+
+class UnsupportedMediaType(ValueError):
+    pass
+
+
+class TooManyRecords(ValueError):
+    pass
+
+
+# Cada item é (número da linha, registro). O registro é None quando a linha não pôde ser lida.
+Record = Tuple[int, Any]
+
+
+def _parse_json(body: bytes) -> Iterator[Record]:
+    data = json.loads(body or b"[]")
+    if not isinstance(data, list):
+        raise ValueError("JSON body must be an array of transactions")
+    for row, item in enumerate(data, start=1):
+        yield row, item
+
+
+def _parse_ndjson(body: bytes) -> Iterator[Record]:
+    for row, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield row, json.loads(line)
+        except ValueError:
+            yield row, None
+
+
+def _parse_csv(body: bytes) -> Iterator[Record]:
+    reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+    # A linha 1 é o cabeçalho, então os dados começam na linha 2
+    for row, item in enumerate(reader, start=2):
+        # Campos vazios (ex.: created_at em branco) contam como não enviados
+        yield row, {key: value for key, value in item.items() if key and value not in ("", None)}
+
+
+def _parser_for(media_type: str):
+    if media_type in JSON_TYPES:
+        return _parse_json
+    if media_type in NDJSON_TYPES:
+        return _parse_ndjson
+    if media_type in CSV_TYPES:
+        return _parse_csv
+    raise UnsupportedMediaType(f"Unsupported content type '{media_type}'")
+
+
+# Escolhe o leitor a partir do Content-Type e devolve todas as linhas do arquivo.
+# A leitura para na linha BULK_MAX_ITEMS + 1, sem montar a lista inteira de um arquivo grande demais.
+def parse_records(body: bytes, content_type: str, max_items: int = None) -> List[Record]:
+    max_items = BULK_MAX_ITEMS if max_items is None else max_items
+    parser = _parser_for(content_type.split(";")[0].strip().lower())
+
+    try:
+        records = list(itertools.islice(parser(body), max_items + 1))
+    except csv.Error as exc:
+        raise ValueError(str(exc)) from exc
+
+    if len(records) > max_items:
+        raise TooManyRecords(f"At most {max_items} transactions per import")
+    return records
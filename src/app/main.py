@@ -1,21 +1,113 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Literal, Optional
+from datetime import date, datetime
+import asyncio
+import time
 
 # Meus módulos externos
 from . import crud
 from . import schemas # Schemas Pydantic
 from . import models # Modelos SQLAlchemy
-from .database import get_db, engine # get_db para dependência, engine para criação inicial
+from . import ingest # Leitura dos arquivos de importação em lote
+from . import export # Exportação em CSV / Arrow / Parquet
+from . import notifications # Sinais entre workers (LISTEN/NOTIFY)
+from . import metrics # Métricas por rota (Prometheus)
+from . import fastjson # JSON direto das linhas nas listagens
+from . import versions # ETags das listagens
+from . import rollups # Resumos mensais (/summary)
+from . import partitions # Partições mensais das transações (PostgreSQL)
+from . import purge # Exclusões grandes em segundo plano
+from . import group_commit # Criação de transações em lotes (group commit)
+from . import admission # Limites de concorrência e de escrita por usuário
+from . import changefeed # Feed de mudanças das transações (SSE)
+from .cache import category_cache
+from . import database
+from . import health # Aquecimento do pool e /health/ready
+from .database import get_db, get_read_db, read_sessionmaker, DATABASE_ASYNC, DATABASE_AUTO_CREATE # get_db para dependência
+
+#* Escuta os sinais dos outros workers (só no PostgreSQL com PG_NOTIFY_ENABLED)
+pg_listener = notifications.PgListener()
+pg_listener.subscribe(notifications.CATEGORY_CACHE_CHANNEL, lambda payload: category_cache.clear())
+if changefeed.CHANGE_FEED_ENABLED:
+    pg_listener.subscribe(changefeed.CHANGE_FEED_CHANNEL, changefeed.on_notify) # Eventos gravados em outros workers
+
+#? O import não toca no banco: engines, DDL e conexões só aqui, no startup de cada worker
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    health.state.lifespan_started = time.perf_counter()
+    database.init_engines()
+    engine = database.engine
+
+    #* Criando as tabelas do banco (só em desenvolvimento; em produção: alembic upgrade head)
+    if DATABASE_AUTO_CREATE:
+        models.Base.metadata.create_all(bind=engine)
+
+    #* Cria as partições mensais que faltam (do mês atual até PARTITION_MONTHS_AHEAD à frente)
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as connection:
+            if partitions.is_partitioned(connection):
+                partitions.ensure_partitions(connection)
+
+    if notifications.PG_NOTIFY_ENABLED and engine.dialect.name == "postgresql":
+        pg_listener.start(engine)
+    purge.worker.start() # Retoma os jobs de exclusão pendentes
+
+    #* Aquece o pool em segundo plano; o /health/ready responde 200 quando terminar
+    warm_up = asyncio.create_task(health.warm_up())
+    health.state.serving = time.perf_counter()
+    yield
+    warm_up.cancel()
+    purge.worker.stop()
+    group_commit.queue.stop() # Grava o que ainda estiver na fila
+    pg_listener.stop()
 
 app = FastAPI(
     title="Financial Control API",
     version="1.0.1",
-    description="API for managing users, transactions and categories"
+    description="API for managing users, transactions and categories",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse, # JSON com orjson em todas as respostas
 )
 
-#* Criando as tabelas do banco:
-models.Base.metadata.create_all(bind=engine)
+#* Leitura das próprias escritas: o cookie read_primary vai em qualquer resposta de uma requisição que gravou
+app.add_middleware(database.ReadYourWritesMiddleware)
+
+#* Controle de admissão: limita a concorrência por rota e as escritas por usuário (503/429 com Retry-After)
+#? Registrado antes do MetricsMiddleware, que fica por fora e mede também as recusas
+if admission.ADMISSION_ENABLED:
+    app.add_middleware(
+        admission.AdmissionMiddleware,
+        routes=app.router.routes,
+        exclude_paths=("/metrics", "/health/live", "/health/ready", "/api/admission/stats"),
+    )
+    app.include_router(admission.router)
+
+#* Latência, comandos SQL, tempo no banco e espera do pool por rota (exposto em /metrics)
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware, exclude_paths=("/metrics", "/health/live", "/health/ready"))
+
+#* Saúde do worker: /health/live e /health/ready
+app.include_router(health.router)
+
+#* Group commit: a criação de transações passa pela fila de group_commit.py
+#* (registrada antes, responde no lugar do POST definido abaixo)
+if group_commit.GROUP_COMMIT_ENABLED:
+    app.include_router(group_commit.router, include_in_schema=False)
+
+#* Feed de mudanças: GET /api/users/{user_id}/transactions/events (antes da rota /transactions/{transaction_id})
+if changefeed.CHANGE_FEED_ENABLED:
+    app.include_router(changefeed.router)
+
+#* Modo assíncrono: as rotas 'async def' são registradas primeiro e respondem
+#* no lugar das rotas síncronas equivalentes definidas abaixo.
+if DATABASE_ASYNC:
+    from . import api_async
+    app.include_router(api_async.router)
 
 # ==================================================== #  
 ### =============== Endpoints da API =============== ###
@@ -26,16 +118,21 @@ models.Base.metadata.create_all(bind=engine)
 
 
 #* Define o Endpoint para pegar as informações de todos usuarios (GET)
+#* Com '?ids=1,2,3' devolve só esses usuários (uma consulta; ids que não existem ficam de fora)
 @app.get("/api/users/", response_model=List[schemas.UserSchema])
-def get_users_endpoint(db: Session = Depends(get_db)):
-    users = crud.get_users(db)
-    
-    return users
+def get_users_endpoint(ids: Optional[str] = None, db: Session = Depends(get_read_db)):
+    try:
+        user_ids = None if ids is None else crud.parse_ids(ids)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    users = crud.get_users(db) if user_ids is None else crud.get_users_by_ids(db, user_ids)
+    return fastjson.json_response(fastjson.dumps_rows(users))
 
 #* Define o Endpoint para pegar as informações de usuário por email (GET)
 """#! ROTA ESPECIFICA -> VIR PRIMEIRO SEMPRE #!"""
 @app.get("/api/users/by_email/", response_model=schemas.UserSchema)
-def get_user_by_email_endpoint(email: str, db: Session = Depends(get_db)):
+def get_user_by_email_endpoint(email: str, db: Session = Depends(get_read_db)):
     user_by_email = crud.get_user_by_email(db, email=email)
 
     if user_by_email is None:
@@ -44,7 +141,7 @@ def get_user_by_email_endpoint(email: str, db: Session = Depends(get_db)):
 
 #* Define o Endpoint para pegar as informações de 1 User (GET)
 @app.get("/api/users/{user_id}/", response_model=schemas.UserSchema)
-def get_user_endpoint(user_id: int, db: Session = Depends(get_db)):
+def get_user_endpoint(user_id: int, db: Session = Depends(get_read_db)):
     user = crud.get_user(db, user_id=user_id)
 
     if user is None:
@@ -69,18 +166,24 @@ def create_user_endpoint(user: schemas.UserCreate, db: Session = Depends(get_db)
 #* Define o Endpoint para atualizar User (PATCH)
 @app.patch("/api/users/{user_id}/", response_model=schemas.UserPatch)
 def update_user_endpoint(user_id: int, user_update: schemas.UserPatch, db: Session = Depends(get_db)):
-    db_user = crud.get_user(db, user_id=user_id)
+    # Chamo o crud pra aplicar a atualização (UPDATE ... RETURNING)
+    updated_user = crud.update_user(db, user_id=user_id, user_update=user_update)
 
-    if db_user is None:
+    if updated_user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    
-    # Chamo o crud pra aplicar a atualização
-    updated_user = crud.update_user(db, db_user=db_user, user_update=user_update)
 
     return updated_user
 
-@app.delete("/api/users/{user_id}/", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user_endpoint(user_id: int, db: Session = Depends(get_db)):
+#? mode=async: as transações são apagadas em lotes em segundo plano (202 + job em /api/jobs/{job_id}/)
+@app.delete("/api/users/{user_id}/", status_code=status.HTTP_204_NO_CONTENT, responses={202: {"model": schemas.PurgeJobSchema}})
+def delete_user_endpoint(user_id: int, mode: Literal["sync", "async"] = "sync", db: Session = Depends(get_db)):
+    if mode == "async":
+        job = crud.create_purge_job(db, "user", user_id)
+        if job is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        purge.worker.submit(job.id)
+        return purge.accepted(job)
+
     deleted_user = crud.delete_user(db, user_id=user_id)
     if deleted_user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
@@ -91,19 +194,192 @@ def delete_user_endpoint(user_id: int, db: Session = Depends(get_db)):
 
 ### === Endpoints para o recurso 'Transactions' === ###
 
+STREAM_BATCH_SIZE = 1000
+EXPORT_BATCH_SIZE = 10000
 
-@app.get("/api/users/{user_id}/transactions/", response_model=List[schemas.TransactionSchema])
-def get_all_transactions_by_user_endpoint(user_id: int, db: Session = Depends(get_db)):
-    transactions = crud.get_all_transactions_by_user(db, user_id=user_id)
-    
-    return transactions
+
+# Gera o corpo NDJSON lote a lote. A sessão é aberta aqui dentro porque a
+# sessão do get_db já foi fechada quando o StreamingResponse começa a enviar.
+def _stream_transactions(session_factory, user_id: int, after: Optional[str]):
+    db = session_factory()
+    try:
+        for rows in crud.iter_transactions_by_user(db, user_id=user_id, batch_size=STREAM_BATCH_SIZE, after=after):
+            yield fastjson.dumps_ndjson(rows) # Mesmo formato do TransactionSchema, como as listagens
+    finally:
+        db.close()
+
+
+#* Define o Endpoint para exportar todas as transações de um usuário em NDJSON (GET)
+"""#! ROTA ESPECIFICA -> VIR PRIMEIRO SEMPRE #!"""
+@app.get("/api/users/{user_id}/transactions/stream")
+def stream_transactions_by_user_endpoint(request: Request, user_id: int, after: Optional[str] = None):
+    if after is not None:
+        try:
+            crud.decode_cursor(after)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    return StreamingResponse(_stream_transactions(read_sessionmaker(request), user_id, after), media_type="application/x-ndjson")
+
+
+# Gera o arquivo de exportação lote a lote (com sessão própria, como no /stream)
+def _export_transactions(session_factory, export_format: str, user_id: Optional[int], start: Optional[date], end: Optional[date]):
+    db = session_factory()
+    try:
+        batches = crud.iter_transactions_for_export(db, user_id=user_id, start=start, end=end, batch_size=EXPORT_BATCH_SIZE) # 'to' inclui o dia inteiro
+        yield from export.write(export_format, batches)
+    finally:
+        db.close()
+
+
+# Monta a resposta de exportação (400 se o formato não existe, 501 se depende do pyarrow e ele não está instalado)
+def _export_response(request: Request, export_format: str, filename: str, user_id: Optional[int], start: Optional[date], end: Optional[date]):
+    if export_format not in export.FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown format '{export_format}' (use {', '.join(export.FORMATS)})")
+    if not export.is_available(export_format):
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=f"Format '{export_format}' requires pyarrow")
+
+    media_type, extension = export.FORMATS[export_format]
+    return StreamingResponse(
+        _export_transactions(read_sessionmaker(request), export_format, user_id, start, end),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{extension}"'},
+    )
+
+
+#* Define o Endpoint para exportar as transações de um usuário em CSV / Arrow / Parquet (GET)
+"""#! ROTA ESPECIFICA -> VIR PRIMEIRO SEMPRE #!"""
+@app.get("/api/users/{user_id}/transactions/export")
+def export_transactions_by_user_endpoint(
+    request: Request,
+    user_id: int,
+    format: str = Query("csv", description="csv, arrow ou parquet"),
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+):
+    return _export_response(request, format, f"transactions-user-{user_id}", user_id, start, end)
+
+
+#* Define o Endpoint para buscar transações de um usuário (GET)
+#* 'q' busca na descrição (contém, sem diferenciar maiúsculas) pelo índice de texto;
+#* os demais filtros também vão para o SQL. Paginado por cursor como a listagem.
+#* Aceita '?expand=category,owner' como a listagem.
+"""#! ROTA ESPECIFICA -> VIR PRIMEIRO SEMPRE #!"""
+@app.get("/api/users/{user_id}/transactions/search", response_model=List[schemas.TransactionExpandedSchema])
+def search_transactions_endpoint(
+    user_id: int,
+    request: Request,
+    q: Optional[str] = Query(None, min_length=1, max_length=200),
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    category_id: Optional[int] = None,
+    limit: int = Query(crud.DEFAULT_PAGE_SIZE, ge=1, le=crud.MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    expand: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    try:
+        expand_names = crud.parse_expand(expand)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    etag = versions.make_etag(crud.get_transaction_list_versions(db, user_id=user_id), request.url.query)
+    if versions.etag_matches(request.headers.get("if-none-match"), etag):
+        return versions.not_modified(etag)
+
+    try:
+        transactions, next_cursor = crud.search_transactions(
+            db, user_id=user_id, limit=limit, after=after, expand=expand_names,
+            q=q, min_amount=min_amount, max_amount=max_amount, start=start, end=end, category_id=category_id,
+        )
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    headers = {"ETag": etag}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    return fastjson.json_response(fastjson.dumps_rows(transactions), headers=headers)
+
+
+#* Define o Endpoint para exportar as transações de todos os usuários em um período (GET)
+@app.get("/api/transactions/export")
+def export_transactions_endpoint(
+    request: Request,
+    format: str = Query("csv", description="csv, arrow ou parquet"),
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+):
+    return _export_response(request, format, "transactions", None, start, end)
+
+
+#* Define o Endpoint para listar as transações de um usuário (GET)
+#* Sem 'limit'/'after' devolve a lista completa; com eles pagina por cursor e
+#* devolve o cursor da próxima página no header 'X-Next-Cursor'.
+#* '?expand=category,owner' embute a categoria e/ou o dono em cada transação
+#* (um JOIN na mesma consulta), sem o cliente buscar cada um depois.
+@app.get("/api/users/{user_id}/transactions/", response_model=List[schemas.TransactionExpandedSchema])
+def get_all_transactions_by_user_endpoint(
+    user_id: int,
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=crud.MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    expand: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    try:
+        expand_names = crud.parse_expand(expand)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    #? A versão é lida antes da listagem: se algo mudar no meio, o próximo pedido não recebe 304
+    etag = versions.make_etag(crud.get_transaction_list_versions(db, user_id=user_id), request.url.query)
+    if versions.etag_matches(request.headers.get("if-none-match"), etag):
+        return versions.not_modified(etag)
+
+    if limit is None and after is None:
+        transactions = crud.get_all_transactions_by_user(db, user_id=user_id, start=start, end=end, expand=expand_names)
+        return fastjson.json_response(fastjson.dumps_rows(transactions), headers={"ETag": etag})
+
+    try:
+        transactions, next_cursor = crud.get_transactions_page(
+            db, user_id=user_id, limit=limit or crud.DEFAULT_PAGE_SIZE, after=after, start=start, end=end, expand=expand_names
+        )
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    headers = {"ETag": etag}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    return fastjson.json_response(fastjson.dumps_rows(transactions), headers=headers)
 
 #* Define o Endpoint para pegar as informações de 1 User (GET)
-@app.get("/api/users/{user_id}/transactions/{transaction_id}/", response_model=schemas.TransactionSchema)
-def get_transaction_by_user_endpoint(user_id: int, transaction_id: int, db: Session = Depends(get_db)):
+#* Aceita '?expand=category,owner' como a listagem.
+#? Sem expand a resposta é o objeto ORM validado pelo TransactionSchema (sem carregar as relações);
+#? o OpenAPI descreve o 200 com o TransactionExpandedSchema, que inclui os objetos embutidos
+@app.get(
+    "/api/users/{user_id}/transactions/{transaction_id}/",
+    response_model=schemas.TransactionSchema,
+    responses={200: {"model": schemas.TransactionExpandedSchema, "description": "The transaction; 'category' and 'owner' only with ?expand"}},
+)
+def get_transaction_by_user_endpoint(user_id: int, transaction_id: int, expand: Optional[str] = None, db: Session = Depends(get_read_db)):
+    try:
+        expand_names = crud.parse_expand(expand)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
     user = crud.get_user(db, user_id=user_id)
     if user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    if expand_names:
+        transaction = crud.get_transaction_row(db, user_id=user_id, transaction_id=transaction_id, expand=expand_names)
+        if transaction is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found")
+        return fastjson.json_response(fastjson.dumps_row(transaction))
     
     transactions = crud.get_transaction_by_user(db, user_id=user_id, transaction_id=transaction_id)
     
@@ -111,37 +387,103 @@ def get_transaction_by_user_endpoint(user_id: int, transaction_id: int, db: Sess
 
 
 #* Define o Endpoint para criar uma nova transação (POST)
+#* Um único INSERT ... RETURNING: usuário e categoria são validados pelas chaves estrangeiras.
 @app.post("/api/users/{user_id}/transactions/", response_model=schemas.TransactionSchema, status_code=status.HTTP_201_CREATED)
 def create_transaction_endpoint(user_id: int, transaction: schemas.TransactionCreate, db: Session = Depends(get_db)):
-    user_owner = crud.get_user(db, user_id=user_id)
-
-    # Checagem de usuário
-    if user_owner is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    
-    # Checagem de categoria
-    category_exists = crud.get_category_by_id(db, category_id=transaction.category_id)
-    if category_exists is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
-
     # Criação da transação
-    created_transaction = crud.create_transaction(db, transaction=transaction, owner_id=user_id)
+    try:
+        created_transaction = crud.create_transaction(db, transaction=transaction, owner_id=user_id)
+    except crud.ForeignKeyNotFound as exc:
+        # Checagem de usuário / categoria
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{exc.resource} not found")
 
     return created_transaction # Retorna o objeto para a FastAPI
 
 
+# Valida as linhas da importação e grava as válidas. Roda no threadpool porque acessa o banco.
+def _bulk_create_transactions(db: Session, user_id: int, records) -> schemas.BulkTransactionResult:
+    if crud.get_user(db, user_id=user_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    errors: List[schemas.BulkRowError] = []
+    items = []
+    for row, record in records:
+        if not isinstance(record, dict):
+            errors.append(schemas.BulkRowError(row=row, detail="Invalid record"))
+            continue
+        try:
+            items.append((row, schemas.TransactionBulkItem.model_validate(record)))
+        except ValidationError as exc:
+            detail = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in exc.errors())
+            errors.append(schemas.BulkRowError(row=row, detail=detail))
+
+    now = datetime.now()
+    category_ids = {item.category_id for _, item in items}
+    # Checagem das categorias com uma única consulta (usando o cache)
+    existing_categories = crud.get_existing_category_ids(db, category_ids)
+    inserted = None
+    for _ in range(2):
+        valid = [(row, item) for row, item in items if item.category_id in existing_categories]
+        transactions = [
+            {
+                "description": item.description,
+                "amount": item.amount,
+                "category_id": item.category_id,
+                "owner_id": user_id,
+                "created_at": item.created_at or now,
+            }
+            for _, item in valid
+        ]
+        try:
+            inserted = crud.bulk_create_transactions(db, transactions=transactions)
+            break
+        except crud.ForeignKeyNotFound as exc:
+            if exc.resource == "User":
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+            #? O cache tinha uma categoria já excluída (em outro worker, ou a réplica atrasada):
+            #? confere as categorias no banco, sem o cache, e tenta de novo só com as linhas válidas
+            category_cache.clear()
+            existing_categories = crud.get_existing_category_ids(db, category_ids, cached=False)
+    if inserted is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Categories changed during the import, try again")
+
+    errors.extend(schemas.BulkRowError(row=row, detail="Category not found") for row, item in items if item.category_id not in existing_categories)
+    errors.sort(key=lambda error: error.row)
+
+    return schemas.BulkTransactionResult(inserted=inserted, errors=errors)
+
+
+#* Define o Endpoint para importar várias transações de uma vez (POST)
+#* Aceita um array JSON, NDJSON ou CSV (com cabeçalho description,amount,category_id[,created_at]).
+#* Mais de BULK_MAX_ITEMS linhas respondem 413.
+@app.post("/api/users/{user_id}/transactions/bulk", response_model=schemas.BulkTransactionResult, status_code=status.HTTP_201_CREATED)
+async def bulk_create_transactions_endpoint(user_id: int, request: Request, db: Session = Depends(get_db)):
+    body = await request.body()
+
+    try:
+        records = ingest.parse_records(body, request.headers.get("content-type", ""))
+    except ingest.UnsupportedMediaType as exc:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(exc))
+    except ingest.TooManyRecords as exc:
+        raise HTTPException(status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid file: {exc}")
+
+    return await run_in_threadpool(_bulk_create_transactions, db, user_id, records)
+
+
 #* Define um Endpoint para atualização de uma transação de um usuário (PATCH)
 @app.patch("/api/users/{user_id}/transactions/{transaction_id}/", response_model=schemas.TransactionPatch)
 def update_transaction_endpoint(user_id: int, transaction_id: int, transaction_update: schemas.TransactionPatch, db: Session = Depends(get_db)):
     
-    # Pega as informações do banco por usuario
-    db_transaction = crud.get_transactions_for_user(db, user_id=user_id, transaction_id=transaction_id)
+    # Atualiza só se a transação pertencer ao usuário (UPDATE ... RETURNING)
+    try:
+        updated_transaction = crud.update_transaction(db, user_id=user_id, transaction_id=transaction_id, transaction_update=transaction_update)
+    except crud.ForeignKeyNotFound as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{exc.resource} not found")
     
-    if db_transaction is None:
+    if updated_transaction is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found or does not belong to the user.")
-    
-    # Se caso db_transction retornar o objeto, ele atualiza com o crud
-    updated_transaction = crud.update_transaction(db, db_transaction=db_transaction, transaction_update=transaction_update)
 
     return updated_transaction # Retorna o objeto para a FastAPI
 
@@ -159,21 +501,67 @@ def delete_transaction_endpoint(user_id:int, transaction_id:int, db: Session = D
     # Se o crud retornar o objeto, o FastAPI vai retornar o status_code 204 definido no decorador
     return 
 
+#=================================================#
+## ===== Endpoints para o recurso 'Summary' ===== ##
+#=================================================#
+
+#* Define o Endpoint de resumo de gastos de um usuário por categoria ou por mês (GET)
+#* Os totais vêm da tabela de resumos mensais, então o período precisa ser em meses inteiros
+#* ('from' no primeiro dia de um mês, 'to' no último); outras datas respondem 400.
+@app.get("/api/users/{user_id}/summary", response_model=List[schemas.SummaryItem], response_model_exclude_none=True)
+def get_summary_endpoint(
+    user_id: int,
+    group_by: Literal["category", "month"] = "category",
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_read_db),
+):
+    try:
+        rollups.check_whole_months(start, end)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    return crud.get_summary(db, user_id=user_id, group_by=group_by, start=start, end=end)
+
 #=================================================#
 ## === Endpoints para o recurso 'Categories' === ##
 #=================================================#
 
 #* Define o Endpoint para pegar todas categorias (GET)
+#* Com '?ids=1,2,3' devolve só essas categorias (do cache; ids que não existem ficam de fora)
 @app.get("/api/categories/", response_model=List[schemas.CategorySchema])
-def get_all_categories_endpoint(db: Session = Depends(get_db)):
-    categories = crud.get_all_categories(db)
-
-    return categories
+def get_all_categories_endpoint(request: Request, ids: Optional[str] = None, db: Session = Depends(get_read_db)):
+    try:
+        category_ids = None if ids is None else crud.parse_ids(ids)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    if category_ids is None:
+        version, categories = crud.get_cached_categories_json(db)
+    else:
+        version, categories = crud.get_cached_categories_by_ids_json(db, category_ids)
+
+    #? Com o cache quente, o 304 sai sem nenhuma consulta ao banco
+    etag = versions.make_etag({versions.CATEGORIES_KEY: version}, request.url.query)
+    if versions.etag_matches(request.headers.get("if-none-match"), etag):
+        return versions.not_modified(etag)
+
+    return fastjson.json_response(categories, headers={"ETag": etag})
+
+#* Define o Endpoint com as métricas no formato do Prometheus (GET)
+@app.get("/metrics", include_in_schema=False)
+def get_metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+#* Define o Endpoint com os contadores do cache de categorias (GET)
+@app.get("/api/categories/cache/stats")
+def get_category_cache_stats_endpoint():
+    return category_cache.stats()
 
 #* Define o Endpoint para pegar uma categoriaa pelo ID (GET)
 @app.get("/api/categories/{category_id}/", response_model=schemas.CategorySchema)
-def get_category_by_id_endpoint(category_id: int, db: Session = Depends(get_db)):
-    category = crud.get_category_by_id(db, category_id=category_id)
+def get_category_by_id_endpoint(category_id: int, db: Session = Depends(get_read_db)):
+    category = crud.get_cached_category(db, category_id=category_id)
     if category is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -185,7 +573,7 @@ def get_category_by_id_endpoint(category_id: int, db: Session = Depends(get_db))
 @app.post("/api/categories/", response_model=schemas.CategorySchema, status_code=status.HTTP_201_CREATED)
 def create_category_endpoint(category: schemas.CategoryCreate, db: Session = Depends(get_db)):
     # Valida se categoria ja existe no banco através do nome.
-    existing_category = crud.get_category_by_name(db, category_name=category.name)
+    existing_category = crud.get_cached_category_by_name(db, category_name=category.name)
 
     if existing_category:
         raise HTTPException(
@@ -198,23 +586,39 @@ def create_category_endpoint(category: schemas.CategoryCreate, db: Session = Dep
     return created_category
 
 #* Define o Endpoint para atualizar uma categoria (PATCH)
-@app.patch("/api/categories/{category_id}/")
+@app.patch("/api/categories/{category_id}/", response_model=schemas.CategorySchema)
 def update_category_endpoint(category_id: int, category_update: schemas.CategoryPatch, db: Session = Depends(get_db)):
-    db_category = crud.get_category_by_id(db, category_id=category_id)
+    updated_category = crud.update_category(db, category_id=category_id, category_update=category_update)
 
-    if db_category is None:
+    if updated_category is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
 
-    updated_category = crud.update_category(db, db_category=db_category, category_update=category_update)
     return updated_category
 
 #* Define o Endpoint para deletar uma categoria (DELETE)
-@app.delete("/api/categories/{category_id}/", status_code=status.HTTP_204_NO_CONTENT)
-def delete_category(category_id: int, db: Session = Depends(get_db)):
-    
+@app.delete("/api/categories/{category_id}/", status_code=status.HTTP_204_NO_CONTENT, responses={202: {"model": schemas.PurgeJobSchema}})
+def delete_category(category_id: int, mode: Literal["sync", "async"] = "sync", db: Session = Depends(get_db)):
+    if mode == "async":
+        job = crud.create_purge_job(db, "category", category_id)
+        if job is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category doesn't exist.")
+        purge.worker.submit(job.id)
+        return purge.accepted(job)
+
     deleted_category = crud.delete_category(db, category_id=category_id)
     if deleted_category is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category doesn't exist.")
     
     # Se o crud retornar o objeto, o FastAPI vai retornar o status_code 204 definido no decorador
-    return
\ No newline at end of file
+    return
+
+
+### ======= Endpoints para os jobs de exclusão ======= ###
+
+#* Define o Endpoint para acompanhar uma exclusão em segundo plano (GET)
+@app.get("/api/jobs/{job_id}/", response_model=schemas.PurgeJobSchema)
+def get_purge_job_endpoint(job_id: int, db: Session = Depends(get_db)):
+    job = crud.get_purge_job(db, job_id=job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
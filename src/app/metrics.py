@@ -0,0 +1,274 @@
+"""
+Métricas por rota no formato do Prometheus (endpoint /metrics).
+
+Um middleware ASGI abre um 'RequestStats' para cada requisição e os eventos do
+SQLAlchemy (registrados na classe Engine, então valem para todos os engines)
+somam nele a quantidade de comandos SQL, o tempo gasto no banco, as linhas
+escritas e as linhas lidas. A espera por conexão do pool é medida pelo get_db. No fim da
+requisição tudo vira histogramas com os rótulos (method, route).
+
+Log de consultas lentas (opcional):
+  SLOW_QUERY_MS   - registra cada comando SQL mais lento que isso;
+  SLOW_REQUEST_MS - registra a requisição mais lenta que isso, com os comandos dela.
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+import os
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+
+# Quantos comandos guardar por requisição para o log de requisições lentas
+MAX_LOGGED_STATEMENTS = 50
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 8, 13, 21, 50, 100, 500)
+ROWS_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                yield f"{self.name}{_format_labels(self.labels, label_values)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # Para cada combinação de rótulos: [contagem por bucket..., +Inf], soma
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            for label_values, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    le = 'le="%s"' % bound
+                    yield f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}"
+                cumulative += counts[-1]
+                le = 'le="+Inf"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}"
+                yield f"{self.name}_sum{_format_labels(self.labels, label_values)} {total}"
+                yield f"{self.name}_count{_format_labels(self.labels, label_values)} {cumulative}"
+
+
+# Métricas registradas e funções extras que geram linhas (ex.: contadores do cache)
+_metrics: List = []
+_collectors: List[Callable[[], Iterable[str]]] = []
+
+
+def _register(metric):
+    _metrics.append(metric)
+    return metric
+
+
+def register_collector(collector: Callable[[], Iterable[str]]):
+    _collectors.append(collector)
+
+
+REQUEST_LATENCY = _register(Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")))
+SQL_STATEMENTS = _register(Histogram("db_statements_per_request", "SQL statements executed per request", ("method", "route"), COUNT_BUCKETS))
+SQL_TIME = _register(Histogram("db_time_per_request_seconds", "Total SQL execution time per request", ("method", "route")))
+POOL_WAIT = _register(Histogram("db_pool_wait_seconds", "Time waiting for a pooled connection per request", ("method", "route")))
+SQL_ROWS = _register(Histogram("db_rows_written_per_request", "Rows affected by INSERT/UPDATE/DELETE statements per request", ("method", "route"), ROWS_BUCKETS))
+SQL_ROWS_RETURNED = _register(Histogram("db_rows_returned_per_request", "Rows fetched from the database per request", ("method", "route"), ROWS_BUCKETS))
+SLOW_QUERIES = _register(Counter("db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS", ("route",)))
+
+
+@dataclass
+class RequestStats:
+    method: str = ""
+    route: str = "unmatched"
+    statements: int = 0
+    sql_time: float = 0.0
+    pool_wait: float = 0.0
+    rows_written: int = 0
+    rows_returned: int = 0
+    queries: List[Tuple[float, str]] = field(default_factory=list)
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current() -> Optional[RequestStats]:
+    return _current.get()
+
+
+# Chamado pelo get_db com o tempo que a sessão esperou por uma conexão do pool
+def record_pool_wait(seconds: float):
+    stats = _current.get()
+    if stats is not None:
+        stats.pool_wait += seconds
+
+
+### ============ Eventos do SQLAlchemy ============ ###
+
+class _CountingCursor:
+    """Repassa tudo ao cursor do DBAPI e soma no RequestStats as linhas buscadas."""
+
+    def __init__(self, cursor, stats: RequestStats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._stats.rows_returned += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._stats.rows_returned += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._stats.rows_returned += len(rows)
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+#? O início do comando fica no contexto de execução (um por comando), não na conexão:
+#? se o comando falhar (ex.: chave estrangeira), o contexto é descartado junto e nada sobra
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_query_started", None)
+    elapsed = time.perf_counter() - started if started is not None else 0.0
+    stats = _current.get()
+
+    if stats is not None:
+        stats.statements += 1
+        stats.sql_time += elapsed
+        #? Só escritas: em SELECT o rowcount não conta as linhas lidas (o SQLite informa -1)
+        if cursor.description is None or (context is not None and (context.isinsert or context.isupdate or context.isdelete)):
+            stats.rows_written += max(cursor.rowcount or 0, 0)
+        #? O SQLAlchemy monta o resultado a partir de context.cursor depois deste evento:
+        #? trocado pelo cursor que conta, as linhas são somadas quando o app as busca
+        #? (inclusive em lotes, no /stream e no /export), sem ler nada a mais
+        if cursor.description is not None and context is not None:
+            context.cursor = _CountingCursor(cursor, stats)
+        if SLOW_REQUEST_MS and len(stats.queries) < MAX_LOGGED_STATEMENTS:
+            stats.queries.append((elapsed, statement))
+
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        route = stats.route if stats is not None else "-"
+        SLOW_QUERIES.inc(route)
+        logger.warning("Slow query (%.1f ms) on %s: %s | params=%.500r", elapsed * 1000, route, statement, parameters)
+
+
+### ============ Middleware ============ ###
+
+class MetricsMiddleware:
+    """Middleware ASGI que mede cada requisição HTTP (incluindo respostas em streaming)."""
+
+    def __init__(self, app, exclude_paths: Tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(method=scope["method"])
+        token = _current.set(stats)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+
+            # Usa o caminho da rota (ex.: /api/users/{user_id}/) para não criar um rótulo por URL
+            route = scope.get("route")
+            stats.route = getattr(route, "path", "unmatched")
+            labels = (stats.method, stats.route)
+
+            REQUEST_LATENCY.observe(elapsed, stats.method, stats.route, str(status_code))
+            SQL_STATEMENTS.observe(stats.statements, *labels)
+            SQL_TIME.observe(stats.sql_time, *labels)
+            POOL_WAIT.observe(stats.pool_wait, *labels)
+            SQL_ROWS.observe(stats.rows_written, *labels)
+            SQL_ROWS_RETURNED.observe(stats.rows_returned, *labels)
+
+            if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+                statements = "\n".join(f"  {duration * 1000:8.2f} ms  {statement}" for duration, statement in stats.queries)
+                logger.warning(
+                    "Slow request (%.1f ms) %s %s: %d statement(s), %.1f ms in SQL, %d row(s) read, %.1f ms waiting for the pool\n%s",
+                    elapsed * 1000, stats.method, stats.route, stats.statements, stats.sql_time * 1000, stats.rows_returned,
+                    stats.pool_wait * 1000, statements,
+                )
+
+
+# Texto no formato de exposição do Prometheus
+def render() -> str:
+    lines: List[str] = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Index, JSON
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -8,24 +8,28 @@ from .database import Base
 #===============================================================#
 
 # São as tabelas do seu banco.
+# A estrutura real do banco é criada pelas migrações (pasta 'migrations').
+# Os índices seguem as consultas do crud.py: não criamos índice em coluna que
+# nenhuma consulta filtra (cada índice a mais deixa todo INSERT mais lento).
 
 #* Criando a classe de usuario (Tabela de usuários no banco)
 class User(Base):
     __tablename__ = "users"
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)
-    email = Column(String, unique=True, index=True)
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    email = Column(String, unique=True, index=True) # get_user_by_email
 
     #* define a relação entre as tabelas User e Transaction no SQLAlchemy.
-    transactions = relationship("Transaction", back_populates="owner", cascade="all, delete-orphan")
+    #? passive_deletes: ao excluir, o ORM não carrega as transações; o banco apaga pelo ON DELETE CASCADE
+    transactions = relationship("Transaction", back_populates="owner", cascade="all, delete-orphan", passive_deletes=True)
 
 #* Criando a classe de Transação (Tabela de transações no banco)
 class Transaction(Base):
     __tablename__ = "transactions"
-    id = Column(Integer, primary_key=True, index=True)
-    description = Column(String, index=True)
+    id = Column(Integer, primary_key=True)
+    description = Column(String)
     amount = Column(Float)
-    created_at = Column(DateTime, default=datetime.now)
+    created_at = Column(DateTime, nullable=False, default=datetime.now) # Obrigatório: a paginação ordena por (created_at, id)
     
     #? Chave estrangeira que conecta a transação ao usuário:
     #* Se caso algum usuario ou categoria for excluida, todas transações são excluidas que tenham conexão.
@@ -36,12 +40,89 @@ class Transaction(Base):
     owner = relationship("User", back_populates="transactions")
     category = relationship("Category", back_populates="transactions")
 
+    #? Índices
+    __table_args__ = (
+        # Toda consulta de transações filtra por owner_id e pagina/ordena por (created_at, id)
+        Index("ix_transactions_owner_created", "owner_id", "created_at", "id"),
+        # Exclusão de categoria (cascade) e validação de uso da categoria
+        Index("ix_transactions_category_id", "category_id"),
+    )
+
 
 #* Criando a classe de Categorias (Tabela de categorias no banco)
 class Category(Base):
     __tablename__ = "categories"
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, unique=True, index=True, nullable=False)
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, index=True, nullable=False) # get_category_by_name
 
     # Relacionamento: uma categoria pode ter várias transações.
-    transactions = relationship("Transaction", back_populates="category", cascade="all, delete-orphan")
\ No newline at end of file
+    transactions = relationship("Transaction", back_populates="category", cascade="all, delete-orphan", passive_deletes=True)
+
+
+#* Criando a classe de Resumo Mensal (Tabela de totais por usuário, categoria e mês)
+#* É mantida pelas funções de escrita do crud na mesma transação do banco,
+#* então os resumos não precisam percorrer todas as transações do usuário.
+class TransactionRollup(Base):
+    __tablename__ = "transaction_rollups"
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    category_id = Column(Integer, ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True)
+    month = Column(Date, primary_key=True) # Primeiro dia do mês
+    total_amount = Column(Float, nullable=False, default=0)
+    transaction_count = Column(Integer, nullable=False, default=0)
+
+    #? Índices (a chave primária já atende as consultas por usuário)
+    __table_args__ = (
+        # Exclusão de categoria remove os resumos dela
+        Index("ix_transaction_rollups_category_id", "category_id"),
+    )
+
+
+#* Versão de cada conjunto de dados (usada nos ETags das listagens).
+#* Chaves: "user:{id}" (transações do usuário), "categories" e "transaction_events:pruned"
+#* (maior id apagado do feed de mudanças). Só aumenta.
+class LedgerVersion(Base):
+    __tablename__ = "ledger_versions"
+    key = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+#* Exclusão em segundo plano de um usuário ou categoria com muitas transações
+#* (DELETE ?mode=async). As transações são apagadas em lotes e 'deleted' mostra o progresso.
+class PurgeJob(Base):
+    __tablename__ = "purge_jobs"
+    id = Column(Integer, primary_key=True)
+    resource = Column(String, nullable=False) # "user" ou "category"
+    resource_id = Column(Integer, nullable=False) # Sem chave estrangeira: o alvo some no fim do job
+    status = Column(String, nullable=False, default="pending") # pending, running, done, failed
+    total = Column(Integer, nullable=False, default=0) # Transações do alvo quando o job foi criado
+    deleted = Column(Integer, nullable=False, default=0)
+    error = Column(String)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now) # Último lote (jobs parados voltam para a fila)
+    finished_at = Column(DateTime)
+
+    #? Índices
+    __table_args__ = (
+        # O worker procura os jobs pendentes/parados
+        Index("ix_purge_jobs_status", "status"),
+    )
+
+
+#* Eventos de mudança nas transações de cada usuário (feed em /transactions/events).
+#* Gravados pelo crud na mesma transação da escrita; o id é o token para retomar o feed.
+class TransactionEvent(Base):
+    __tablename__ = "transaction_events"
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    transaction_id = Column(Integer) # Sem chave estrangeira: o evento de exclusão fica depois da transação
+    type = Column(String, nullable=False) # created, updated, deleted ou reload
+    data = Column(JSON) # A transação como na API (em 'deleted', como era antes; vazio em 'reload')
+    created_at = Column(DateTime, default=datetime.now)
+
+    #? Índices
+    __table_args__ = (
+        # O feed lê os eventos de um usuário depois de um id
+        Index("ix_transaction_events_owner_id", "owner_id", "id"),
+        # Limpeza dos eventos antigos
+        Index("ix_transaction_events_created_at", "created_at"),
+    )
@@ -0,0 +1,110 @@
+"""
+Sinais entre workers usando LISTEN/NOTIFY do PostgreSQL.
+
+'notify' envia o sinal dentro da transação atual (ele só é entregue no commit).
+'PgListener' mantém uma conexão dedicada escutando os canais e chama os
+callbacks registrados em cada worker. Em outros bancos (ex.: SQLite local)
+o sinal é ignorado, pois só existe um processo.
+"""
+from collections import defaultdict
+from threading import Event, Thread
+from typing import Callable, Dict, List, Optional
+import logging
+import os
+import select
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Liga o envio/recebimento de sinais entre workers (só tem efeito no PostgreSQL)
+PG_NOTIFY_ENABLED = os.getenv("PG_NOTIFY_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Canal usado para invalidar o cache de categorias em todos os workers
+CATEGORY_CACHE_CHANNEL = "category_cache"
+
+
+# Agenda um NOTIFY na transação da sessão (entregue aos outros workers no commit)
+def notify(db: Session, channel: str, payload: str = ""):
+    if not PG_NOTIFY_ENABLED or db.get_bind().dialect.name != "postgresql":
+        return
+    db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": channel, "payload": payload})
+
+
+class PgListener:
+    """Thread que escuta canais do PostgreSQL e repassa as mensagens aos callbacks.
+
+    Quando a conexão cai, o callback é chamado com payload None ao reconectar,
+    porque mensagens podem ter sido perdidas nesse intervalo.
+    """
+
+    def __init__(self, engine: Optional[Engine] = None, poll_interval: float = 5.0):
+        self.engine = engine
+        self.poll_interval = poll_interval
+        self._callbacks: Dict[str, List[Callable[[Optional[str]], None]]] = defaultdict(list)
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    def subscribe(self, channel: str, callback: Callable[[Optional[str]], None]):
+        self._callbacks[channel].append(callback)
+
+    # O engine pode ser informado só aqui (ele é criado no startup, não no import)
+    def start(self, engine: Optional[Engine] = None):
+        if engine is not None:
+            self.engine = engine
+        if self._thread is not None or not self._callbacks:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="pg-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def _dispatch(self, channel: str, payload: Optional[str]):
+        for callback in self._callbacks.get(channel, ()):
+            try:
+                callback(payload)
+            except Exception:
+                logger.exception("Listener callback failed for channel %s", channel)
+
+    def _run(self):
+        first_connection = True
+        while not self._stop.is_set():
+            try:
+                connection = self.engine.raw_connection()
+            except Exception:
+                logger.exception("Could not open LISTEN connection")
+                self._stop.wait(self.poll_interval)
+                continue
+
+            try:
+                dbapi_connection = connection.dbapi_connection
+                dbapi_connection.autocommit = True
+                cursor = dbapi_connection.cursor()
+                for channel in self._callbacks:
+                    cursor.execute(f'LISTEN "{channel}"')
+
+                # Reconexão: avisa todos os canais, pois mensagens podem ter se perdido
+                if not first_connection:
+                    for channel in self._callbacks:
+                        self._dispatch(channel, None)
+                first_connection = False
+
+                while not self._stop.is_set():
+                    if select.select([dbapi_connection], [], [], self.poll_interval) == ([], [], []):
+                        continue
+                    dbapi_connection.poll()
+                    while dbapi_connection.notifies:
+                        message = dbapi_connection.notifies.pop(0)
+                        self._dispatch(message.channel, message.payload)
+            except Exception:
+                logger.exception("LISTEN connection lost, reconnecting")
+                self._stop.wait(self.poll_interval)
+            finally:
+                connection.invalidate() # A conexão ficou em autocommit/LISTEN: não volta para o pool
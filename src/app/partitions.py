@@ -0,0 +1,285 @@
+"""
+Particionamento mensal da tabela de transações (opcional, só PostgreSQL).
+
+Com TRANSACTIONS_PARTITIONED=true a migração 0005 transforma 'transactions' em uma
+tabela particionada por intervalo de 'created_at', com uma partição por mês
+(transactions_y2026m10, ...) e uma partição padrão (transactions_default) que
+recebe o que cair fora das partições criadas. As consultas do crud com período
+(from/to, cursor da paginação, exportação) só leem as partições do período.
+
+Manutenção (a partir da pasta src/):
+    python -m app.partitions list
+    python -m app.partitions ensure --ahead 3          # cria as partições que faltam
+    python -m app.partitions archive --before 2024-01-01 [--drop]
+    python -m app.partitions convert                   # particiona um banco já migrado
+
+'archive' desanexa (DETACH) as partições antigas: os dados saem da tabela de
+transações mas continuam em uma tabela própria, sem reescrever nada. Com '--drop'
+a tabela desanexada é apagada.
+"""
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+import argparse
+import logging
+import os
+import re
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+TRANSACTIONS_PARTITIONED = os.getenv("TRANSACTIONS_PARTITIONED", "false").lower() in ("1", "true", "yes")
+
+# Quantos meses à frente ficam com a partição pronta
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+
+PARENT = "transactions"
+DEFAULT_PARTITION = "transactions_default"
+_NAME = re.compile(r"^transactions_y(\d{4})m(\d{2})$")
+
+
+### ============ Meses e nomes ============ ###
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"transactions_y{month.year:04d}m{month.month:02d}"
+
+
+def _month_of_name(name: str) -> Optional[date]:
+    match = _NAME.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+# Partições (anexadas ou arquivadas) e a partição padrão: tabelas que não estão nos modelos
+def is_partition(name: str) -> bool:
+    return name == DEFAULT_PARTITION or _NAME.match(name) is not None
+
+
+### ============ Consultas ao catálogo ============ ###
+
+def is_partitioned(connection: Connection) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    return bool(connection.scalar(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :parent AND pg_table_is_visible(c.oid))"
+    ), {"parent": PARENT}))
+
+
+# Partições mensais anexadas, em ordem: [(mês, nome)]
+def list_partitions(connection: Connection) -> List[Tuple[date, str]]:
+    names = connection.scalars(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :parent AND pg_table_is_visible(p.oid)"
+    ), {"parent": PARENT})
+    months = ((_month_of_name(name), name) for name in names)
+    return sorted((month, name) for month, name in months if month is not None)
+
+
+### ============ Criação das partições ============ ###
+
+def partition_bounds(month: date) -> str:
+    return f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+
+
+# Cria a partição de um mês. Se a partição padrão tiver linhas desse mês, elas são
+# movidas para a tabela nova antes de anexá-la (senão o PostgreSQL recusa a partição).
+def create_partition(connection: Connection, month: date):
+    name = partition_name(month)
+    params = {"start": month, "end": add_months(month, 1)}
+    stray = connection.scalar(text(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end)"
+    ), params)
+
+    if not stray:
+        connection.exec_driver_sql(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT} FOR VALUES {partition_bounds(month)}")
+        return
+
+    connection.exec_driver_sql(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    connection.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), params)
+    connection.exec_driver_sql(f"ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES {partition_bounds(month)}")
+    logger.info("Moved rows from %s into the new partition %s", DEFAULT_PARTITION, name)
+
+
+# Garante as partições do mês atual até 'months_ahead' meses à frente, e as dos meses
+# que hoje estão na partição padrão (ex.: importação em lote de um extrato antigo)
+def ensure_partitions(connection: Connection, months_ahead: int = PARTITION_MONTHS_AHEAD, first_month: Optional[date] = None) -> List[str]:
+    #? Vários workers iniciam juntos: um de cada vez (a trava solta no fim da transação)
+    connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": "transactions_partitions"})
+    existing = {month for month, _ in list_partitions(connection)}
+    current = month_start(date.today())
+    start = month_start(first_month) if first_month else current
+
+    wanted = set()
+    month = start
+    while month <= add_months(current, months_ahead):
+        wanted.add(month)
+        month = add_months(month, 1)
+    for stray in connection.scalars(text(f"SELECT DISTINCT date_trunc('month', created_at)::date FROM {DEFAULT_PARTITION}")):
+        wanted.add(stray)
+
+    created = []
+    for month in sorted(wanted - existing):
+        create_partition(connection, month)
+        created.append(partition_name(month))
+    return created
+
+
+### ============ Conversão (banco já migrado) ============ ###
+
+# Transforma a tabela comum em particionada, copiando os dados (o mesmo que a migração
+# 0005 faz com TRANSACTIONS_PARTITIONED=true). Roda em uma transação: se algo falhar, nada muda.
+def convert(connection: Connection, months_ahead: int = PARTITION_MONTHS_AHEAD):
+    if is_partitioned(connection):
+        return
+
+    connection.exec_driver_sql(f"ALTER TABLE {PARENT} RENAME TO transactions_unpartitioned")
+    connection.exec_driver_sql("ALTER TABLE transactions_unpartitioned RENAME CONSTRAINT transactions_pkey TO transactions_unpartitioned_pkey")
+    for index in ("ix_transactions_owner_created", "ix_transactions_category_id", "ix_transactions_owner_description_trgm"):
+        connection.exec_driver_sql(f"ALTER INDEX IF EXISTS {index} RENAME TO {index}_unpartitioned")
+
+    #? A chave primária precisa incluir a coluna de particionamento
+    connection.exec_driver_sql(
+        f"CREATE TABLE {PARENT} ("
+        "id INTEGER NOT NULL DEFAULT nextval('transactions_id_seq'), "
+        "description VARCHAR, "
+        "amount FLOAT, "
+        "created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, "
+        "owner_id INTEGER REFERENCES users (id) ON DELETE CASCADE, "
+        "category_id INTEGER REFERENCES categories (id) ON DELETE CASCADE, "
+        "PRIMARY KEY (id, created_at)"
+        ") PARTITION BY RANGE (created_at)"
+    )
+    connection.exec_driver_sql(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT")
+
+    first = connection.scalar(text("SELECT min(created_at) FROM transactions_unpartitioned"))
+    ensure_partitions(connection, months_ahead, first_month=first.date() if first else None)
+
+    # Linhas sem data (não deveriam existir) vão para a partição padrão
+    connection.exec_driver_sql(
+        f"INSERT INTO {PARENT} (id, description, amount, created_at, owner_id, category_id) "
+        "SELECT id, description, amount, COALESCE(created_at, 'epoch'), owner_id, category_id FROM transactions_unpartitioned"
+    )
+
+    # Os índices são criados depois da cópia (mais rápido) e valem para todas as partições
+    connection.exec_driver_sql(f"CREATE INDEX ix_transactions_owner_created ON {PARENT} (owner_id, created_at, id)")
+    connection.exec_driver_sql(f"CREATE INDEX ix_transactions_category_id ON {PARENT} (category_id)")
+    if connection.scalar(text("SELECT count(*) FROM pg_extension WHERE extname IN ('pg_trgm', 'btree_gin')")) == 2:
+        connection.exec_driver_sql(
+            f"CREATE INDEX ix_transactions_owner_description_trgm ON {PARENT} USING gin (owner_id, description gin_trgm_ops)"
+        )
+
+    connection.exec_driver_sql(f"ALTER SEQUENCE transactions_id_seq OWNED BY {PARENT}.id")
+    connection.exec_driver_sql("DROP TABLE transactions_unpartitioned")
+    connection.exec_driver_sql(f"ANALYZE {PARENT}")
+
+
+# Volta para a tabela comum (o mesmo que o downgrade da migração 0005)
+def revert(connection: Connection):
+    if not is_partitioned(connection):
+        return
+
+    connection.exec_driver_sql(f"ALTER TABLE {PARENT} RENAME TO transactions_partitioned")
+    for index in ("ix_transactions_owner_created", "ix_transactions_category_id", "ix_transactions_owner_description_trgm"):
+        connection.exec_driver_sql(f"ALTER INDEX IF EXISTS {index} RENAME TO {index}_partitioned")
+
+    connection.exec_driver_sql(
+        f"CREATE TABLE {PARENT} ("
+        "id INTEGER NOT NULL DEFAULT nextval('transactions_id_seq') PRIMARY KEY, "
+        "description VARCHAR, "
+        "amount FLOAT, "
+        "created_at TIMESTAMP WITHOUT TIME ZONE, "
+        "owner_id INTEGER REFERENCES users (id) ON DELETE CASCADE, "
+        "category_id INTEGER REFERENCES categories (id) ON DELETE CASCADE"
+        ")"
+    )
+    connection.exec_driver_sql(f"INSERT INTO {PARENT} SELECT id, description, amount, created_at, owner_id, category_id FROM transactions_partitioned")
+    connection.exec_driver_sql(f"CREATE INDEX ix_transactions_owner_created ON {PARENT} (owner_id, created_at, id)")
+    connection.exec_driver_sql(f"CREATE INDEX ix_transactions_category_id ON {PARENT} (category_id)")
+    if connection.scalar(text("SELECT count(*) FROM pg_extension WHERE extname IN ('pg_trgm', 'btree_gin')")) == 2:
+        connection.exec_driver_sql(
+            f"CREATE INDEX ix_transactions_owner_description_trgm ON {PARENT} USING gin (owner_id, description gin_trgm_ops)"
+        )
+    connection.exec_driver_sql(f"ALTER SEQUENCE transactions_id_seq OWNED BY {PARENT}.id")
+    connection.exec_driver_sql("DROP TABLE transactions_partitioned CASCADE")
+
+
+### ============ Arquivamento ============ ###
+
+# Desanexa as partições mensais que terminam antes de 'before'. As listagens dos
+# usuários afetados mudam, então as versões (ETags) e os resumos mensais deles são refeitos.
+def archive_partitions(connection: Connection, before: date, drop: bool = False) -> List[str]:
+    from . import changefeed, rollups, versions
+
+    archived = []
+    owner_ids = set()
+    for month, name in list_partitions(connection):
+        if add_months(month, 1) > before:
+            continue
+        owner_ids.update(connection.scalars(text(f"SELECT DISTINCT owner_id FROM {name}")))
+        connection.exec_driver_sql(f"ALTER TABLE {PARENT} DETACH PARTITION {name}")
+        if drop:
+            connection.exec_driver_sql(f"DROP TABLE {name}")
+        archived.append(name)
+
+    if owner_ids:
+        #? A sessão usa a transação já aberta na conexão (o commit final é de quem chamou)
+        with Session(bind=connection) as db:
+            versions.bump(db, (versions.user_key(owner_id) for owner_id in owner_ids))
+            changefeed.record_reload(db, owner_ids)
+            rollups.rebuild(db, owner_ids=owner_ids)
+    return archived
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    from .database import engine
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list")
+    ensure = commands.add_parser("ensure")
+    ensure.add_argument("--ahead", type=int, default=PARTITION_MONTHS_AHEAD)
+    archive = commands.add_parser("archive")
+    archive.add_argument("--before", type=date.fromisoformat, required=True, help="archive months that end before this date")
+    archive.add_argument("--drop", action="store_true", help="drop the detached tables")
+    commands.add_parser("convert")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("Partitioning is only supported on PostgreSQL")
+
+    with engine.begin() as connection:
+        if args.command == "convert":
+            convert(connection)
+            print("transactions is now partitioned by month")
+            return
+        if not is_partitioned(connection):
+            raise SystemExit("transactions is not partitioned (run: python -m app.partitions convert)")
+        if args.command == "list":
+            for month, name in list_partitions(connection):
+                print(f"{month:%Y-%m}  {name}")
+        elif args.command == "ensure":
+            created = ensure_partitions(connection, args.ahead)
+            print(f"Created {len(created)} partition(s): {', '.join(created) or '-'}")
+        elif args.command == "archive":
+            archived = archive_partitions(connection, args.before, drop=args.drop)
+            print(f"{'Dropped' if args.drop else 'Detached'} {len(archived)} partition(s): {', '.join(archived) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
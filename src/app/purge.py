@@ -0,0 +1,175 @@
+"""
+Exclusão em segundo plano de usuários e categorias com muitas transações.
+
+DELETE /api/users/{id}/?mode=async (ou /api/categories/{id}/?mode=async) registra um
+job em 'purge_jobs' e responde 202 na hora. O worker apaga as transações do alvo
+em lotes de PURGE_BATCH_SIZE, cada lote em uma transação curta (sem segurar locks
+por minutos nem carregar nada em memória), mantendo os resumos mensais e os ETags
+em dia. No fim, o próprio usuário/categoria é excluído. O andamento fica em
+GET /api/jobs/{job_id}/.
+
+Jobs que ficaram parados (ex.: o processo caiu no meio) por mais de
+PURGE_STALE_SECONDS voltam para a fila; apagar em lotes pode ser retomado de onde parou.
+"""
+from datetime import datetime, timedelta
+from queue import Empty, Queue
+from threading import Event, Thread
+from typing import Callable, List, Optional
+import logging
+import os
+
+from fastapi import status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.orm import Session
+
+from . import changefeed, crud, models, rollups, schemas, versions
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "5000"))
+PURGE_STALE_SECONDS = float(os.getenv("PURGE_STALE_SECONDS", "300"))
+
+# Exclusão final do alvo, depois que as transações acabaram (o cascade já não tem o que apagar)
+_FINISH = {
+    "user": lambda db, resource_id: crud.delete_user(db, user_id=resource_id),
+    "category": lambda db, resource_id: crud.delete_category(db, category_id=resource_id),
+}
+
+
+def _claimable():
+    stale = datetime.now() - timedelta(seconds=PURGE_STALE_SECONDS)
+    job = models.PurgeJob
+    return or_(job.status == "pending", and_(job.status == "running", job.updated_at < stale))
+
+
+# Marca o job como 'running' para este worker. Só um worker consegue (UPDATE condicional).
+def claim(db: Session, job_id: int) -> bool:
+    result = db.execute(
+        update(models.PurgeJob)
+        .where(models.PurgeJob.id == job_id, _claimable())
+        .values(status="running", updated_at=datetime.now())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def claimable_jobs(db: Session) -> List[int]:
+    return list(db.scalars(select(models.PurgeJob.id).where(_claimable()).order_by(models.PurgeJob.id)))
+
+
+# Apaga um lote de transações do alvo e devolve quantas saíram
+def purge_batch(db: Session, job: models.PurgeJob, batch_size: int = PURGE_BATCH_SIZE) -> int:
+    _, column = crud.PURGE_TARGETS[job.resource]
+    batch = select(models.Transaction.id).where(column == job.resource_id).limit(batch_size)
+    rows = db.execute(
+        delete(models.Transaction)
+        .where(models.Transaction.id.in_(batch))
+        .returning(models.Transaction.owner_id, models.Transaction.category_id, models.Transaction.created_at, models.Transaction.amount)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not rows:
+        return 0
+
+    deltas = rollups.RollupDeltas()
+    for row in rows:
+        deltas.remove(row.owner_id, row.category_id, row.created_at, row.amount)
+    rollups.apply_deltas(db, deltas)
+    versions.bump(db, {versions.user_key(row.owner_id) for row in rows})
+    changefeed.record_reload(db, {row.owner_id for row in rows})
+
+    job.deleted += len(rows)
+    job.updated_at = datetime.now()
+    db.commit()
+    return len(rows)
+
+
+# Executa um job já reservado (claim) até o fim
+def run_job(db: Session, job_id: int, batch_size: int = PURGE_BATCH_SIZE):
+    job = db.get(models.PurgeJob, job_id)
+    try:
+        while purge_batch(db, job, batch_size):
+            pass
+        _FINISH[job.resource](db, job.resource_id)
+        job.status = "done"
+    except Exception as exc:
+        logger.exception("Purge job %s failed", job_id)
+        db.rollback()
+        job.status = "failed"
+        job.error = str(exc)[:500]
+    job.finished_at = job.updated_at = datetime.now()
+    db.commit()
+
+
+class PurgeWorker:
+    """Thread que executa os jobs de exclusão, um por vez.
+
+    Os jobs criados neste processo entram na fila na hora; a cada 'poll_interval'
+    o worker também procura jobs pendentes ou parados no banco (de outros processos).
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal, poll_interval: float = 5.0):
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self._queue: "Queue[Optional[int]]" = Queue()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="purge-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._queue.put(None) # Acorda a thread parada no get (o shutdown não espera o poll_interval)
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def submit(self, job_id: int):
+        self._queue.put(job_id)
+        self.start()
+
+    def _run_one(self, job_id: int):
+        with self.session_factory() as db:
+            if claim(db, job_id):
+                run_job(db, job_id)
+
+    def _pending(self) -> List[int]:
+        try:
+            with self.session_factory() as db:
+                return claimable_jobs(db)
+        except Exception:
+            logger.exception("Could not look for pending purge jobs")
+            return []
+
+    def _run(self):
+        job_ids = self._pending() # Retoma o que ficou pendente antes deste processo iniciar
+        while not self._stop.is_set():
+            for job_id in job_ids:
+                if self._stop.is_set():
+                    return
+                try:
+                    self._run_one(job_id)
+                except Exception:
+                    logger.exception("Purge job %s could not run", job_id)
+
+            try:
+                job_id = self._queue.get(timeout=self.poll_interval)
+                job_ids = [job_id] if job_id is not None else []
+            except Empty:
+                job_ids = self._pending()
+
+
+worker = PurgeWorker()
+
+
+# Resposta do DELETE ?mode=async: 202 com o job e o endereço para acompanhar o andamento
+def accepted(job: models.PurgeJob) -> ORJSONResponse:
+    content = schemas.PurgeJobSchema.model_validate(job, from_attributes=True).model_dump(mode="json")
+    return ORJSONResponse(content, status_code=status.HTTP_202_ACCEPTED, headers={"Location": f"/api/jobs/{job.id}/"})
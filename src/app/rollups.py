@@ -0,0 +1,146 @@
+"""
+Manutenção dos resumos mensais (tabela transaction_rollups).
+
+As funções de escrita do crud chamam 'apply_deltas' antes do commit, então o
+resumo é atualizado na mesma transação do banco que a própria transação.
+Para (re)construir os resumos a partir do histórico: python -m app.rollups
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import Date, cast, delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Chave de um resumo: (owner_id, category_id, mês)
+RollupKey = Tuple[int, int, date]
+
+
+class RollupDeltas:
+    """Acumula as variações de total/quantidade por (usuário, categoria, mês)."""
+
+    def __init__(self):
+        self._deltas: Dict[RollupKey, list] = defaultdict(lambda: [0.0, 0])
+
+    def add(self, owner_id: int, category_id: int, created_at: datetime, amount: float, count: int = 1):
+        delta = self._deltas[(owner_id, category_id, month_of(created_at))]
+        delta[0] += amount * count
+        delta[1] += count
+
+    def remove(self, owner_id: int, category_id: int, created_at: datetime, amount: float):
+        self.add(owner_id, category_id, created_at, amount, count=-1)
+
+    def has_changes(self) -> bool:
+        return bool(self._deltas)
+
+    def rows(self):
+        for (owner_id, category_id, month), (total, count) in self._deltas.items():
+            if total == 0 and count == 0:
+                continue
+            yield {
+                "owner_id": owner_id,
+                "category_id": category_id,
+                "month": month,
+                "total_amount": total,
+                "transaction_count": count,
+            }
+
+
+# Primeiro dia do mês de uma data
+def month_of(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+# Os resumos são por mês: 'start' precisa ser o primeiro dia de um mês e 'end' o último
+# (inclusivo), senão o período seria alargado sem aviso para os meses inteiros.
+def check_whole_months(start: Optional[date] = None, end: Optional[date] = None):
+    if start is not None and start.day != 1:
+        raise ValueError("'from' must be the first day of a month")
+    if end is not None and (end + timedelta(days=1)).day != 1:
+        raise ValueError("'to' must be the last day of a month")
+
+
+# Aplica as variações na tabela de resumos (upsert: cria a linha ou soma na existente)
+def apply_deltas(db: Session, deltas: RollupDeltas):
+    rows = list(deltas.rows())
+    if not rows:
+        return
+
+    table = models.TransactionRollup.__table__
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.owner_id, table.c.category_id, table.c.month],
+            set_={
+                "total_amount": table.c.total_amount + stmt.excluded.total_amount,
+                "transaction_count": table.c.transaction_count + stmt.excluded.transaction_count,
+            },
+        )
+        db.execute(stmt, rows)
+        return
+
+    # Outros bancos: tenta o UPDATE e, se a linha não existir, faz o INSERT
+    for row in rows:
+        result = db.execute(
+            update(table)
+            .where(table.c.owner_id == row["owner_id"], table.c.category_id == row["category_id"], table.c.month == row["month"])
+            .values(
+                total_amount=table.c.total_amount + row["total_amount"],
+                transaction_count=table.c.transaction_count + row["transaction_count"],
+            )
+        )
+        if result.rowcount == 0:
+            db.execute(insert(table).values(**row))
+
+
+# Expressão SQL do primeiro dia do mês de 'created_at' (depende do banco)
+def _month_expression(dialect: str):
+    created_at = models.Transaction.created_at
+    if dialect == "postgresql":
+        return cast(func.date_trunc("month", created_at), Date)
+    if dialect == "sqlite":
+        return func.date(created_at, "start of month")
+    raise NotImplementedError(f"Rollup rebuild is not supported on '{dialect}'")
+
+
+# Reconstrói todos os resumos a partir da tabela de transações
+def rebuild(db: Session, owner_ids: Iterable[int] = None):
+    table = models.TransactionRollup.__table__
+    month = _month_expression(db.get_bind().dialect.name).label("month")
+
+    source = select(
+        models.Transaction.owner_id,
+        models.Transaction.category_id,
+        month,
+        func.sum(models.Transaction.amount),
+        func.count(),
+    ).where(
+        # Linhas sem usuário ou categoria não entram no resumo (a chave do resumo não aceita nulo)
+        models.Transaction.owner_id.isnot(None), models.Transaction.category_id.isnot(None),
+    ).group_by(models.Transaction.owner_id, models.Transaction.category_id, month)
+
+    clear = delete(table)
+    if owner_ids is not None:
+        owner_ids = list(owner_ids)
+        source = source.where(models.Transaction.owner_id.in_(owner_ids))
+        clear = clear.where(table.c.owner_id.in_(owner_ids))
+
+    db.execute(clear)
+    db.execute(
+        insert(table).from_select(["owner_id", "category_id", "month", "total_amount", "transaction_count"], source)
+    )
+    db.commit()
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    with SessionLocal() as session:
+        rebuild(session)
+        print("Rollups rebuilt")
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 
 
 #===================================================================#
@@ -74,3 +74,58 @@ class CategorySchema(BaseModel):
 #* Atualiza os dados das Categorias para a API:
 class CategoryPatch(BaseModel):
     name: Optional[str] = None
+
+# ---
+
+#* Transação com os objetos embutidos pelo '?expand=category,owner' (cada um só vem quando pedido)
+class TransactionExpandedSchema(TransactionSchema):
+    category: Optional[CategorySchema] = None
+    owner: Optional[UserSchema] = None
+
+# ---
+
+#* Linha de uma importação em lote (extrato bancário): aceita a data original da transação
+class TransactionBulkItem(TransactionCreate):
+    created_at: Optional[datetime] = None
+
+#* Erro de uma linha específica da importação em lote
+class BulkRowError(BaseModel):
+    row: int # Número da linha no arquivo enviado (começando em 1)
+    detail: str
+
+#* Resultado da importação em lote
+class BulkTransactionResult(BaseModel):
+    inserted: int
+    errors: List[BulkRowError]
+
+# ---
+
+#* Formata os dados (Saída) dos resumos de gastos para a API:
+#* Vem preenchido 'category_id' ou 'month', conforme o agrupamento pedido.
+class SummaryItem(BaseModel):
+    category_id: Optional[int] = None
+    month: Optional[date] = None
+    total: float
+    count: int
+
+    class Config:
+        #* Faz a manipulação de dados para JSON
+        orm_mode = True
+
+# ---
+
+#* Formata os dados (Saída) de um job de exclusão em segundo plano (DELETE ?mode=async)
+class PurgeJobSchema(BaseModel):
+    id: int
+    resource: str # "user" ou "category"
+    resource_id: int
+    status: str # pending, running, done, failed
+    total: int # Transações do alvo quando o job foi criado
+    deleted: int # Transações já apagadas
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        #* Faz a manipulação de dados para JSON
+        orm_mode = True
@@ -0,0 +1,81 @@
+"""
+Índice de texto para a busca nas descrições das transações.
+
+- PostgreSQL: extensões pg_trgm e btree_gin com um índice GIN em
+  (owner_id, description gin_trgm_ops), usado pelo ILIKE '%termo%';
+- SQLite: tabela virtual FTS5 (tokenizer 'trigram', sem conteúdo próprio, mantida
+  por triggers) com a descrição e uma chave do usuário ('<57>'), consultada com MATCH.
+
+Os dois fazem a mesma busca ("contém o termo", sem diferenciar maiúsculas) e nos
+dois o usuário faz parte do índice: um termo comum (ex.: "mercado") não obriga o
+banco a juntar as ocorrências de todos os usuários para depois filtrar.
+A estrutura vem da migração 0004, que guarda a sua própria cópia do SQL (assim
+como a 0008, que recria os triggers): o SQL daqui só serve ao listener abaixo,
+que com DATABASE_AUTO_CREATE cria o índice logo depois do create_all da tabela
+de transações. Uma mudança no índice precisa de uma migração nova.
+"""
+from sqlalchemy import event, literal_column, select, text
+
+from . import models
+
+# Os trigramas só ajudam a partir de 3 caracteres; termos menores usam LIKE
+MIN_INDEXED_LENGTH = 3
+
+# Objetos criados pelo SQL abaixo, fora dos modelos (o env.py das migrações não os compara).
+# O FTS5 cria também as tabelas internas transactions_fts_data, _idx, _docsize e _config.
+FTS_TABLE = "transactions_fts"
+INDEXES = ("ix_transactions_owner_description_trgm",)
+
+POSTGRES_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS btree_gin",
+    "CREATE INDEX IF NOT EXISTS ix_transactions_owner_description_trgm ON transactions USING gin (owner_id, description gin_trgm_ops)",
+)
+
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5("
+    "description, owner_key, content='', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_insert AFTER INSERT ON transactions BEGIN "
+    "INSERT INTO transactions_fts(rowid, description, owner_key) VALUES (new.id, new.description, '<' || new.owner_id || '>'); END",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_delete AFTER DELETE ON transactions BEGIN "
+    "INSERT INTO transactions_fts(transactions_fts, rowid, description, owner_key) "
+    "VALUES ('delete', old.id, old.description, '<' || old.owner_id || '>'); END",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_update AFTER UPDATE OF description, owner_id ON transactions BEGIN "
+    "INSERT INTO transactions_fts(transactions_fts, rowid, description, owner_key) "
+    "VALUES ('delete', old.id, old.description, '<' || old.owner_id || '>'); "
+    "INSERT INTO transactions_fts(rowid, description, owner_key) VALUES (new.id, new.description, '<' || new.owner_id || '>'); END",
+    # Indexa as transações que já existiam
+    "INSERT INTO transactions_fts(rowid, description, owner_key) SELECT id, description, '<' || owner_id || '>' FROM transactions",
+)
+
+
+def ddl_for(dialect: str):
+    if dialect == "postgresql":
+        return POSTGRES_DDL
+    if dialect == "sqlite":
+        return SQLITE_DDL
+    return ()
+
+
+@event.listens_for(models.Transaction.__table__, "after_create")
+def _create_search_index(target, connection, **kw):
+    for statement in ddl_for(connection.dialect.name):
+        connection.exec_driver_sql(statement)
+
+
+# Escapa os curingas do LIKE para buscar o termo literalmente
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+# Condição SQL "a descrição de uma transação do usuário contém 'term'" para o banco em uso
+def contains(dialect: str, user_id: int, term: str):
+    if dialect == "sqlite" and len(term) >= MIN_INDEXED_LENGTH:
+        #? '<57>' não é substring de '<570>', então a chave do usuário não confunde usuários
+        phrase = term.replace('"', '""')
+        query = f'owner_key : "<{int(user_id)}>" AND description : "{phrase}"'
+        matches = select(literal_column("rowid")).select_from(text("transactions_fts")).where(text("transactions_fts MATCH :query").bindparams(query=query))
+        return models.Transaction.id.in_(matches)
+
+    return models.Transaction.description.ilike(_like_pattern(term), escape="\\")
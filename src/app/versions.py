@@ -0,0 +1,91 @@
+"""
+Versões dos dados listados e ETags das requisições condicionais.
+
+Cada escrita do crud aumenta, na mesma transação do banco, a versão do que ela
+mudou: "user:{id}" para as transações de um usuário e "categories" para as
+categorias. O ETag de uma listagem é montado a partir dessas versões e da query
+string, então um 'If-None-Match' pode ser respondido com 304 lendo só a versão
+(uma busca pela chave primária), sem rodar a consulta da listagem.
+"""
+from typing import Dict, Iterable, Optional
+import hashlib
+
+from fastapi.responses import Response
+from sqlalchemy import insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import models
+
+CATEGORIES_KEY = "categories"
+
+
+def user_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+# Aumenta a versão das chaves (upsert: cria a linha ou soma 1 na existente)
+def bump(db: Session, keys: Iterable[str]):
+    rows = [{"key": key, "version": 1} for key in sorted(set(keys))]
+    if not rows:
+        return
+
+    table = models.LedgerVersion.__table__
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(index_elements=[table.c.key], set_={"version": table.c.version + 1})
+        db.execute(stmt, rows)
+        return
+
+    # Outros bancos: tenta o UPDATE e, se a linha não existir, faz o INSERT
+    for row in rows:
+        result = db.execute(update(table).where(table.c.key == row["key"]).values(version=table.c.version + 1))
+        if result.rowcount == 0:
+            db.execute(insert(table).values(**row))
+
+
+# Leva a versão da chave até 'version' (nunca diminui; usado como marca d'água, não como contador)
+def raise_to(db: Session, key: str, version: int):
+    table = models.LedgerVersion.__table__
+    result = db.execute(update(table).where(table.c.key == key, table.c.version < version).values(version=version))
+    if result.rowcount == 0 and db.scalar(select(table.c.version).where(table.c.key == key)) is None:
+        db.execute(insert(table).values(key=key, version=version))
+
+
+# Consulta das versões de várias chaves (as que não existem valem 0)
+def select_versions(keys: Iterable[str]):
+    table = models.LedgerVersion.__table__
+    return select(table.c.key, table.c.version).where(table.c.key.in_(list(keys)))
+
+
+def get_versions(db: Session, keys: Iterable[str]) -> Dict[str, int]:
+    keys = list(keys)
+    found = dict(db.execute(select_versions(keys)).all())
+    return {key: found.get(key, 0) for key in keys}
+
+
+### ============ ETags ============ ###
+
+# ETag a partir das versões e da query string (páginas/filtros diferentes têm ETags diferentes)
+def make_etag(versions: Dict[str, int], query: str = "") -> str:
+    state = ";".join(f"{key}={version}" for key, version in sorted(versions.items()))
+    digest = hashlib.sha1(f"{state}?{query}".encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+# Compara o If-None-Match com o ETag atual (comparação fraca, como manda o HTTP para GET)
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+# Resposta 304 (sem corpo) para quando o cliente já tem a versão atual
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,131 @@
+"""
+Micro-benchmarks das funções do crud.py sobre o livro-caixa sintético.
+
+Uso (a partir da pasta src/):
+    python -m benchmarks.bench_crud --users 100 --transactions 1000 --out results/crud.json
+"""
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+import argparse
+import random
+import time
+
+from benchmarks import common, ledger
+from sqlalchemy import func, select
+
+from app import crud, models, schemas
+from app.cache import category_cache
+from app.database import SessionLocal
+
+
+# Mede 'call' várias vezes, cada uma com uma sessão nova (como uma requisição)
+def measure(call: Callable, iterations: int, warmup: int) -> List[float]:
+    timings = []
+    for i in range(warmup + iterations):
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            call(db)
+            elapsed = time.perf_counter() - started
+        if i >= warmup:
+            timings.append(elapsed)
+    return timings
+
+
+def build_benchmarks(rng: random.Random) -> Dict[str, Callable]:
+    with SessionLocal() as db:
+        user_ids = list(db.scalars(select(models.User.id)))
+        category_ids = list(db.scalars(select(models.Category.id)))
+        emails = list(db.scalars(select(models.User.email)))
+        category_names = list(db.scalars(select(models.Category.name)))
+        max_transaction_id = db.scalar(select(func.max(models.Transaction.id)))
+
+    def random_transaction(db):
+        # Pega uma transação existente de um usuário aleatório
+        return db.scalar(select(models.Transaction).where(models.Transaction.owner_id == rng.choice(user_ids)).limit(1))
+
+    def page_after(db):
+        user_id = rng.choice(user_ids)
+        _, cursor = crud.get_transactions_page(db, user_id=user_id, limit=50)
+        return crud.get_transactions_page(db, user_id=user_id, limit=50, after=cursor) if cursor else None
+
+    def create(db):
+        return crud.create_transaction(db, schemas.TransactionCreate(description="bench", amount=rng.uniform(-100, 100), category_id=rng.choice(category_ids)), owner_id=rng.choice(user_ids))
+
+    def update(db):
+        transaction = random_transaction(db)
+        return crud.update_transaction(db, user_id=transaction.owner_id, transaction_id=transaction.id, transaction_update=schemas.TransactionPatch(amount=rng.uniform(-100, 100)))
+
+    def delete(db):
+        created = create(db)
+        return crud.delete_transaction(user_id=created.owner_id, transaction_id=created.id, db=db)
+
+    def bulk(db):
+        user_id = rng.choice(user_ids)
+        now = datetime.now()
+        return crud.bulk_create_transactions(db, [
+            {"description": "bench bulk", "amount": 1.0, "category_id": rng.choice(category_ids), "owner_id": user_id, "created_at": now}
+            for _ in range(100)
+        ])
+
+    def cold_category(db):
+        category_cache.clear()
+        return crud.get_cached_category(db, category_id=rng.choice(category_ids))
+
+    today = datetime.now().date()
+
+    return {
+        "get_users": lambda db: crud.get_users(db),
+        "get_user": lambda db: crud.get_user(db, user_id=rng.choice(user_ids)),
+        "get_user_by_email": lambda db: crud.get_user_by_email(db, email=rng.choice(emails)),
+        "get_all_transactions_by_user": lambda db: crud.get_all_transactions_by_user(db, user_id=rng.choice(user_ids)),
+        "get_transactions_page": lambda db: crud.get_transactions_page(db, user_id=rng.choice(user_ids), limit=50),
+        "get_transactions_page_after": page_after,
+        "iter_transactions_by_user": lambda db: sum(len(rows) for rows in crud.iter_transactions_by_user(db, user_id=rng.choice(user_ids))),
+        "iter_transactions_for_export": lambda db: sum(len(rows) for rows in crud.iter_transactions_for_export(db, user_id=rng.choice(user_ids))),
+        "search_transactions_common": lambda db: crud.search_transactions(db, user_id=rng.choice(user_ids), limit=100, q="mercado"),
+        "search_transactions_rare": lambda db: crud.search_transactions(db, user_id=rng.choice(user_ids), limit=100, q=f"Padaria Pão Quente {rng.randrange(1000)}"),
+        "search_transactions_filters": lambda db: crud.search_transactions(db, user_id=rng.choice(user_ids), limit=100, q="uber", min_amount=0, start=today - timedelta(days=365), end=today),
+        "get_transaction_by_user": lambda db: crud.get_transaction_by_user(db, user_id=rng.choice(user_ids), transaction_id=rng.randint(1, max_transaction_id)),
+        "get_summary_category": lambda db: crud.get_summary(db, user_id=rng.choice(user_ids), group_by="category"),
+        "get_summary_month": lambda db: crud.get_summary(db, user_id=rng.choice(user_ids), group_by="month", start=today - timedelta(days=365), end=today),
+        "get_all_categories": lambda db: crud.get_all_categories(db),
+        "get_category_by_id": lambda db: crud.get_category_by_id(db, category_id=rng.choice(category_ids)),
+        "get_category_by_name": lambda db: crud.get_category_by_name(db, category_name=rng.choice(category_names)),
+        "get_cached_category": lambda db: crud.get_cached_category(db, category_id=rng.choice(category_ids)),
+        "get_cached_category_cold": cold_category,
+        "get_existing_category_ids": lambda db: crud.get_existing_category_ids(db, rng.sample(category_ids, min(5, len(category_ids)))),
+        "create_transaction": create,
+        "update_transaction": update,
+        "create_and_delete_transaction": delete,
+        "bulk_create_transactions_100": bulk,
+        "update_user": lambda db: crud.update_user(db, user_id=rng.choice(user_ids), user_update=schemas.UserPatch(name=f"User {rng.random()}")),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ledger.add_arguments(parser)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--only", nargs="*", help="run only these benchmarks")
+    parser.add_argument("--out", default="results/crud.json")
+    args = parser.parse_args()
+
+    common.migrate()
+    dataset = ledger.seed(args.users, args.transactions, args.categories, args.days)
+
+    rng = random.Random(7)
+    results = {}
+    for name, call in build_benchmarks(rng).items():
+        if args.only and name not in args.only:
+            continue
+        results[name] = common.summarize(measure(call, args.iterations, args.warmup))
+        stats = results[name]
+        print(f"{name:<32} p50 {stats['p50_ms']:8.3f} ms   p95 {stats['p95_ms']:8.3f} ms   p99 {stats['p99_ms']:8.3f} ms")
+
+    params = {"iterations": args.iterations, "warmup": args.warmup, "dataset": dataset}
+    common.write_results(args.out, "crud", params, results)
+
+
+if __name__ == "__main__":
+    main()
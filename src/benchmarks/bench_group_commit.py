@@ -0,0 +1,85 @@
+"""
+Benchmark do group commit: um commit por transação x commits em lotes.
+
+Várias threads criam transações ao mesmo tempo, como requisições POST simultâneas:
+
+- per_request: cada criação abre a própria sessão e faz o próprio commit
+  (crud.create_transaction, o caminho padrão do endpoint);
+- group_commit: as criações passam pela GroupCommitQueue (app/group_commit.py).
+
+Mede a vazão (transações/s) e a latência de cada criação (p50/p95/p99), que no
+group commit inclui a espera na fila.
+
+Uso (a partir da pasta src/):
+    python -m benchmarks.bench_group_commit --concurrency 64 --requests 5000 --out results/group_commit.json
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+import argparse
+import time
+
+from benchmarks import common, ledger
+from sqlalchemy import select
+
+from app import crud, models, schemas
+from app.database import SessionLocal
+from app.group_commit import GroupCommitQueue
+
+
+def run(create: Callable[[schemas.TransactionCreate, int], object], user_ids: List[int], category_ids: List[int], requests: int, concurrency: int):
+    def one(n: int) -> float:
+        transaction = schemas.TransactionCreate(description=f"bench {n}", amount=n % 1000 / 10, category_id=category_ids[n % len(category_ids)])
+        started = time.perf_counter()
+        create(transaction, user_ids[n % len(user_ids)])
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        timings = list(executor.map(one, range(requests)))
+    return timings, time.perf_counter() - started
+
+
+def per_request(transaction: schemas.TransactionCreate, owner_id: int):
+    with SessionLocal() as db:
+        return crud.create_transaction(db, transaction=transaction, owner_id=owner_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--max-batch", type=int, default=100)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--out", default="results/group_commit.json")
+    args = parser.parse_args()
+
+    common.migrate()
+    dataset = ledger.seed(users=args.users, transactions_per_user=10, categories=20)
+    with SessionLocal() as db:
+        user_ids = list(db.scalars(select(models.User.id)))
+        category_ids = list(db.scalars(select(models.Category.id)))
+
+    queue = GroupCommitQueue(max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000)
+    modes = {"per_request": per_request, "group_commit": queue.create}
+
+    results = {}
+    for name, create in modes.items():
+        timings, elapsed = run(create, user_ids, category_ids, args.requests, args.concurrency)
+        results[name] = {**common.summarize(timings), "throughput_per_s": args.requests / elapsed}
+        stats = results[name]
+        print(f"{name:<13} {stats['throughput_per_s']:9.0f} tx/s   p50 {stats['p50_ms']:7.2f} ms   p95 {stats['p95_ms']:7.2f} ms   p99 {stats['p99_ms']:7.2f} ms")
+    queue.stop()
+
+    results["group_commit"]["queue"] = queue.stats()
+    print(f"average batch: {results['group_commit']['queue']['average_batch']:.1f}")
+
+    params = {
+        "concurrency": args.concurrency, "requests": args.requests, "users": args.users,
+        "max_batch": args.max_batch, "max_wait_ms": args.max_wait_ms, "dataset": dataset,
+    }
+    common.write_results(args.out, "group_commit", params, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Benchmark do particionamento mensal: tabela comum x tabela particionada (só PostgreSQL).
+
+Cria um schema separado (bench_partitions) com as duas versões da tabela de
+transações, preenchidas com os mesmos dados via generate_series, e mede:
+
+- recent_page: última página (50) de um usuário nos últimos 30 dias;
+- month_total: soma de um usuário em um mês fechado;
+- archive_month: remover o mês mais antigo (DELETE na tabela comum x DETACH da
+  partição). Roda em uma transação desfeita no final, para não mudar os dados.
+
+Uso (a partir da pasta src/, com DATABASE_URL apontando para um PostgreSQL):
+    python -m benchmarks.bench_partitions --rows 50000000 --months 36 --out results/partitions.json
+"""
+from datetime import date
+from typing import Callable, List
+import argparse
+import time
+
+from benchmarks import common
+from sqlalchemy import text
+
+from app import partitions
+from app.database import engine
+
+SCHEMA = "bench_partitions"
+
+COLUMNS = (
+    "id BIGINT NOT NULL, description VARCHAR, amount FLOAT, "
+    "created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, owner_id INTEGER, category_id INTEGER"
+)
+
+# Linhas espalhadas por igual entre usuários e meses (terminando no mês atual)
+FILL = (
+    "INSERT INTO {table} "
+    "SELECT n, 'merchant ' || (n % 500), (n % 10000) / 100.0, "
+    ":first + (n % :span_seconds) * interval '1 second', 1 + n % :users, 1 + n % 20 "
+    "FROM generate_series(1, :rows) AS n"
+)
+
+RECENT_PAGE = (
+    "SELECT id, description, amount, created_at, owner_id, category_id FROM {table} "
+    "WHERE owner_id = :user_id AND created_at >= :since ORDER BY created_at DESC, id DESC LIMIT 50"
+)
+
+MONTH_TOTAL = "SELECT sum(amount) FROM {table} WHERE owner_id = :user_id AND created_at >= :start AND created_at < :end"
+
+
+def build(connection, rows: int, users: int, months: int) -> date:
+    current = partitions.month_start(date.today())
+    first = partitions.add_months(current, -(months - 1))
+    span_seconds = (partitions.add_months(current, 1) - first).days * 86400
+    params = {"rows": rows, "users": users, "first": first, "span_seconds": span_seconds}
+
+    connection.exec_driver_sql(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    connection.exec_driver_sql(f"CREATE SCHEMA {SCHEMA}")
+
+    connection.exec_driver_sql(f"CREATE TABLE {SCHEMA}.plain ({COLUMNS}, PRIMARY KEY (id))")
+    connection.exec_driver_sql(f"CREATE TABLE {SCHEMA}.partitioned ({COLUMNS}, PRIMARY KEY (id, created_at)) PARTITION BY RANGE (created_at)")
+    month = first
+    while month <= current:
+        connection.exec_driver_sql(
+            f"CREATE TABLE {SCHEMA}.{partitions.partition_name(month)} PARTITION OF {SCHEMA}.partitioned "
+            f"FOR VALUES {partitions.partition_bounds(month)}"
+        )
+        month = partitions.add_months(month, 1)
+
+    for table in ("plain", "partitioned"):
+        started = time.perf_counter()
+        connection.execute(text(FILL.format(table=f"{SCHEMA}.{table}")), params)
+        connection.exec_driver_sql(f"CREATE INDEX ON {SCHEMA}.{table} (owner_id, created_at, id)")
+        connection.exec_driver_sql(f"ANALYZE {SCHEMA}.{table}")
+        print(f"{table:<12} loaded {rows} rows in {time.perf_counter() - started:.1f}s")
+    return first
+
+
+def measure(connection, statement: str, params_for: Callable[[int], dict], iterations: int, warmup: int) -> List[float]:
+    timings = []
+    for i in range(warmup + iterations):
+        started = time.perf_counter()
+        connection.execute(text(statement), params_for(i)).all()
+        elapsed = time.perf_counter() - started
+        if i >= warmup:
+            timings.append(elapsed)
+    return timings
+
+
+def archive_cost(connection, table: str, first: date) -> float:
+    transaction = connection.begin_nested()
+    started = time.perf_counter()
+    if table == "plain":
+        connection.execute(
+            text(f"DELETE FROM {SCHEMA}.plain WHERE created_at < :end"), {"end": partitions.add_months(first, 1)}
+        )
+    else:
+        connection.exec_driver_sql(f"ALTER TABLE {SCHEMA}.partitioned DETACH PARTITION {SCHEMA}.{partitions.partition_name(first)}")
+    elapsed = time.perf_counter() - started
+    transaction.rollback()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--months", type=int, default=36)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="keep the bench_partitions schema at the end")
+    parser.add_argument("--out", default="results/partitions.json")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("bench_partitions needs DATABASE_URL pointing to PostgreSQL")
+
+    with engine.connect() as connection:
+        first = build(connection, args.rows, args.users, args.months)
+        connection.commit()
+
+        current = partitions.month_start(date.today())
+        last_month = partitions.add_months(current, -1)
+        since = date.fromordinal(date.today().toordinal() - 30)
+        queries = {
+            "recent_page": (RECENT_PAGE, lambda i: {"user_id": 1 + i % args.users, "since": since}),
+            "month_total": (MONTH_TOTAL, lambda i: {"user_id": 1 + i % args.users, "start": last_month, "end": current}),
+        }
+
+        results = {}
+        for table in ("plain", "partitioned"):
+            results[table] = {}
+            for name, (statement, params_for) in queries.items():
+                stats = common.summarize(measure(connection, statement.format(table=f"{SCHEMA}.{table}"), params_for, args.iterations, args.warmup))
+                results[table][name] = stats
+                print(f"{table:<12} {name:<12} p50 {stats['p50_ms']:8.2f} ms   p95 {stats['p95_ms']:8.2f} ms")
+            results[table]["archive_month_ms"] = archive_cost(connection, table, first) * 1000
+            print(f"{table:<12} archive_month {results[table]['archive_month_ms']:8.2f} ms")
+        connection.rollback()
+
+        if not args.keep:
+            connection.exec_driver_sql(f"DROP SCHEMA {SCHEMA} CASCADE")
+            connection.commit()
+
+    params = {"rows": args.rows, "users": args.users, "months": args.months, "iterations": args.iterations, "warmup": args.warmup}
+    common.write_results(args.out, "partitions", params, results)
+
+
+if __name__ == "__main__":
+    main()
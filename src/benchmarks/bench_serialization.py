@@ -0,0 +1,84 @@
+"""
+Benchmark da serialização das listagens: caminho antigo x caminho rápido.
+
+- orm_pydantic: objetos ORM -> validação pelos schemas -> jsonable_encoder -> json.dumps
+  (o que o FastAPI fazia com response_model nas listagens);
+- rows_orjson: tuplas de colunas -> orjson (fastjson.dumps_rows, usado hoje).
+
+Os dois incluem a consulta e precisam gerar o mesmo JSON (comparado depois do parse:
+floats grandes têm formatos diferentes, ex.: 1e+20 no json e 1e20 no orjson).
+
+Uso (a partir da pasta src/):
+    python -m benchmarks.bench_serialization --rows 10000 --out results/serialization.json
+"""
+from typing import List
+import argparse
+import json
+import time
+
+from benchmarks import common, ledger
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select
+
+from app import crud, fastjson, models, schemas
+from app.database import SessionLocal
+
+TRANSACTION_LIST = TypeAdapter(List[schemas.TransactionSchema])
+
+
+def orm_pydantic(db, user_id: int) -> bytes:
+    transactions = db.query(models.Transaction).filter(models.Transaction.owner_id == user_id).all()
+    validated = TRANSACTION_LIST.validate_python(transactions, from_attributes=True)
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def rows_orjson(db, user_id: int) -> bytes:
+    return fastjson.dumps_rows(crud.get_all_transactions_by_user(db, user_id=user_id))
+
+
+def measure(call, user_id: int, iterations: int, warmup: int) -> List[float]:
+    timings = []
+    for i in range(warmup + iterations):
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            call(db, user_id)
+            elapsed = time.perf_counter() - started
+        if i >= warmup:
+            timings.append(elapsed)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000, help="transactions in the listed response")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--out", default="results/serialization.json")
+    args = parser.parse_args()
+
+    common.migrate()
+    dataset = ledger.seed(users=1, transactions_per_user=args.rows, categories=20)
+
+    with SessionLocal() as db:
+        user_id = db.scalar(select(models.User.id).limit(1))
+        expected = orm_pydantic(db, user_id)
+        if json.loads(rows_orjson(db, user_id)) != json.loads(expected):
+            raise SystemExit("rows_orjson output differs from the schema-based output")
+
+    results = {}
+    for name, call in (("orm_pydantic", orm_pydantic), ("rows_orjson", rows_orjson)):
+        results[name] = common.summarize(measure(call, user_id, args.iterations, args.warmup))
+        stats = results[name]
+        print(f"{name:<14} p50 {stats['p50_ms']:8.2f} ms   p95 {stats['p95_ms']:8.2f} ms")
+
+    speedup = results["orm_pydantic"]["p50_ms"] / results["rows_orjson"]["p50_ms"]
+    print(f"speedup (p50): {speedup:.1f}x  | response size: {len(expected)} bytes")
+
+    params = {"rows": args.rows, "iterations": args.iterations, "warmup": args.warmup, "dataset": dataset}
+    common.write_results(args.out, "serialization", params, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark da inicialização de um worker: do processo novo até o /health/ready responder 200.
+
+Cada rodada inicia um processo Python novo (como um worker novo do autoscaling):
+
+- padrão: o processo importa app.main, roda o lifespan (TestClient, sem rede) e
+  consulta /health/ready até ficar pronto;
+- --uvicorn: sobe 'uvicorn app.main:app' de verdade e consulta /health/ready via HTTP.
+
+Mede o tempo total (wall clock, incluindo o interpretador) e as fases informadas
+pelo próprio /health/ready (import, startup, aquecimento). Termina com erro se o
+p95 do tempo total passar de --target-ms.
+
+Uso (a partir da pasta src/):
+    python -m benchmarks.bench_startup --runs 10 --target-ms 3000 --out results/startup.json
+    python -m benchmarks.bench_startup --uvicorn --runs 5
+"""
+from typing import Dict, List
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks import common
+
+# Roda dentro do processo filho: imprime o JSON do /health/ready quando ficar pronto
+CHILD = """
+import json, time
+from fastapi.testclient import TestClient
+from app.main import app
+with TestClient(app) as client:
+    while True:
+        response = client.get("/health/ready")
+        if response.status_code == 200:
+            print(json.dumps(response.json()), flush=True)
+            break
+        time.sleep(0.005)
+"""
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# O relógio para na linha do /health/ready (o shutdown do processo não entra na conta)
+def run_inprocess(env: Dict[str, str]) -> Dict[str, float]:
+    started = time.perf_counter()
+    child = subprocess.Popen([sys.executable, "-c", CHILD], cwd=common.SRC_DIR, env=env, stdout=subprocess.PIPE, text=True)
+    try:
+        line = child.stdout.readline()
+        total = time.perf_counter() - started
+    finally:
+        child.wait()
+    if not line:
+        raise SystemExit(f"Worker exited with code {child.returncode} before becoming ready")
+    return {"total_seconds": total, **json.loads(line)}
+
+
+def run_uvicorn(env: Dict[str, str], timeout: float = 60.0) -> Dict[str, float]:
+    import httpx
+
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=common.SRC_DIR, env=env,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                response = httpx.get(f"http://127.0.0.1:{port}/health/ready", timeout=1.0)
+                if response.status_code == 200:
+                    return {"total_seconds": time.perf_counter() - started, **response.json()}
+            except httpx.TransportError:
+                pass
+            time.sleep(0.005)
+        raise SystemExit(f"Worker was not ready after {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--uvicorn", action="store_true", help="start a real uvicorn worker instead of an in-process client")
+    parser.add_argument("--target-ms", type=float, default=3000, help="fail if p95 time-to-ready is above this")
+    parser.add_argument("--out", default="results/startup.json")
+    args = parser.parse_args()
+
+    common.migrate()
+    env = {**os.environ, "PYTHONPATH": str(common.SRC_DIR)}
+    run = run_uvicorn if args.uvicorn else run_inprocess
+
+    samples: List[Dict[str, float]] = [run(env) for _ in range(args.runs)]
+    results = {"total": common.summarize([sample["total_seconds"] for sample in samples])}
+    for phase in ("import_seconds", "startup_seconds", "warmup_seconds", "ready_seconds"):
+        results[phase[:-len("_seconds")]] = common.summarize([sample[phase] for sample in samples if sample.get(phase) is not None])
+
+    for name, stats in results.items():
+        print(f"{name:<8} p50 {stats['p50_ms']:8.1f} ms   p95 {stats['p95_ms']:8.1f} ms   max {stats['max_ms']:8.1f} ms")
+
+    params = {"runs": args.runs, "mode": "uvicorn" if args.uvicorn else "inprocess", "target_ms": args.target_ms}
+    common.write_results(args.out, "startup", params, results)
+
+    if results["total"]["p95_ms"] > args.target_ms:
+        print(f"p95 time-to-ready {results['total']['p95_ms']:.0f} ms is above the {args.target_ms:.0f} ms target", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Funções comuns dos benchmarks: banco de testes, estatísticas e arquivos de resultado.
+
+Importe este módulo antes do 'app': sem DATABASE_URL ele aponta a aplicação para
+um SQLite em um diretório temporário.
+"""
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+import json
+import os
+import platform
+import subprocess
+import tempfile
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{Path(tempfile.mkdtemp()) / 'bench.sqlite'}"
+
+SRC_DIR = Path(__file__).resolve().parents[1]
+
+
+# Cria/atualiza a estrutura do banco pelas migrações
+def migrate():
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(SRC_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(SRC_DIR / "migrations"))
+    command.upgrade(config, "head")
+
+
+# Percentil pelo método do vizinho mais próximo (valores já ordenados)
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+# Resumo de uma lista de tempos em segundos (saída em milissegundos)
+def summarize(timings: List[float]) -> Dict[str, float]:
+    values = sorted(t * 1000 for t in timings)
+    return {
+        "count": len(values),
+        "mean_ms": sum(values) / len(values) if values else 0.0,
+        "min_ms": values[0] if values else 0.0,
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": values[-1] if values else 0.0,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SRC_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# Grava o resultado em JSON com os dados necessários para comparar duas execuções
+def write_results(path: str, kind: str, params: Dict[str, Any], results: Dict[str, Any]):
+    from app.database import engine
+
+    payload = {
+        "meta": {
+            "kind": kind,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "database": engine.dialect.name,
+            "python": platform.python_version(),
+            "params": params,
+        },
+        "results": results,
+    }
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps(payload, indent=2))
+    print(f"Results written to {path}")
@@ -0,0 +1,62 @@
+"""
+Compara dois arquivos de resultado dos benchmarks (base x nova execução).
+
+Uso (a partir da pasta src/):
+    python -m benchmarks.compare results/base.json results/new.json --threshold 10
+
+Termina com erro (exit 1) se alguma latência piorar mais que --threshold por cento
+ou se a vazão (throughput) cair mais que isso.
+"""
+from pathlib import Path
+import argparse
+import json
+import sys
+
+LATENCY_METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def _change(base: float, new: float) -> float:
+    return 0.0 if base == 0 else (new - base) / base * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression in percent")
+    args = parser.parse_args()
+
+    base = json.loads(Path(args.base).read_text())
+    new = json.loads(Path(args.new).read_text())
+    if base["meta"]["kind"] != new["meta"]["kind"]:
+        sys.exit(f"Cannot compare '{base['meta']['kind']}' results with '{new['meta']['kind']}' results")
+
+    print(f"base: {base['meta']['git_commit']} ({base['meta']['timestamp']})")
+    print(f"new:  {new['meta']['git_commit']} ({new['meta']['timestamp']})\n")
+
+    regressions = []
+    for name in sorted(set(base["results"]) & set(new["results"])):
+        old_stats, new_stats = base["results"][name], new["results"][name]
+        cells = []
+        for metric in LATENCY_METRICS:
+            change = _change(old_stats[metric], new_stats[metric])
+            cells.append(f"{metric[:-3]} {new_stats[metric]:9.3f} ms ({change:+6.1f}%)")
+            if change > args.threshold:
+                regressions.append(f"{name} {metric} {change:+.1f}%")
+        if "throughput_rps" in old_stats:
+            change = _change(old_stats["throughput_rps"], new_stats["throughput_rps"])
+            cells.append(f"{new_stats['throughput_rps']:8.1f} req/s ({change:+6.1f}%)")
+            if -change > args.threshold:
+                regressions.append(f"{name} throughput {change:+.1f}%")
+        print(f"{name:<32} " + "   ".join(cells))
+
+    if regressions:
+        print(f"\nRegressions above {args.threshold}%:", file=sys.stderr)
+        for regression in regressions:
+            print(f"  {regression}", file=sys.stderr)
+        sys.exit(1)
+    print(f"\nNo regression above {args.threshold}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Gerador de um livro-caixa sintético: N usuários x M transações x K categorias.
+
+Uso (a partir da pasta src/):
+    python -m benchmarks.ledger --users 100 --transactions 1000 --categories 20
+"""
+from datetime import datetime, timedelta
+from typing import Dict
+import argparse
+import random
+import time
+
+from benchmarks import common
+from sqlalchemy import func, insert, select
+
+from app import models, rollups
+from app.database import SessionLocal, engine
+
+INSERT_BATCH_SIZE = 10000
+
+# Descrições no estilo de um extrato bancário (para a busca por texto)
+MERCHANTS = (
+    "Supermercado Extra", "Padaria Pão Quente", "Uber Trip", "iFood Pedido", "Posto Shell",
+    "Farmácia São João", "Netflix Assinatura", "Spotify Premium", "Amazon Marketplace", "Mercado Livre",
+    "Conta de Luz", "Conta de Água", "Aluguel", "Salário", "Transferência PIX",
+    "Restaurante Sabor", "Livraria Cultura", "Academia Fit", "Pet Shop Amigo", "Cinema Center",
+)
+
+
+# Popula o banco. Se já houver usuários, reaproveita os dados existentes.
+def seed(users: int, transactions_per_user: int, categories: int, days: int = 730, random_seed: int = 42) -> Dict[str, int]:
+    with engine.connect() as connection:
+        existing = connection.scalar(select(func.count()).select_from(models.User))
+    if existing:
+        print(f"Reusing existing ledger ({existing} users)")
+        return counts()
+
+    rng = random.Random(random_seed)
+    start = datetime.now() - timedelta(days=days)
+    minutes = days * 24 * 60
+
+    with engine.begin() as connection:
+        connection.execute(insert(models.User), [{"name": f"User {i}", "email": f"user{i}@bench.local"} for i in range(users)])
+        connection.execute(insert(models.Category), [{"name": f"Category {i}"} for i in range(categories)])
+        user_ids = list(connection.scalars(select(models.User.id)))
+        category_ids = list(connection.scalars(select(models.Category.id)))
+
+        batch = []
+        for owner_id in user_ids:
+            for n in range(transactions_per_user):
+                batch.append({
+                    "description": f"{MERCHANTS[n % len(MERCHANTS)]} {n}",
+                    "amount": round(rng.uniform(-500, 500), 2),
+                    "created_at": start + timedelta(minutes=rng.randrange(minutes)),
+                    "owner_id": owner_id,
+                    "category_id": rng.choice(category_ids),
+                })
+                if len(batch) >= INSERT_BATCH_SIZE:
+                    connection.execute(insert(models.Transaction), batch)
+                    batch = []
+        if batch:
+            connection.execute(insert(models.Transaction), batch)
+
+    with SessionLocal() as db:
+        rollups.rebuild(db)
+
+    with engine.begin() as connection:
+        connection.exec_driver_sql("ANALYZE")
+
+    return counts()
+
+
+def counts() -> Dict[str, int]:
+    with engine.connect() as connection:
+        return {
+            table: connection.scalar(select(func.count()).select_from(model))
+            for table, model in (("users", models.User), ("categories", models.Category), ("transactions", models.Transaction))
+        }
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--transactions", type=int, default=1000, help="transactions per user")
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--days", type=int, default=730, help="spread created_at over this many days")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    common.migrate()
+    started = time.perf_counter()
+    print(seed(args.users, args.transactions, args.categories, args.days), f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
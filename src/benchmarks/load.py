@@ -0,0 +1,184 @@
+"""
+Teste de carga HTTP concorrente contra app.main:app.
+
+Por padrão roda a aplicação no próprio processo (ASGI, sem rede). Com --url o
+teste vai contra um servidor já rodando (ex.: uvicorn com vários workers).
+O perfil mistura leituras e escritas com os pesos de PROFILE.
+
+Respostas 429/503 do controle de admissão (app/admission.py) contam como
+'rejected', não como erro, e ficam fora das latências: com ADMISSION_ENABLED=true
+dá para comparar quanto foi recusado com a latência do que foi atendido.
+
+Uso (a partir da pasta src/):
+    python -m benchmarks.load --concurrency 32 --duration 30 --out results/load.json
+    python -m benchmarks.load --url http://localhost:8002 --concurrency 64 --duration 60
+    ADMISSION_ENABLED=true python -m benchmarks.load --concurrency 256 --out results/load_admission.json
+
+Precisa do pacote httpx (requirements-bench.txt).
+"""
+from collections import defaultdict
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks import common, ledger
+import httpx
+from sqlalchemy import select
+
+from app import models
+from app.database import SessionLocal
+
+# Peso de cada operação no perfil misto (leituras e escritas)
+PROFILE = {
+    "list_transactions_page": 30,
+    "get_transaction": 15,
+    "get_user": 10,
+    "list_categories": 10,
+    "summary": 10,
+    "create_transaction": 15,
+    "update_transaction": 7,
+    "delete_transaction": 3,
+}
+
+
+class Workload:
+    def __init__(self, rng: random.Random):
+        with SessionLocal() as db:
+            self.user_ids = list(db.scalars(select(models.User.id)))
+            self.category_ids = list(db.scalars(select(models.Category.id)))
+            # Algumas transações conhecidas por usuário para GET/PATCH
+            self.transactions = [
+                (row.owner_id, row.id)
+                for row in db.execute(select(models.Transaction.owner_id, models.Transaction.id).limit(5000))
+            ]
+        self.created: List[tuple] = []
+        self.rng = rng
+
+    # Monta a requisição de uma operação: (método, caminho, corpo)
+    def request(self, operation: str):
+        rng = self.rng
+        user_id = rng.choice(self.user_ids)
+
+        if operation == "list_transactions_page":
+            return "GET", f"/api/users/{user_id}/transactions/?limit=50", None
+        if operation == "get_transaction":
+            owner_id, transaction_id = rng.choice(self.transactions)
+            return "GET", f"/api/users/{owner_id}/transactions/{transaction_id}/", None
+        if operation == "get_user":
+            return "GET", f"/api/users/{user_id}/", None
+        if operation == "list_categories":
+            return "GET", "/api/categories/", None
+        if operation == "summary":
+            return "GET", f"/api/users/{user_id}/summary?group_by={rng.choice(['category', 'month'])}", None
+        if operation == "create_transaction":
+            body = {"description": "load test", "amount": round(rng.uniform(-100, 100), 2), "category_id": rng.choice(self.category_ids)}
+            return "POST", f"/api/users/{user_id}/transactions/", body
+        if operation == "update_transaction":
+            owner_id, transaction_id = rng.choice(self.transactions)
+            return "PATCH", f"/api/users/{owner_id}/transactions/{transaction_id}/", {"amount": round(rng.uniform(-100, 100), 2)}
+        if operation == "delete_transaction":
+            if not self.created:
+                return self.request("create_transaction")
+            owner_id, transaction_id = self.created.pop()
+            return "DELETE", f"/api/users/{owner_id}/transactions/{transaction_id}/", None
+        raise ValueError(operation)
+
+
+async def run_load(client: httpx.AsyncClient, workload: Workload, concurrency: int, duration: float, max_requests: Optional[int]):
+    operations = list(PROFILE)
+    weights = [PROFILE[name] for name in operations]
+    timings: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    rejected: Dict[str, int] = defaultdict(int)
+    deadline = time.perf_counter() + duration
+    sent = 0
+
+    async def worker():
+        nonlocal sent
+        while time.perf_counter() < deadline and (max_requests is None or sent < max_requests):
+            sent += 1
+            operation = workload.rng.choices(operations, weights)[0]
+            method, path, body = workload.request(operation)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            else:
+                if response.status_code in (429, 503): # Recusada pelo controle de admissão
+                    rejected[operation] += 1
+                    #? Como um cliente de verdade, espera o Retry-After antes de tentar de novo
+                    await asyncio.sleep(min(float(response.headers.get("retry-after", 1)), max(0.0, deadline - time.perf_counter())))
+                    continue
+            timings[operation].append(time.perf_counter() - started)
+            if not ok:
+                errors[operation] += 1
+            elif method == "POST":
+                created = response.json()
+                workload.created.append((created["owner_id"], created["id"]))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for operation in timings.keys() | rejected.keys():
+        values = timings[operation]
+        results[operation] = {
+            **common.summarize(values), "errors": errors[operation], "rejected": rejected[operation], "throughput_rps": len(values) / elapsed,
+        }
+    all_timings = [value for values in timings.values() for value in values]
+    results["overall"] = {
+        **common.summarize(all_timings), "errors": sum(errors.values()), "rejected": sum(rejected.values()), "throughput_rps": len(all_timings) / elapsed,
+    }
+    return results
+
+
+async def main_async(args):
+    workload = Workload(random.Random(11))
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=httpx.Limits(max_connections=args.concurrency))
+    else:
+        from app.main import app
+        #? Erros do app (ex.: timeout do pool sob sobrecarga) viram respostas 500 contadas como erro, sem abortar o teste
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout)
+
+    async with client:
+        return await run_load(client, workload, args.concurrency, args.duration, args.requests)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ledger.add_arguments(parser)
+    parser.add_argument("--url", help="target a running server instead of the in-process app")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds")
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--out", default="results/load.json")
+    args = parser.parse_args()
+
+    common.migrate()
+    dataset = ledger.seed(args.users, args.transactions, args.categories, args.days)
+
+    results = asyncio.run(main_async(args))
+    for operation, stats in sorted(results.items()):
+        print(f"{operation:<24} {stats['throughput_rps']:8.1f} req/s   p50 {stats['p50_ms']:8.2f} ms   p95 {stats['p95_ms']:8.2f} ms   p99 {stats['p99_ms']:8.2f} ms   errors {stats['errors']}   rejected {stats['rejected']}")
+
+    params = {
+        "target": args.url or "in-process",
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "profile": PROFILE,
+        "dataset": dataset,
+    }
+    common.write_results(args.out, "load", params, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Ambiente das migrações do Alembic.
+
+Usa a mesma DATABASE_URL da aplicação. Para aplicar as migrações:
+    alembic upgrade head
+"""
+from logging.config import fileConfig
+import os
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from app import models, partitions, search
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = models.Base.metadata
+
+
+def get_url() -> str:
+    return config.get_main_option("sqlalchemy.url") or os.environ["DATABASE_URL"]
+
+
+#? Objetos do banco criados por SQL próprio (busca FTS5/trigramas, partições mensais) não
+#? existem nos modelos: sem este filtro o autogenerate proporia apagá-los
+def include_object(object, name, type_, reflected, compare_to):
+    if not reflected or compare_to is not None:
+        return True
+    if type_ == "table":
+        return not (name.startswith(search.FTS_TABLE) or partitions.is_partition(name))
+    if type_ == "index":
+        return name not in search.INDEXES
+    return True
+
+
+# Gera o SQL das migrações sem conectar no banco (alembic upgrade head --sql)
+def run_migrations_offline():
+    context.configure(url=get_url(), target_metadata=target_metadata, literal_binds=True, include_object=include_object)
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+# Aplica as migrações conectando no banco
+def run_migrations_online():
+    connectable = create_engine(get_url(), poolclass=pool.NullPool)
+
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,73 @@
+"""Estrutura inicial (a mesma que o create_all gerava)
+
+Bancos que já foram criados pelo antigo create_all no import do main.py já têm
+essas tabelas: nesse caso a tabela é mantida como está e só a versão é marcada.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not _has_table("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String()),
+            sa.Column("email", sa.String()),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_name", "users", ["name"])
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if not _has_table("categories"):
+        op.create_table(
+            "categories",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(), nullable=False),
+        )
+        op.create_index("ix_categories_id", "categories", ["id"])
+        op.create_index("ix_categories_name", "categories", ["name"], unique=True)
+
+    if not _has_table("transactions"):
+        op.create_table(
+            "transactions",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("description", sa.String()),
+            sa.Column("amount", sa.Float()),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE")),
+            sa.Column("category_id", sa.Integer(), sa.ForeignKey("categories.id", ondelete="CASCADE")),
+        )
+        op.create_index("ix_transactions_id", "transactions", ["id"])
+        op.create_index("ix_transactions_description", "transactions", ["description"])
+
+    if not _has_table("transaction_rollups"):
+        op.create_table(
+            "transaction_rollups",
+            sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("category_id", sa.Integer(), sa.ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("month", sa.Date(), primary_key=True),
+            sa.Column("total_amount", sa.Float(), nullable=False),
+            sa.Column("transaction_count", sa.Integer(), nullable=False),
+        )
+
+
+def downgrade():
+    op.drop_table("transaction_rollups")
+    op.drop_table("transactions")
+    op.drop_table("categories")
+    op.drop_table("users")
@@ -0,0 +1,49 @@
+"""Índices guiados pelas consultas do crud.py
+
+Remove:
+  - ix_transactions_description: nenhuma consulta filtra pela descrição e o
+    índice deixava todo INSERT de transação mais lento;
+  - ix_users_name: nenhuma consulta filtra pelo nome;
+  - ix_users_id, ix_transactions_id, ix_categories_id: duplicavam a chave primária.
+
+Cria:
+  - ix_transactions_owner_created (owner_id, created_at, id): listagem, paginação
+    por cursor e exportação das transações de um usuário;
+  - ix_transactions_category_id: exclusão em cascata de uma categoria;
+  - ix_transaction_rollups_category_id: exclusão dos resumos de uma categoria.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16
+"""
+from alembic import op
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_index("ix_transactions_description", table_name="transactions", if_exists=True)
+    op.drop_index("ix_users_name", table_name="users", if_exists=True)
+    op.drop_index("ix_users_id", table_name="users", if_exists=True)
+    op.drop_index("ix_transactions_id", table_name="transactions", if_exists=True)
+    op.drop_index("ix_categories_id", table_name="categories", if_exists=True)
+
+    op.create_index("ix_transactions_owner_created", "transactions", ["owner_id", "created_at", "id"], if_not_exists=True)
+    op.create_index("ix_transactions_category_id", "transactions", ["category_id"], if_not_exists=True)
+    op.create_index("ix_transaction_rollups_category_id", "transaction_rollups", ["category_id"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_transaction_rollups_category_id", table_name="transaction_rollups")
+    op.drop_index("ix_transactions_category_id", table_name="transactions")
+    op.drop_index("ix_transactions_owner_created", table_name="transactions")
+
+    op.create_index("ix_categories_id", "categories", ["id"])
+    op.create_index("ix_transactions_id", "transactions", ["id"])
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_name", "users", ["name"])
+    op.create_index("ix_transactions_description", "transactions", ["description"])
@@ -0,0 +1,58 @@
+"""Índice de texto para a busca nas descrições das transações
+
+- PostgreSQL: pg_trgm + btree_gin e um índice GIN em (owner_id, description)
+  para o ILIKE '%termo%' dentro das transações de um usuário;
+- SQLite: tabela virtual FTS5 (tokenizer trigram) com a descrição e o usuário,
+  mantida por triggers.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16
+"""
+from alembic import op
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+POSTGRES_UPGRADE = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS btree_gin",
+    "CREATE INDEX IF NOT EXISTS ix_transactions_owner_description_trgm ON transactions USING gin (owner_id, description gin_trgm_ops)",
+)
+
+SQLITE_UPGRADE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5("
+    "description, owner_key, content='', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_insert AFTER INSERT ON transactions BEGIN "
+    "INSERT INTO transactions_fts(rowid, description, owner_key) VALUES (new.id, new.description, '<' || new.owner_id || '>'); END",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_delete AFTER DELETE ON transactions BEGIN "
+    "INSERT INTO transactions_fts(transactions_fts, rowid, description, owner_key) "
+    "VALUES ('delete', old.id, old.description, '<' || old.owner_id || '>'); END",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_update AFTER UPDATE OF description, owner_id ON transactions BEGIN "
+    "INSERT INTO transactions_fts(transactions_fts, rowid, description, owner_key) "
+    "VALUES ('delete', old.id, old.description, '<' || old.owner_id || '>'); "
+    "INSERT INTO transactions_fts(rowid, description, owner_key) VALUES (new.id, new.description, '<' || new.owner_id || '>'); END",
+    # Indexa as transações que já existiam
+    "INSERT INTO transactions_fts(rowid, description, owner_key) SELECT id, description, '<' || owner_id || '>' FROM transactions",
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    statements = POSTGRES_UPGRADE if dialect == "postgresql" else SQLITE_UPGRADE if dialect == "sqlite" else ()
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_transactions_owner_description_trgm")
+    elif dialect == "sqlite":
+        for trigger in ("transactions_fts_insert", "transactions_fts_delete", "transactions_fts_update"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS transactions_fts")
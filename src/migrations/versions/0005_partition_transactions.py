@@ -0,0 +1,128 @@
+"""Particionamento mensal das transações (opcional, só PostgreSQL)
+
+Só faz algo no PostgreSQL com TRANSACTIONS_PARTITIONED=true: a tabela
+'transactions' vira particionada por intervalo de 'created_at' (uma partição
+por mês + partição padrão), com os dados copiados. No SQLite, ou sem a
+variável, a migração não muda nada (dá para rodar 'python -m app.partitions
+convert' depois).
+
+O SQL fica aqui como era nesta revisão (não vem de app.partitions), para a
+migração não mudar junto com o código do app.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16
+"""
+from datetime import date
+import os
+
+from alembic import op
+from sqlalchemy import text
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+TRANSACTIONS_PARTITIONED = os.getenv("TRANSACTIONS_PARTITIONED", "false").lower() in ("1", "true", "yes")
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+
+INDEXES = ("ix_transactions_owner_created", "ix_transactions_category_id", "ix_transactions_owner_description_trgm")
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _is_partitioned(connection) -> bool:
+    return bool(connection.scalar(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'transactions' AND pg_table_is_visible(c.oid))"
+    )))
+
+
+def _create_indexes(connection):
+    connection.exec_driver_sql("CREATE INDEX ix_transactions_owner_created ON transactions (owner_id, created_at, id)")
+    connection.exec_driver_sql("CREATE INDEX ix_transactions_category_id ON transactions (category_id)")
+    if connection.scalar(text("SELECT count(*) FROM pg_extension WHERE extname IN ('pg_trgm', 'btree_gin')")) == 2:
+        connection.exec_driver_sql(
+            "CREATE INDEX ix_transactions_owner_description_trgm ON transactions USING gin (owner_id, description gin_trgm_ops)"
+        )
+
+
+def upgrade():
+    connection = op.get_bind()
+    if connection.dialect.name != "postgresql" or not TRANSACTIONS_PARTITIONED or _is_partitioned(connection):
+        return
+
+    connection.exec_driver_sql("ALTER TABLE transactions RENAME TO transactions_unpartitioned")
+    connection.exec_driver_sql("ALTER TABLE transactions_unpartitioned RENAME CONSTRAINT transactions_pkey TO transactions_unpartitioned_pkey")
+    for index in INDEXES:
+        connection.exec_driver_sql(f"ALTER INDEX IF EXISTS {index} RENAME TO {index}_unpartitioned")
+
+    #? A chave primária precisa incluir a coluna de particionamento
+    connection.exec_driver_sql(
+        "CREATE TABLE transactions ("
+        "id INTEGER NOT NULL DEFAULT nextval('transactions_id_seq'), "
+        "description VARCHAR, "
+        "amount FLOAT, "
+        "created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, "
+        "owner_id INTEGER REFERENCES users (id) ON DELETE CASCADE, "
+        "category_id INTEGER REFERENCES categories (id) ON DELETE CASCADE, "
+        "PRIMARY KEY (id, created_at)"
+        ") PARTITION BY RANGE (created_at)"
+    )
+    connection.exec_driver_sql("CREATE TABLE transactions_default PARTITION OF transactions DEFAULT")
+
+    # Uma partição por mês, da transação mais antiga até PARTITION_MONTHS_AHEAD à frente
+    today = date.today()
+    current = date(today.year, today.month, 1)
+    first = connection.scalar(text("SELECT min(created_at) FROM transactions_unpartitioned"))
+    month = date(first.year, first.month, 1) if first else current
+    while month <= _add_months(current, PARTITION_MONTHS_AHEAD):
+        connection.exec_driver_sql(
+            f"CREATE TABLE transactions_y{month.year:04d}m{month.month:02d} PARTITION OF transactions "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+
+    # Linhas sem data (não deveriam existir) vão para a partição padrão
+    connection.exec_driver_sql(
+        "INSERT INTO transactions (id, description, amount, created_at, owner_id, category_id) "
+        "SELECT id, description, amount, COALESCE(created_at, 'epoch'), owner_id, category_id FROM transactions_unpartitioned"
+    )
+
+    # Os índices são criados depois da cópia (mais rápido) e valem para todas as partições
+    _create_indexes(connection)
+    connection.exec_driver_sql("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id")
+    connection.exec_driver_sql("DROP TABLE transactions_unpartitioned")
+    connection.exec_driver_sql("ANALYZE transactions")
+
+
+def downgrade():
+    connection = op.get_bind()
+    if connection.dialect.name != "postgresql" or not _is_partitioned(connection):
+        return
+
+    connection.exec_driver_sql("ALTER TABLE transactions RENAME TO transactions_partitioned")
+    for index in INDEXES:
+        connection.exec_driver_sql(f"ALTER INDEX IF EXISTS {index} RENAME TO {index}_partitioned")
+
+    connection.exec_driver_sql(
+        "CREATE TABLE transactions ("
+        "id INTEGER NOT NULL DEFAULT nextval('transactions_id_seq') PRIMARY KEY, "
+        "description VARCHAR, "
+        "amount FLOAT, "
+        "created_at TIMESTAMP WITHOUT TIME ZONE, "
+        "owner_id INTEGER REFERENCES users (id) ON DELETE CASCADE, "
+        "category_id INTEGER REFERENCES categories (id) ON DELETE CASCADE"
+        ")"
+    )
+    connection.exec_driver_sql(
+        "INSERT INTO transactions SELECT id, description, amount, created_at, owner_id, category_id FROM transactions_partitioned"
+    )
+    _create_indexes(connection)
+    connection.exec_driver_sql("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id")
+    connection.exec_driver_sql("DROP TABLE transactions_partitioned CASCADE")
@@ -0,0 +1,36 @@
+"""Jobs de exclusão em segundo plano (DELETE ?mode=async)
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "purge_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("resource", sa.String(), nullable=False),
+        sa.Column("resource_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("deleted", sa.Integer(), nullable=False),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_purge_jobs_status", "purge_jobs", ["status"])
+
+
+def downgrade():
+    op.drop_index("ix_purge_jobs_status", table_name="purge_jobs")
+    op.drop_table("purge_jobs")
@@ -0,0 +1,34 @@
+"""Eventos de mudança nas transações (feed por usuário)
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "transaction_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("transaction_id", sa.Integer(), nullable=True),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("data", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_transaction_events_owner_id", "transaction_events", ["owner_id", "id"])
+    op.create_index("ix_transaction_events_created_at", "transaction_events", ["created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_transaction_events_created_at", table_name="transaction_events")
+    op.drop_index("ix_transaction_events_owner_id", table_name="transaction_events")
+    op.drop_table("transaction_events")
@@ -0,0 +1,61 @@
+"""created_at obrigatório nas transações
+
+A paginação por cursor ordena por (created_at, id) e o cursor guarda o created_at
+da última linha, então ele não pode ser nulo. As linhas antigas sem data recebem
+a data da migração antes do NOT NULL, no mesmo relógio do app (datetime.now(),
+hora local): CURRENT_TIMESTAMP é UTC e poderia pôr a linha em outro dia ou mês.
+
+No SQLite a coluna só muda recriando a tabela (batch do Alembic), o que apaga os
+triggers da busca (transactions_fts): eles são criados de novo no fim, como a
+migração 0004 os criou (o SQL fica aqui, não vem de app.search). Os ids não
+mudam, então o índice FTS5 continua valendo.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+SQLITE_SEARCH_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_insert AFTER INSERT ON transactions BEGIN "
+    "INSERT INTO transactions_fts(rowid, description, owner_key) VALUES (new.id, new.description, '<' || new.owner_id || '>'); END",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_delete AFTER DELETE ON transactions BEGIN "
+    "INSERT INTO transactions_fts(transactions_fts, rowid, description, owner_key) "
+    "VALUES ('delete', old.id, old.description, '<' || old.owner_id || '>'); END",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_update AFTER UPDATE OF description, owner_id ON transactions BEGIN "
+    "INSERT INTO transactions_fts(transactions_fts, rowid, description, owner_key) "
+    "VALUES ('delete', old.id, old.description, '<' || old.owner_id || '>'); "
+    "INSERT INTO transactions_fts(rowid, description, owner_key) VALUES (new.id, new.description, '<' || new.owner_id || '>'); END",
+)
+
+
+def _recreate_search_triggers():
+    if op.get_bind().dialect.name == "sqlite":
+        for statement in SQLITE_SEARCH_TRIGGERS:
+            op.execute(statement)
+
+
+def _set_nullable(nullable: bool):
+    with op.batch_alter_table("transactions") as batch:
+        batch.alter_column("created_at", existing_type=sa.DateTime(), nullable=nullable)
+    _recreate_search_triggers()
+
+
+def upgrade():
+    now = sa.bindparam("now", datetime.now(), type_=sa.DateTime())
+    op.execute(sa.text("UPDATE transactions SET created_at = :now WHERE created_at IS NULL").bindparams(now))
+    _set_nullable(False)
+
+
+def downgrade():
+    _set_nullable(True)
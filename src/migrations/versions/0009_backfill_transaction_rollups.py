@@ -0,0 +1,46 @@
+"""Preenche os resumos mensais com as transações que já existiam
+
+A 0001 cria 'transaction_rollups' vazia, e os resumos só mudam junto com as
+escritas da API. Um banco que já tinha transações ficava com o /summary zerado
+ou parcial: aqui os resumos são recalculados a partir de 'transactions' (um
+INSERT ... SELECT ... GROUP BY owner_id, category_id, mês). O SQL fica aqui,
+como app.rollups.rebuild fazia nesta revisão, sem importar o código do app.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+# Primeiro dia do mês de 'created_at' (depende do banco)
+MONTH_EXPRESSION = {
+    "postgresql": "CAST(date_trunc('month', created_at) AS DATE)",
+    "sqlite": "date(created_at, 'start of month')",
+}
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect not in MONTH_EXPRESSION:
+        raise NotImplementedError(f"Rollup backfill is not supported on '{dialect}'")
+    month = MONTH_EXPRESSION[dialect]
+
+    op.execute("DELETE FROM transaction_rollups")
+    # Linhas sem usuário ou categoria não entram no resumo (a chave do resumo não aceita nulo)
+    op.execute(
+        "INSERT INTO transaction_rollups (owner_id, category_id, month, total_amount, transaction_count) "
+        f"SELECT owner_id, category_id, {month}, SUM(amount), COUNT(*) FROM transactions "
+        "WHERE owner_id IS NOT NULL AND category_id IS NOT NULL "
+        f"GROUP BY owner_id, category_id, {month}"
+    )
+
+
+def downgrade():
+    pass # Só dados: os resumos continuam válidos
@@ -0,0 +1,143 @@
+"""
+Checagem dos planos de consulta do crud.py.
+
+Cria o banco pelas migrações (alembic upgrade head), popula com um volume grande
+de dados, executa as consultas do crud capturando o SQL gerado e roda EXPLAIN em
+cada uma. Termina com erro (exit 1) se alguma consulta precisar de uma varredura
+completa (seq scan) em uma tabela grande, ou seja, se faltar um índice.
+
+Uso (a partir da pasta src/):
+    python -m scripts.check_query_plans
+    DATABASE_URL=postgresql://... python -m scripts.check_query_plans --users 500 --transactions 2000
+"""
+from datetime import datetime, timedelta
+import argparse
+import json
+import re
+import sys
+
+# O 'common' aponta para um SQLite temporário quando não há DATABASE_URL
+from benchmarks import common, ledger
+from sqlalchemy import event, func, select
+
+from app import changefeed, crud, models, purge, schemas
+from app.database import SessionLocal, engine
+
+# Tabelas pequenas por natureza (ler inteiras é mais barato que usar índice)
+SMALL_TABLE_ROWS = 1000
+
+# Consultas que listam uma tabela inteira de propósito e por isso não são checadas:
+# crud.get_users, crud.get_all_categories e rollups.rebuild.
+
+
+# Cada checagem chama uma função do crud como a API chamaria
+def build_checks(db):
+    user = db.scalar(select(models.User).order_by(models.User.id.desc()))
+    transaction = db.scalar(select(models.Transaction).where(models.Transaction.owner_id == user.id))
+    category = db.scalar(select(models.Category))
+    _, cursor = crud.get_transactions_page(db, user_id=user.id, limit=10)
+    today = datetime.now().date()
+
+    return [
+        ("get_user", lambda: crud.get_user(db, user_id=user.id)),
+        ("get_user_by_email", lambda: crud.get_user_by_email(db, email=user.email)),
+        ("get_all_transactions_by_user", lambda: crud.get_all_transactions_by_user(db, user_id=user.id)),
+        ("get_transactions_page", lambda: crud.get_transactions_page(db, user_id=user.id, limit=50)),
+        ("get_transactions_page (after)", lambda: crud.get_transactions_page(db, user_id=user.id, limit=50, after=cursor)),
+        ("get_transactions_page (expand)", lambda: crud.get_transactions_page(db, user_id=user.id, limit=50, expand=("category", "owner"))),
+        ("iter_transactions_by_user", lambda: next(crud.iter_transactions_by_user(db, user_id=user.id), None)),
+        ("search_transactions", lambda: crud.search_transactions(db, user_id=user.id, limit=50, q="mercado", min_amount=0)),
+        ("search_transactions (filters)", lambda: crud.search_transactions(db, user_id=user.id, limit=50, start=today - timedelta(days=90), end=today, category_id=category.id)),
+        ("get_transaction_by_user", lambda: crud.get_transaction_by_user(db, user_id=user.id, transaction_id=transaction.id)),
+        ("get_transaction_row (expand)", lambda: crud.get_transaction_row(db, user_id=user.id, transaction_id=transaction.id, expand=("category", "owner"))),
+        ("get_users_by_ids", lambda: crud.get_users_by_ids(db, [user.id, user.id - 1, user.id - 2])),
+        ("get_summary (category)", lambda: crud.get_summary(db, user_id=user.id, group_by="category")),
+        ("get_summary (month)", lambda: crud.get_summary(db, user_id=user.id, group_by="month", start=today - timedelta(days=90), end=today)),
+        ("changefeed.get_events", lambda: changefeed.get_events(db, owner_id=user.id, after=0)),
+        ("changefeed.start_position", lambda: changefeed.start_position(db, owner_id=user.id, after=None)),
+        ("get_category_by_id", lambda: crud.get_category_by_id(db, category_id=category.id)),
+        ("get_category_by_name", lambda: crud.get_category_by_name(db, category_name=category.name)),
+        ("update_transaction", lambda: crud.update_transaction(db, user_id=user.id, transaction_id=transaction.id, transaction_update=schemas.TransactionPatch(amount=1.0))),
+        ("update_user", lambda: crud.update_user(db, user_id=user.id, user_update=schemas.UserPatch(name="Renamed"))),
+        ("delete_transaction", lambda: crud.delete_transaction(user_id=user.id, transaction_id=transaction.id, db=db)),
+        # Um lote da exclusão em segundo plano (DELETE ?mode=async) de cada tipo de alvo
+        ("purge_batch (user)", lambda: purge.purge_batch(db, models.PurgeJob(resource="user", resource_id=user.id, deleted=0), batch_size=10)),
+        ("purge_batch (category)", lambda: purge.purge_batch(db, models.PurgeJob(resource="category", resource_id=category.id, deleted=0), batch_size=10)),
+    ]
+
+
+# Tabelas grandes o suficiente para que uma varredura completa seja um problema
+def large_tables():
+    tables = set()
+    with engine.connect() as connection:
+        for table in models.Base.metadata.sorted_tables:
+            if connection.scalar(select(func.count()).select_from(table)) >= SMALL_TABLE_ROWS:
+                tables.add(table.name)
+    return tables
+
+
+# Devolve as tabelas grandes lidas por varredura completa no plano da consulta
+def full_scans(connection, statement: str, parameters, tables) -> list:
+    if engine.dialect.name == "sqlite":
+        plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        scanned = [re.match(r"SCAN (\w+)", row[3]) for row in plan]
+        return [match.group(1) for match in scanned if match and match.group(1) in tables]
+
+    if engine.dialect.name == "postgresql":
+        plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+
+        def walk(node):
+            if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in tables:
+                yield node["Relation Name"]
+            for child in node.get("Plans", ()):
+                yield from walk(child)
+
+        return list(walk(plan[0]["Plan"]))
+
+    raise SystemExit(f"Query plan check is not supported on '{engine.dialect.name}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--transactions", type=int, default=500, help="transactions per user")
+    parser.add_argument("--categories", type=int, default=20)
+    args = parser.parse_args()
+
+    common.migrate()
+    ledger.seed(args.users, args.transactions, args.categories)
+    tables = large_tables()
+
+    # Guarda o SQL de cada consulta executada
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "UPDATE", "DELETE"):
+            captured.append((statement, parameters))
+
+    failures = 0
+    with SessionLocal() as db:
+        for label, call in build_checks(db):
+            captured.clear()
+            event.listen(engine, "before_cursor_execute", capture)
+            try:
+                call()
+            finally:
+                event.remove(engine, "before_cursor_execute", capture)
+
+            with engine.connect() as connection:
+                scans = sorted({table for statement, parameters in captured for table in full_scans(connection, statement, parameters, tables)})
+
+            status = f"SEQ SCAN on {', '.join(scans)}" if scans else "ok"
+            failures += bool(scans)
+            print(f"{label:<32} {len(captured)} statement(s)  {status}")
+
+    if failures:
+        print(f"\n{failures} crud query(ies) need a sequential scan on a large table", file=sys.stderr)
+        sys.exit(1)
+    print("\nAll crud queries use an index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Configuração dos testes: banco SQLite temporário (tabelas criadas pelos modelos)
+e um TestClient com o lifespan do app. Cada teste começa com as tabelas vazias.
+
+Uso (a partir da pasta src/):
+    python -m pytest -q
+    DATABASE_ASYNC=true python -m pytest -q   # só o modo assíncrono (aiosqlite)
+"""
+from pathlib import Path
+import os
+import tempfile
+
+#? O app lê a configuração no import: o banco de teste precisa estar definido antes
+_DB_DIR = tempfile.mkdtemp(prefix="ledger-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/test.db"
+os.environ["DATABASE_AUTO_CREATE"] = "true"
+
+import pytest
+from alembic.config import Config
+from fastapi.testclient import TestClient
+
+from app import database, models
+from app.cache import category_cache
+from app.main import app
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+
+
+def _clean_tables():
+    with database.engine.begin() as connection:
+        for table in reversed(models.Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+    category_cache.clear()
+
+
+@pytest.fixture(scope="session")
+def _app_client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def client(_app_client):
+    _clean_tables()
+    yield _app_client
+    _app_client.cookies.clear()
+
+
+@pytest.fixture
+def db(client):
+    with database.SessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+def user(client):
+    response = client.post("/api/users/", json={"name": "Ana", "email": "ana@example.com"})
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+@pytest.fixture
+def category(client):
+    response = client.post("/api/categories/", json={"name": "Mercado"})
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+# Configuração do Alembic apontando para um banco SQLite novo (para testar as migrações)
+@pytest.fixture
+def alembic_config(tmp_path):
+    config = Config(str(SRC_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(SRC_DIR / "migrations"))
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{tmp_path / 'migrated.db'}")
+    return config
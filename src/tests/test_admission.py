@@ -0,0 +1,115 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import admission
+
+
+async def _take_turn(limit: admission.ConcurrencyLimit, name: str, order: list):
+    if await limit.acquire(1.0) == "ok":
+        order.append(name)
+        await asyncio.sleep(0)
+        limit.release()
+
+
+### ============ ConcurrencyLimit ============ ###
+
+def test_released_slot_goes_to_the_oldest_waiter():
+    async def scenario():
+        limit = admission.ConcurrencyLimit(1)
+        order = []
+        assert await limit.acquire(0) == "ok"
+        waiting = asyncio.create_task(_take_turn(limit, "waiting", order))
+        await asyncio.sleep(0)
+        assert limit.queued == 1
+
+        #? Quem chega logo depois do release entra na fila: não pega a vaga de quem já esperava
+        limit.release()
+        late = asyncio.create_task(_take_turn(limit, "late", order))
+        await asyncio.gather(waiting, late)
+        return order, limit
+
+    order, limit = asyncio.run(scenario())
+    assert order == ["waiting", "late"]
+    assert (limit.active, limit.queued) == (0, 0)
+
+
+def test_waiter_gives_up_after_timeout():
+    async def scenario():
+        limit = admission.ConcurrencyLimit(1)
+        await limit.acquire(0)
+        return await limit.acquire(0.01), await limit.acquire(0), limit
+
+    waited, immediate, limit = asyncio.run(scenario())
+    assert (waited, immediate) == ("timeout", "timeout")
+    assert (limit.active, limit.queued) == (1, 0)
+
+
+def test_full_queue_is_refused_at_once():
+    async def scenario():
+        limit = admission.ConcurrencyLimit(1, max_queue=1)
+        await limit.acquire(0)
+        waiter = asyncio.create_task(limit.acquire(1.0))
+        await asyncio.sleep(0)
+        refused = await limit.acquire(1.0)
+        waiter.cancel()
+        return refused
+
+    assert asyncio.run(scenario()) == "queue_full"
+
+
+def test_slot_handed_to_a_cancelled_waiter_is_not_lost():
+    async def scenario():
+        limit = admission.ConcurrencyLimit(1)
+        order = []
+        await limit.acquire(0)
+        first = asyncio.create_task(_take_turn(limit, "first", order))
+        second = asyncio.create_task(_take_turn(limit, "second", order))
+        await asyncio.sleep(0)
+
+        limit.release() # A vaga vai para "first"...
+        first.cancel()  # ...que desiste antes de rodar: ou ele a usa, ou ela passa para "second"
+        await asyncio.gather(first, second, return_exceptions=True)
+        return order, limit
+
+    order, limit = asyncio.run(scenario())
+    assert order[-1] == "second"
+    assert (limit.active, limit.queued) == (0, 0)
+
+
+### ============ Middleware ============ ###
+
+def _client(controller: admission.AdmissionController) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(admission.AdmissionMiddleware, routes=app.router.routes, controller=controller)
+
+    @app.get("/api/users/{user_id}/things")
+    def read_things(user_id: int):
+        return []
+
+    @app.post("/api/users/{user_id}/things")
+    def write_thing(user_id: int):
+        return {}
+
+    return TestClient(app)
+
+
+def test_full_route_answers_503_with_retry_after():
+    controller = admission.AdmissionController(max_concurrency=10, route_concurrency=1, route_limits={}, max_wait=0.01, user_rate=0)
+    assert asyncio.run(controller.route_limit("GET /api/users/{user_id}/things").acquire(0)) == "ok" # Vaga ocupada
+
+    response = _client(controller).get("/api/users/1/things")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(admission.ADMISSION_RETRY_AFTER)
+    assert controller.stats()["rejected"] == [{"route": "GET /api/users/{user_id}/things", "reason": "timeout", "count": 1}]
+
+
+def test_user_writes_over_the_burst_answer_429():
+    controller = admission.AdmissionController(max_concurrency=10, route_concurrency=10, route_limits={}, user_rate=0.001, user_burst=2)
+    client = _client(controller)
+
+    assert [client.post("/api/users/1/things").status_code for _ in range(3)] == [200, 200, 429]
+    assert client.post("/api/users/2/things").status_code == 200 # Outro usuário, outro bucket
+    assert client.get("/api/users/1/things").status_code == 200  # Leituras não gastam token
+    assert controller.total.active == 0
@@ -0,0 +1,73 @@
+"""
+Modo assíncrono (DATABASE_ASYNC=true, aiosqlite nos testes).
+
+O modo é lido no import do app, então a suíte inteira roda de novo em outro
+processo com a variável ligada. Para rodar só nesse modo:
+    DATABASE_ASYNC=true python -m pytest -q
+"""
+from pathlib import Path
+import os
+import subprocess
+import sys
+
+import pytest
+from starlette.routing import Match
+
+from app import database
+from app.main import app
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+
+# Rotas que não têm versão assíncrona e continuam no threadpool nos dois modos
+SYNC_ONLY = (
+    ("POST", "/api/users/1/transactions/bulk"),
+    ("GET", "/api/users/1/summary"),
+    ("GET", "/api/users/1/transactions/stream"),
+    ("GET", "/api/users/1/transactions/export"),
+    ("GET", "/api/transactions/export"),
+    ("GET", "/api/categories/cache/stats"),
+)
+
+ASYNC = (
+    ("GET", "/api/users/"),
+    ("POST", "/api/users/"),
+    ("GET", "/api/users/1/transactions/"),
+    ("GET", "/api/users/1/transactions/search"),
+    ("POST", "/api/users/1/transactions/"),
+    ("PATCH", "/api/users/1/transactions/2/"),
+    ("DELETE", "/api/users/1/transactions/2/"),
+    ("GET", "/api/categories/"),
+    ("GET", "/api/jobs/1/"),
+)
+
+
+def _endpoint_module(method: str, path: str) -> str:
+    scope = {"type": "http", "method": method, "path": path}
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.endpoint.__module__
+    raise AssertionError(f"No route for {method} {path}")
+
+
+@pytest.fixture(scope="module")
+def async_suite():
+    """Roda a suíte em outro processo com DATABASE_ASYNC=true (o conftest de lá cria o próprio banco)."""
+    env = {**os.environ, "DATABASE_ASYNC": "true"}
+    return subprocess.run(
+        [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", "tests"],
+        cwd=SRC_DIR, env=env, capture_output=True, text=True,
+    )
+
+
+@pytest.mark.skipif(database.DATABASE_ASYNC, reason="esta execução já está no modo assíncrono")
+def test_endpoint_tests_pass_in_async_mode(async_suite):
+    assert async_suite.returncode == 0, async_suite.stdout[-5000:] + async_suite.stderr[-2000:]
+
+
+@pytest.mark.skipif(not database.DATABASE_ASYNC, reason="só no modo assíncrono")
+def test_async_router_answers_before_the_sync_routes():
+    for method, path in ASYNC:
+        assert _endpoint_module(method, path) == "app.api_async", (method, path)
+    for method, path in SYNC_ONLY:
+        assert _endpoint_module(method, path) == "app.main", (method, path)
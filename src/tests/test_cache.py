@@ -0,0 +1,39 @@
+from app import crud
+from app.cache import MISSING, TTLCache, category_cache
+
+
+def test_value_loaded_before_a_clear_is_not_stored():
+    cache = TTLCache()
+
+    def load():
+        cache.clear() # Uma escrita invalida o cache enquanto a leitura ainda carrega as linhas antigas
+        return "old"
+
+    assert cache.get_or_load("key", load) == "old"
+    assert cache.get("key") is MISSING
+    assert cache.get_or_load("key", lambda: "new") == "new"
+    assert cache.get("key") == "new"
+
+
+def test_set_with_an_old_generation_is_refused():
+    cache = TTLCache()
+    generation = cache.generation
+    cache.clear()
+    assert cache.set("key", "old", generation=generation) is False
+    assert cache.get("key") is MISSING
+    assert cache.set("key", "new", generation=cache.generation) is True
+
+
+def test_category_etag_and_body_come_from_the_same_load(client, db, category):
+    version, payload = crud.get_cached_categories_json(db)
+    etag = client.get("/api/categories/").headers["etag"]
+
+    client.post("/api/categories/", json={"name": "Lazer"})
+    new_version, new_payload = crud.get_cached_categories_json(db)
+    assert new_version != version and b"Lazer" in new_payload
+    assert crud.get_cached_categories_by_ids_json(db, [category["id"]])[0] == new_version
+
+    response = client.get("/api/categories/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [c["name"] for c in response.json()] == ["Mercado", "Lazer"]
+    assert category_cache.stats()["generation"] > 0
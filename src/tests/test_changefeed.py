@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+import asyncio
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import changefeed, crud, database, models, schemas
+
+
+def _transactions_url(user_id: int) -> str:
+    return f"/api/users/{user_id}/transactions/"
+
+
+@pytest.fixture
+def feed(client, monkeypatch):
+    monkeypatch.setattr(changefeed, "CHANGE_FEED_ENABLED", True)
+
+
+def _types(db, owner_id: int, after: int = 0):
+    return [event.type for event in changefeed.get_events(db, owner_id, after)]
+
+
+### ============ Gravação ============ ###
+
+def test_writes_record_events_in_commit_order(feed, client, db, user, category):
+    created = client.post(_transactions_url(user["id"]), json={"description": "x", "amount": 1, "category_id": category["id"]}).json()
+    client.patch(_transactions_url(user["id"]) + f"{created['id']}/", json={"amount": 5})
+    client.delete(_transactions_url(user["id"]) + f"{created['id']}/")
+    client.post(_transactions_url(user["id"]) + "bulk", json=[{"description": "y", "amount": 2, "category_id": category["id"]}])
+
+    events = changefeed.get_events(db, user["id"], 0)
+    assert [event.type for event in events] == ["created", "updated", "deleted", "reload"]
+    assert [event.id for event in events] == sorted(event.id for event in events)
+    assert events[1].data["amount"] == 5
+    assert events[2].data["id"] == created["id"]
+
+
+def test_nothing_is_recorded_when_disabled(client, db, user, category):
+    client.post(_transactions_url(user["id"]), json={"description": "x", "amount": 1, "category_id": category["id"]})
+    assert _types(db, user["id"]) == []
+
+
+def test_failed_write_records_nothing(feed, client, db, user):
+    assert client.post(_transactions_url(user["id"]), json={"description": "x", "amount": 1, "category_id": 999}).status_code == 404
+    assert _types(db, user["id"]) == []
+
+
+### ============ Posição inicial e limpeza ============ ###
+
+def test_start_position_resumes_or_asks_for_a_reload(feed, client, db, user, category):
+    for n in range(3):
+        client.post(_transactions_url(user["id"]), json={"description": f"t{n}", "amount": n, "category_id": category["id"]})
+    ids = [event.id for event in changefeed.get_events(db, user["id"], 0)]
+
+    assert changefeed.start_position(db, user["id"], None) == (ids[-1], "ready")
+    assert changefeed.start_position(db, user["id"], ids[0]) == (ids[0], None)
+    assert [event.id for event in changefeed.get_events(db, user["id"], ids[0])] == ids[1:]
+
+    #? Depois da limpeza, um token anterior aos eventos apagados recebe 'reset'
+    db.execute(models.TransactionEvent.__table__.update().where(models.TransactionEvent.id <= ids[1]).values(created_at=datetime(2000, 1, 1)))
+    db.commit()
+    assert changefeed.prune(db, datetime.now() - timedelta(hours=1)) == 2
+    assert changefeed.start_position(db, user["id"], ids[0]) == (ids[-1], "reset")
+    assert changefeed.start_position(db, user["id"], ids[1]) == (ids[1], None)
+
+
+### ============ Server-Sent Events ============ ###
+
+def test_stream_sends_ready_then_the_new_event(feed, user, category):
+    def create():
+        with database.SessionLocal() as db:
+            transaction = schemas.TransactionCreate(description="live", amount=3, category_id=category["id"])
+            return crud.create_transaction(db, transaction=transaction, owner_id=user["id"])
+
+    async def scenario():
+        stream = changefeed.stream_events(database.SessionLocal, user["id"], None)
+        try:
+            ready = await asyncio.wait_for(stream.__anext__(), 5)
+            waiting = asyncio.ensure_future(stream.__anext__()) # Fica esperando o aviso do broker
+            await asyncio.sleep(0.05)
+            created = await asyncio.to_thread(create)
+            return ready, await asyncio.wait_for(waiting, 5), created
+        finally:
+            await stream.aclose()
+
+    ready, message, created = asyncio.run(scenario())
+    assert ready.startswith(b"id: ") and b"event: ready\n" in ready
+    head, data = message.split(b"data: ")
+    assert b"event: created\n" in head
+    assert orjson.loads(data)["id"] == created.id
+    assert changefeed.broker.stats() == {"users": 0, "connections": 0}
+
+
+def test_endpoint_rejects_bad_tokens_and_unknown_users(client, user):
+    app = FastAPI()
+    app.include_router(changefeed.router)
+    with TestClient(app) as feed_client:
+        response = feed_client.get(_transactions_url(user["id"]) + "events", headers={"Last-Event-ID": "abc"})
+        assert (response.status_code, response.json()) == (400, {"detail": "Invalid event id"})
+
+        response = feed_client.get(_transactions_url(999) + "events")
+        assert (response.status_code, response.json()) == (404, {"detail": "User not found"})
@@ -0,0 +1,70 @@
+def _transactions_url(user_id: int) -> str:
+    return f"/api/users/{user_id}/transactions/"
+
+
+def _create(client, user_id: int, category_id: int, description: str = "x"):
+    response = client.post(_transactions_url(user_id), json={"description": description, "amount": 1, "category_id": category_id})
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+### ============ Listagem de transações ============ ###
+
+def test_unchanged_list_answers_304_without_body(client, user, category):
+    _create(client, user["id"], category["id"])
+    first = client.get(_transactions_url(user["id"]))
+    etag = first.headers["etag"]
+
+    response = client.get(_transactions_url(user["id"]), headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+    #? Comparação fraca e lista de candidatos, como no HTTP
+    assert client.get(_transactions_url(user["id"]), headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+
+
+def test_write_changes_the_list_etag(client, user, category):
+    created = _create(client, user["id"], category["id"])
+    etag = client.get(_transactions_url(user["id"])).headers["etag"]
+
+    for write in (
+        lambda: _create(client, user["id"], category["id"], "second"),
+        lambda: client.patch(_transactions_url(user["id"]) + f"{created['id']}/", json={"amount": 2}),
+        lambda: client.delete(_transactions_url(user["id"]) + f"{created['id']}/"),
+        lambda: client.patch(f"/api/categories/{category['id']}/", json={"name": "Feira"}), # Aparece no ?expand=category
+    ):
+        write()
+        response = client.get(_transactions_url(user["id"]), headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        etag = response.headers["etag"]
+
+
+def test_other_users_writes_keep_the_etag(client, user, category):
+    other = client.post("/api/users/", json={"name": "Bia", "email": "bia@example.com"}).json()
+    etag = client.get(_transactions_url(user["id"])).headers["etag"]
+
+    _create(client, other["id"], category["id"])
+    assert client.get(_transactions_url(user["id"]), headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_etag_depends_on_the_query(client, user, category):
+    _create(client, user["id"], category["id"])
+    etag = client.get(_transactions_url(user["id"])).headers["etag"]
+
+    response = client.get(_transactions_url(user["id"]), params={"limit": 1}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+### ============ Categorias ============ ###
+
+def test_categories_answer_304_until_they_change(client, category):
+    etag = client.get("/api/categories/").headers["etag"]
+    assert client.get("/api/categories/", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post("/api/categories/", json={"name": "Lazer"})
+    response = client.get("/api/categories/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [c["name"] for c in response.json()] == ["Mercado", "Lazer"]
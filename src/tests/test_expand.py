@@ -0,0 +1,82 @@
+import pytest
+
+from app import crud
+from app.main import app
+
+
+def _transactions_url(user_id: int) -> str:
+    return f"/api/users/{user_id}/transactions/"
+
+
+@pytest.fixture
+def transaction(client, user, category):
+    response = client.post(_transactions_url(user["id"]), json={"description": "feira", "amount": 10, "category_id": category["id"]})
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+### ============ ?expand=category,owner ============ ###
+
+def test_expand_embeds_category_and_owner(client, user, category, transaction):
+    expanded = {**transaction, "category": category, "owner": user}
+
+    assert client.get(_transactions_url(user["id"]), params={"expand": "category,owner"}).json() == [expanded]
+    assert client.get(_transactions_url(user["id"]), params={"expand": "owner, category", "limit": 10}).json() == [expanded]
+    assert client.get(_transactions_url(user["id"]) + f"{transaction['id']}/", params={"expand": "category,owner"}).json() == expanded
+    search = client.get(_transactions_url(user["id"]) + "search", params={"q": "feira", "expand": "category,owner"})
+    assert search.json() == [expanded]
+
+
+def test_expand_only_embeds_what_was_asked(client, user, category, transaction):
+    assert client.get(_transactions_url(user["id"]), params={"expand": "category"}).json() == [{**transaction, "category": category}]
+    # Sem expand, a resposta continua a mesma de antes (sem as chaves 'category'/'owner')
+    assert client.get(_transactions_url(user["id"])).json() == [transaction]
+    assert client.get(_transactions_url(user["id"]) + f"{transaction['id']}/").json() == transaction
+
+
+@pytest.mark.parametrize("path", ["", "search", "{transaction_id}/"])
+def test_unknown_expand_is_400(client, user, transaction, path):
+    url = _transactions_url(user["id"]) + path.format(transaction_id=transaction["id"])
+    response = client.get(url, params={"expand": "category,bogus"})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Cannot expand: bogus"}
+
+
+def test_openapi_describes_the_embedded_objects():
+    schema = app.openapi()
+    expanded = schema["components"]["schemas"]["TransactionExpandedSchema"]["properties"]
+    assert "CategorySchema" in str(expanded["category"]) and "UserSchema" in str(expanded["owner"])
+
+    paths = schema["paths"]
+    for path in ("/api/users/{user_id}/transactions/", "/api/users/{user_id}/transactions/search", "/api/users/{user_id}/transactions/{transaction_id}/"):
+        assert "TransactionExpandedSchema" in str(paths[path]["get"]["responses"]["200"]), path
+
+
+### ============ ?ids= ============ ###
+
+@pytest.mark.parametrize("url", ["/api/users/", "/api/categories/"])
+def test_ids_returns_only_the_existing_ones(client, user, category, url):
+    existing = user if url == "/api/users/" else category
+    response = client.get(url, params={"ids": f"999, {existing['id']},{existing['id']}"})
+    assert response.status_code == 200
+    assert response.json() == [existing]
+
+
+@pytest.mark.parametrize("url", ["/api/users/", "/api/categories/"])
+@pytest.mark.parametrize("ids, detail", [
+    ("", "Invalid ids"),
+    (" , ", "Invalid ids"),
+    ("1,a", "Invalid ids"),
+    ("1.5", "Invalid ids"),
+    (",".join(str(n) for n in range(1, crud.MAX_IDS + 2)), f"At most {crud.MAX_IDS} ids per request"),
+])
+def test_invalid_ids_are_400(client, url, ids, detail):
+    response = client.get(url, params={"ids": ids})
+    assert response.status_code == 400
+    assert response.json() == {"detail": detail}
+
+
+def test_max_ids_is_accepted(client, user):
+    response = client.get("/api/users/", params={"ids": ",".join(str(n) for n in range(1, crud.MAX_IDS + 1))})
+    assert response.status_code == 200
+    assert response.json() == [user]
@@ -0,0 +1,92 @@
+from datetime import datetime
+import csv
+import io
+
+import pytest
+
+from app import main
+
+#? pyarrow é opcional no app, mas os testes leem os arquivos Arrow/Parquet com ele
+pa = pytest.importorskip("pyarrow")
+pytest.importorskip("pyarrow.ipc")
+pq = pytest.importorskip("pyarrow.parquet")
+
+COLUMNS = ["id", "description", "amount", "created_at", "owner_id", "category_id"]
+ARROW_TYPES = [pa.int64(), pa.string(), pa.float64(), pa.timestamp("us"), pa.int64(), pa.int64()]
+
+
+def _read(export_format: str, body: bytes):
+    if export_format == "csv":
+        rows = list(csv.reader(io.StringIO(body.decode())))
+        return rows[0], None, [dict(zip(rows[0], row)) for row in rows[1:]]
+    if export_format == "arrow":
+        table = pa.ipc.open_stream(body).read_all()
+    else:
+        table = pq.read_table(pa.BufferReader(body))
+    return table.column_names, table.schema.types, table.to_pylist()
+
+
+@pytest.fixture
+def transactions(client, user, category):
+    items = [
+        {"description": "jan, com vírgula", "amount": 1.5, "category_id": category["id"], "created_at": "2026-01-31T23:59:59"},
+        {"description": 'fev "aspas"', "amount": 2, "category_id": category["id"], "created_at": "2026-02-01T00:00:00"},
+        {"description": "mar", "amount": 3.25, "category_id": category["id"], "created_at": "2026-03-15T12:30:00"},
+    ]
+    response = client.post(f"/api/users/{user['id']}/transactions/bulk", json=items)
+    assert response.status_code == 201, response.text
+    return client.get(f"/api/users/{user['id']}/transactions/").json()
+
+
+@pytest.mark.parametrize("export_format, media_type, extension", [
+    ("csv", "text/csv", "csv"),
+    ("arrow", "application/vnd.apache.arrow.stream", "arrows"),
+    ("parquet", "application/vnd.apache.parquet", "parquet"),
+])
+def test_export_round_trips_every_column(client, monkeypatch, user, transactions, export_format, media_type, extension):
+    monkeypatch.setattr(main, "EXPORT_BATCH_SIZE", 2) # Mais de um lote (row groups / record batches)
+
+    response = client.get(f"/api/users/{user['id']}/transactions/export", params={"format": export_format})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(media_type)
+    assert response.headers["content-disposition"] == f'attachment; filename="transactions-user-{user["id"]}.{extension}"'
+
+    names, types, rows = _read(export_format, response.content)
+    assert names == COLUMNS
+    if export_format == "csv":
+        expected = [{**t, **{k: str(t[k]) for k in ("id", "amount", "owner_id", "category_id")}} for t in transactions]
+        assert rows == expected
+    else:
+        assert types == ARROW_TYPES
+        assert rows == [{**t, "created_at": datetime.fromisoformat(t["created_at"])} for t in transactions]
+
+
+@pytest.mark.parametrize("export_format", ["csv", "arrow", "parquet"])
+def test_export_filters_by_period(client, user, transactions, export_format):
+    #? 'to' inclui o dia inteiro: a transação de 31/01 às 23:59:59 entra
+    params = {"format": export_format, "from": "2026-01-31", "to": "2026-02-01"}
+    response = client.get("/api/transactions/export", params=params)
+    assert response.status_code == 200
+    assert response.headers["content-disposition"].startswith('attachment; filename="transactions.')
+
+    _, _, rows = _read(export_format, response.content)
+    assert [row["description"] for row in rows] == ["jan, com vírgula", 'fev "aspas"']
+
+
+@pytest.mark.parametrize("export_format", ["csv", "arrow", "parquet"])
+def test_export_of_an_empty_period_is_a_valid_empty_file(client, user, transactions, export_format):
+    response = client.get(f"/api/users/{user['id']}/transactions/export", params={"format": export_format, "from": "2030-01-01"})
+    assert response.status_code == 200
+
+    names, types, rows = _read(export_format, response.content)
+    assert names == COLUMNS
+    assert rows == []
+    if export_format != "csv":
+        assert types == ARROW_TYPES
+
+
+def test_export_rejects_an_unknown_format(client, user):
+    for url in (f"/api/users/{user['id']}/transactions/export", "/api/transactions/export"):
+        response = client.get(url, params={"format": "xlsx"})
+        assert response.status_code == 400
+        assert "xlsx" in response.json()["detail"]
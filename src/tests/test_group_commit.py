@@ -0,0 +1,72 @@
+from concurrent.futures import wait
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import crud, database, group_commit, schemas
+
+
+def _transaction(category_id: int, description: str = "x", amount: float = 1) -> schemas.TransactionCreate:
+    return schemas.TransactionCreate(description=description, amount=amount, category_id=category_id)
+
+
+@pytest.fixture
+def queue(client):
+    queue = group_commit.GroupCommitQueue(database.SessionLocal, max_batch=100, max_wait=0.2)
+    yield queue
+    queue.stop()
+
+
+def test_requests_that_arrive_together_share_one_commit(queue, user, category):
+    futures = [queue.submit(_transaction(category["id"], f"t{n}", n), owner_id=user["id"]) for n in range(10)]
+    wait(futures, timeout=5)
+
+    created = [future.result() for future in futures]
+    assert [row.description for row in created] == [f"t{n}" for n in range(10)]
+    assert len({row.id for row in created}) == 10
+
+    stats = queue.stats()
+    assert stats["items"] == 10
+    assert stats["batches"] <= 2 # Todas chegaram dentro do max_wait do primeiro item
+
+
+def test_each_request_gets_its_own_error(queue, user, category):
+    ok = queue.submit(_transaction(category["id"], "ok"), owner_id=user["id"])
+    bad_category = queue.submit(_transaction(999, "bad"), owner_id=user["id"])
+    bad_user = queue.submit(_transaction(category["id"], "nobody"), owner_id=999)
+
+    assert ok.result(timeout=5).description == "ok"
+    with pytest.raises(crud.ForeignKeyNotFound) as exc:
+        bad_category.result(timeout=5)
+    assert exc.value.resource == "Category"
+    with pytest.raises(crud.ForeignKeyNotFound) as exc:
+        bad_user.result(timeout=5)
+    assert exc.value.resource == "User"
+    assert queue.stats()["errors"] == 2
+
+
+def test_batches_do_not_exceed_max_batch(client, user, category):
+    queue = group_commit.GroupCommitQueue(database.SessionLocal, max_batch=3, max_wait=0.2)
+    try:
+        futures = [queue.submit(_transaction(category["id"]), owner_id=user["id"]) for _ in range(7)]
+        wait(futures, timeout=5)
+        assert all(future.exception() is None for future in futures)
+    finally:
+        queue.stop()
+    assert queue.stats()["batches"] >= 3
+
+
+def test_endpoint_keeps_the_create_contract(queue, monkeypatch, user, category):
+    monkeypatch.setattr(group_commit, "queue", queue)
+    app = FastAPI()
+    app.include_router(group_commit.router)
+    with TestClient(app) as client:
+        url = f"/api/users/{user['id']}/transactions/"
+        response = client.post(url, json={"description": "x", "amount": 2, "category_id": category["id"]})
+        assert response.status_code == 201
+        assert response.json()["description"] == "x"
+
+        response = client.post(url, json={"description": "x", "amount": 2, "category_id": 999})
+        assert response.status_code == 404
+        assert response.json() == {"detail": "Category not found"}
@@ -0,0 +1,93 @@
+from pathlib import Path
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+
+from app import database, health
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def startup_state(client, monkeypatch):
+    """Estado de inicialização novo, como o de um worker que acabou de subir (antes do aquecimento)."""
+    state = health.StartupState(lifespan_started=1.0, serving=2.0)
+    monkeypatch.setattr(health, "state", state)
+    return state
+
+
+def _warm_up(client, connections: int = 1):
+    #? No loop do app (portal do TestClient), como no lifespan: no modo assíncrono as conexões do aiosqlite ficam nesse loop
+    client.portal.call(health.warm_up, connections)
+
+
+def test_ready_is_503_until_the_warm_up_finishes(client, startup_state):
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "warming_up"
+    assert client.get("/health/live").status_code == 200
+
+    _warm_up(client)
+
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+    assert response.json()["warmup_error"] is None
+    assert "worker_ready 1" in client.get("/metrics").text
+
+
+def test_ready_is_503_when_the_database_is_down(client, startup_state, monkeypatch, tmp_path):
+    _warm_up(client)
+    assert client.get("/health/ready").status_code == 200
+
+    #? Um arquivo SQLite em uma pasta que não existe: toda conexão falha
+    unreachable = create_engine(f"sqlite:///{tmp_path / 'missing' / 'down.db'}")
+    monkeypatch.setattr(database, "engine", unreachable)
+
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "database_unavailable"
+
+
+def test_failed_warm_up_still_marks_the_worker_ready(client, startup_state, monkeypatch):
+    #? Deliberado: o aquecimento só adianta conexões e SQL compilado. Se ele falhar (ex.: o banco
+    #? demorou a subir), o worker entra em serviço mesmo assim e o erro fica em warmup_error;
+    #? quem decide se o banco responde é o SELECT 1 feito a cada /health/ready.
+    def fail(db):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(health, "HOT_STATEMENTS", [fail])
+    _warm_up(client)
+
+    assert startup_state.ready
+    assert startup_state.warmup_error == "boom"
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json()["warmup_error"] == "boom"
+
+
+def test_importing_the_app_has_no_side_effects(tmp_path):
+    #? Outro processo, sem DATABASE_URL: o import não cria engines, tabelas, arquivos nem threads
+    code = (
+        "import threading\n"
+        "from app.main import app\n"
+        "from app import database\n"
+        "assert not database._initialized\n"
+        "assert 'engine' not in vars(database) and 'read_engine' not in vars(database)\n"
+        "assert threading.active_count() == 1, threading.enumerate()\n"
+        "try:\n"
+        "    database.engine\n"
+        "except RuntimeError as exc:\n"
+        "    assert 'DATABASE_URL' in str(exc)\n"
+        "else:\n"
+        "    raise AssertionError('engine created without DATABASE_URL')\n"
+    )
+    env = {key: value for key, value in os.environ.items() if not key.startswith(("DATABASE_", "ASYNC_DATABASE_"))}
+    env["PYTHONPATH"] = str(SRC_DIR)
+    result = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app import database, metrics
+
+INSERT = text("INSERT INTO transactions (description, amount, owner_id, category_id, created_at) VALUES ('x', 1, :owner, :category, CURRENT_TIMESTAMP)")
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 1.0 # Cada leitura do relógio avança 1 s
+        return self.now
+
+
+def test_failed_statement_does_not_leave_a_start_time_behind(client, user, monkeypatch):
+    monkeypatch.setattr(metrics, "time", SimpleNamespace(perf_counter=_FakeClock()))
+    stats = metrics.RequestStats()
+    token = metrics._current.set(stats)
+    try:
+        with database.engine.connect() as connection:
+            for _ in range(3):
+                with pytest.raises(IntegrityError):
+                    connection.execute(INSERT, {"owner": user["id"], "category": 999})
+                connection.rollback()
+            connection.execute(text("SELECT 1"))
+    finally:
+        metrics._current.reset(token)
+
+    #? Só o SELECT terminou: um início (+1 s) e um fim (+1 s)
+    assert (stats.statements, stats.sql_time) == (1, 1.0)
+
+
+def test_request_stats_count_written_and_returned_rows(client, user, category):
+    stats = metrics.RequestStats()
+    token = metrics._current.set(stats)
+    try:
+        with database.engine.begin() as connection:
+            connection.execute(INSERT, [{"owner": user["id"], "category": category["id"]}] * 3)
+            assert (stats.rows_written, stats.rows_returned) == (3, 0)
+
+            connection.execute(text("SELECT * FROM transactions")).all()
+            #? Em lotes contam só as linhas que o resultado já buscou no cursor (o buffer do
+            #? SQLAlchemy decide quantas), não as 3 da consulta
+            result = connection.execute(text("SELECT * FROM transactions").execution_options(yield_per=2))
+            next(result.partitions())
+            result.close()
+    finally:
+        metrics._current.reset(token)
+
+    assert stats.statements == 3
+    assert stats.rows_written == 3
+    assert 3 < stats.rows_returned < 3 + 3
+
+
+def test_foreign_key_failures_are_measured_and_exposed(client, user):
+    for _ in range(3):
+        assert client.post(f"/api/users/{user['id']}/transactions/", json={"description": "x", "amount": 1, "category_id": 999}).status_code == 404
+    body = client.get("/metrics").text
+    assert 'db_rows_written_per_request_count{method="POST",route="/api/users/{user_id}/transactions/"}' in body
+
+
+def test_rows_returned_per_request_are_exposed(client, user, category):
+    url = f"/api/users/{user['id']}/transactions/"
+    items = [{"description": f"t{n}", "amount": n, "category_id": category["id"]} for n in range(4)]
+    assert client.post(url + "bulk", json=items).status_code == 201
+    labels = 'method="GET",route="/api/users/{user_id}/transactions/stream"'
+
+    def observed():
+        for line in client.get("/metrics").text.splitlines():
+            if line.startswith(f"db_rows_returned_per_request_sum{{{labels}}}"):
+                return float(line.split()[-1])
+        return 0.0
+
+    before = observed()
+    assert len(client.get(url + "stream").text.splitlines()) == 4
+    assert observed() - before >= 4
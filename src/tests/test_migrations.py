@@ -0,0 +1,16 @@
+from alembic import command
+
+from app import partitions
+
+
+def test_autogenerate_keeps_the_objects_created_outside_the_models(alembic_config):
+    command.upgrade(alembic_config, "head")
+    #? Falha se o autogenerate propuser mudanças (ex.: apagar a tabela FTS5 transactions_fts)
+    command.check(alembic_config)
+
+
+def test_partition_tables_are_recognized():
+    assert partitions.is_partition("transactions_y2026m10")
+    assert partitions.is_partition(partitions.DEFAULT_PARTITION)
+    assert not partitions.is_partition("transactions")
+    assert not partitions.is_partition("transaction_rollups")
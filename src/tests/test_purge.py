@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app import crud, models, purge, versions
+
+
+@pytest.fixture
+def jobs(client):
+    """Para o worker do app: os testes chamam claim/run_job direto, sem disputar os jobs com ele."""
+    purge.worker.stop()
+    yield
+    purge.worker.start()
+
+
+def _import(client, user_id: int, category_id: int, count: int, created_at: str = "2026-01-15T10:00:00"):
+    items = [{"description": f"t{n}", "amount": 1, "category_id": category_id, "created_at": created_at} for n in range(count)]
+    response = client.post(f"/api/users/{user_id}/transactions/bulk", json=items)
+    assert response.status_code == 201, response.text
+
+
+def _transactions_of(db, column, resource_id: int) -> int:
+    return db.scalar(select(func.count()).select_from(models.Transaction).where(column == resource_id))
+
+
+def test_batches_delete_the_target_transactions_then_the_target(client, db, jobs, user, category):
+    _import(client, user["id"], category["id"], 5)
+    job = crud.create_purge_job(db, "user", user["id"])
+    assert (job.status, job.total, job.deleted) == ("pending", 5, 0)
+    assert purge.claim(db, job.id)
+
+    #? Cada lote é uma transação curta: o andamento já aparece no banco entre os lotes
+    assert purge.purge_batch(db, job, batch_size=2) == 2
+    assert _transactions_of(db, models.Transaction.owner_id, user["id"]) == 3
+    assert client.get(f"/api/jobs/{job.id}/").json()["deleted"] == 2
+
+    purge.run_job(db, job.id, batch_size=2)
+    db.refresh(job)
+    assert (job.status, job.deleted, job.error) == ("done", 5, None)
+    assert job.finished_at is not None
+    assert db.get(models.User, user["id"]) is None
+    assert client.get(f"/api/users/{user['id']}/").status_code == 404
+
+
+def test_purge_keeps_rollups_and_list_versions_up_to_date(client, db, jobs, user, category):
+    other_user = client.post("/api/users/", json={"name": "Bia", "email": "bia@example.com"}).json()
+    kept = client.post("/api/categories/", json={"name": "Lazer"}).json()
+    _import(client, user["id"], category["id"], 3)
+    _import(client, other_user["id"], category["id"], 2)
+    _import(client, user["id"], kept["id"], 1)
+
+    keys = [versions.user_key(user["id"]), versions.user_key(other_user["id"])]
+    before = versions.get_versions(db, keys)
+    etag = client.get(f"/api/users/{user['id']}/transactions/").headers["etag"]
+
+    job = crud.create_purge_job(db, "category", category["id"])
+    assert purge.claim(db, job.id)
+    purge.run_job(db, job.id, batch_size=2)
+    db.expire_all()
+
+    assert db.get(models.PurgeJob, job.id).status == "done"
+    assert db.get(models.Category, category["id"]) is None
+    # Os dois donos tiveram transações apagadas: as versões (ETags) dos dois mudam
+    after = versions.get_versions(db, keys)
+    assert all(after[key] > before.get(key, 0) for key in keys)
+    assert client.get(f"/api/users/{user['id']}/transactions/", headers={"If-None-Match": etag}).status_code == 200
+
+    # Os resumos ficam só com a categoria que sobrou
+    summary = client.get(f"/api/users/{user['id']}/summary").json()
+    assert [(item["category_id"], item["count"]) for item in summary] == [(kept["id"], 1)]
+    assert client.get(f"/api/users/{other_user['id']}/summary").json() == []
+
+
+def test_failed_job_records_the_error(client, db, jobs, monkeypatch, user, category):
+    _import(client, user["id"], category["id"], 3)
+    job = crud.create_purge_job(db, "user", user["id"])
+    assert purge.claim(db, job.id)
+
+    def fail(db, resource_id):
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(purge._FINISH, "user", fail)
+    purge.run_job(db, job.id, batch_size=2)
+    db.refresh(job)
+
+    assert (job.status, job.error) == ("failed", "boom")
+    assert job.finished_at is not None
+    #? Os lotes já gravados continuam apagados; só a exclusão final não aconteceu
+    assert (job.deleted, _transactions_of(db, models.Transaction.owner_id, user["id"])) == (3, 0)
+    assert db.get(models.User, user["id"]) is not None
+    # Um job que falhou não volta para a fila sozinho
+    assert not purge.claim(db, job.id)
+    assert job.id not in purge.claimable_jobs(db)
+
+
+def test_only_pending_or_stale_running_jobs_can_be_claimed(client, db, jobs, user, category):
+    _import(client, user["id"], category["id"], 2)
+    job = crud.create_purge_job(db, "user", user["id"])
+
+    assert purge.claim(db, job.id)
+    # Já está com outro worker (running e atualizado agora)
+    assert not purge.claim(db, job.id)
+    assert job.id not in purge.claimable_jobs(db)
+
+    # O processo caiu no meio (depois de um lote): o job parado há mais de PURGE_STALE_SECONDS volta para a fila
+    assert purge.purge_batch(db, job, batch_size=1) == 1
+    job.updated_at = datetime.now() - timedelta(seconds=purge.PURGE_STALE_SECONDS + 1)
+    db.commit()
+    assert purge.claimable_jobs(db) == [job.id]
+    assert purge.claim(db, job.id)
+    assert not purge.claim(db, job.id)
+
+    # ... e é retomado de onde parou
+    purge.run_job(db, job.id)
+    db.refresh(job)
+    assert (job.status, job.deleted) == ("done", 2)
+    assert not purge.claim(db, job.id)
@@ -0,0 +1,109 @@
+from contextlib import closing
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import database
+
+COOKIE = database.READ_PRIMARY_COOKIE
+
+
+@pytest.fixture
+def replica(client, tmp_path, monkeypatch):
+    """Réplica em um segundo arquivo SQLite. 'replicate()' copia o primário para ela,
+    como a replicação faria; fora disso os dois bancos divergem."""
+    primary_path = make_url(database.DATABASE_URL).database
+    replica_path = tmp_path / "replica.db"
+    read_engine = create_engine(f"sqlite:///{replica_path}")
+    async_read_engine = create_async_engine(f"sqlite+aiosqlite:///{replica_path}") if database.DATABASE_ASYNC else None
+
+    def replicate():
+        read_engine.dispose()
+        with closing(sqlite3.connect(primary_path)) as source, closing(sqlite3.connect(replica_path)) as target:
+            source.backup(target)
+
+    replicate()
+    monkeypatch.setattr(database, "read_engine", read_engine)
+    monkeypatch.setattr(database, "_recent_writes", {})
+    database.ReadSessionLocal.configure(bind=read_engine)
+    if async_read_engine is not None:
+        monkeypatch.setattr(database, "async_read_engine", async_read_engine)
+        database.AsyncReadSessionLocal.configure(bind=async_read_engine)
+    try:
+        yield replicate
+    finally:
+        database.ReadSessionLocal.configure(bind=database.engine)
+        read_engine.dispose()
+        if async_read_engine is not None:
+            database.AsyncReadSessionLocal.configure(bind=database.async_engine)
+            async_read_engine.sync_engine.dispose()
+
+
+def _insert_on_replica_only(replica_path, user_id: int, category_id: int):
+    with closing(sqlite3.connect(replica_path)) as connection, connection:
+        connection.execute(
+            "INSERT INTO transactions (description, amount, owner_id, category_id, created_at) VALUES ('só na réplica', 1, ?, ?, '2026-01-01 00:00:00')",
+            (user_id, category_id),
+        )
+
+
+def _descriptions(client, user_id: int):
+    response = client.get(f"/api/users/{user_id}/transactions/")
+    assert response.status_code == 200
+    return [t["description"] for t in response.json()]
+
+
+def test_reads_go_to_the_replica_until_the_client_or_the_user_writes(client, tmp_path, user, category, replica):
+    other = client.post("/api/users/", json={"name": "Bia", "email": "bia@example.com"}).json()
+    client.cookies.clear()
+    replica()
+    _insert_on_replica_only(tmp_path / "replica.db", user["id"], category["id"])
+    _insert_on_replica_only(tmp_path / "replica.db", other["id"], category["id"])
+
+    # Sem cookie e sem escrita recente: a leitura vem da réplica
+    assert _descriptions(client, user["id"]) == ["só na réplica"]
+
+    # Depois de uma escrita, o cookie manda as leituras deste cliente para o primário
+    response = client.post(f"/api/users/{user['id']}/transactions/", json={"description": "nova", "amount": 2, "category_id": category["id"]})
+    assert response.status_code == 201
+    assert response.cookies.get(COOKIE) == "1"
+    assert _descriptions(client, user["id"]) == ["nova"]
+    assert _descriptions(client, other["id"]) == [] # O cookie vale para qualquer leitura do cliente
+
+    # Outro cliente (sem o cookie) lendo o mesmo usuário: o mapa por user_id manda para o primário
+    client.cookies.clear()
+    assert _descriptions(client, user["id"]) == ["nova"]
+    # ... e só para esse usuário
+    assert _descriptions(client, other["id"]) == ["só na réplica"]
+
+    # Quando o prazo vence, as leituras voltam para a réplica
+    database._recent_writes.clear()
+    assert _descriptions(client, user["id"]) == ["só na réplica"]
+
+
+def test_write_sets_the_read_primary_cookie(client, replica):
+    response = client.post("/api/categories/", json={"name": "Mercado"})
+    assert response.status_code == 201
+    assert response.cookies.get(COOKIE) == "1"
+
+
+def test_read_does_not_set_the_cookie(client, replica):
+    response = client.get("/api/categories/")
+    assert response.status_code == 200
+    assert COOKIE not in response.cookies
+
+
+def test_endpoint_returning_its_own_response_keeps_the_cookie(client, replica, user):
+    #? O 202 do purge é montado pelo próprio endpoint (purge.accepted), fora do Response injetado
+    response = client.delete(f"/api/users/{user['id']}/", params={"mode": "async"})
+    assert response.status_code == 202
+    assert response.cookies.get(COOKIE) == "1"
+
+
+def test_no_cookie_without_a_replica(client):
+    response = client.post("/api/categories/", json={"name": "Mercado"})
+    assert response.status_code == 201
+    assert COOKIE not in response.cookies
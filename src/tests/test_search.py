@@ -0,0 +1,103 @@
+from app import search
+
+
+def _search(client, user_id: int, **params):
+    response = client.get(f"/api/users/{user_id}/transactions/search", params=params)
+    assert response.status_code == 200, response.text
+    return response
+
+
+def _descriptions(client, user_id: int, **params):
+    return sorted(t["description"] for t in _search(client, user_id, **params).json())
+
+
+def _import(client, user_id: int, category_id: int, descriptions):
+    items = [{"description": d, "amount": 1, "category_id": category_id} for d in descriptions]
+    assert client.post(f"/api/users/{user_id}/transactions/bulk", json=items).status_code == 201
+
+
+def test_terms_with_three_or_more_characters_use_the_trigram_index(client, user, category):
+    _import(client, user["id"], category["id"], ["Mercado Central", "SUPERMERCADO", "Farmácia", "merc"])
+
+    #? No SQLite o termo vira um MATCH na tabela FTS5
+    where = str(search.contains("sqlite", user["id"], "merc").compile())
+    assert "transactions_fts MATCH" in where
+
+    assert _descriptions(client, user["id"], q="mercado") == ["Mercado Central", "SUPERMERCADO"]
+    assert _descriptions(client, user["id"], q="MERC") == ["Mercado Central", "SUPERMERCADO", "merc"]
+    assert _descriptions(client, user["id"], q="padaria") == []
+
+
+def test_short_terms_fall_back_to_like(client, user, category):
+    _import(client, user["id"], category["id"], ["Uber", "Luz", "Gás"])
+
+    where = str(search.contains("sqlite", user["id"], "lu").compile())
+    assert "MATCH" not in where and "LIKE" in where.upper()
+
+    assert _descriptions(client, user["id"], q="u") == ["Luz", "Uber"]
+    assert _descriptions(client, user["id"], q="LU") == ["Luz"]
+    assert _descriptions(client, user["id"], q="zz") == []
+
+
+def test_like_wildcards_and_quotes_are_searched_literally(client, user, category):
+    _import(client, user["id"], category["id"], [
+        "50% off", "500 reais", "a_b", "axb", 'Bar "do Zé"', "d'água", "back\\slash",
+    ])
+
+    # Curingas do LIKE (termos curtos, caminho do LIKE)
+    assert _descriptions(client, user["id"], q="%") == ["50% off"]
+    assert _descriptions(client, user["id"], q="_") == ["a_b"]
+    assert _descriptions(client, user["id"], q="\\") == ["back\\slash"]
+    # Os mesmos caracteres com 3+ caracteres (caminho do FTS5)
+    assert _descriptions(client, user["id"], q="50%") == ["50% off"]
+    assert _descriptions(client, user["id"], q="a_b") == ["a_b"]
+    # Aspas não quebram a consulta MATCH nem o LIKE
+    assert _descriptions(client, user["id"], q='"do') == ['Bar "do Zé"']
+    assert _descriptions(client, user["id"], q='"') == ['Bar "do Zé"']
+    assert _descriptions(client, user["id"], q="d'á") == ["d'água"]
+    assert _descriptions(client, user["id"], q="'") == ["d'água"]
+
+
+def test_search_pages_with_the_cursor(client, user, category):
+    _import(client, user["id"], category["id"], [f"mercado {n}" for n in range(5)] + ["farmácia"])
+
+    seen, after = [], None
+    while True:
+        params = {"q": "mercado", "limit": 2, **({"after": after} if after else {})}
+        response = _search(client, user["id"], **params)
+        assert len(response.json()) <= 2
+        seen.extend(response.json())
+        after = response.headers.get("x-next-cursor")
+        if after is None:
+            break
+
+    assert [t["description"] for t in seen] == [f"mercado {n}" for n in range(5)]
+    assert [t["id"] for t in seen] == sorted(t["id"] for t in seen)
+
+    response = client.get(f"/api/users/{user['id']}/transactions/search", params={"q": "mercado", "after": "bogus"})
+    assert response.status_code == 400
+
+
+def test_search_only_sees_the_owner_transactions(client, user, category):
+    #? Ids escolhidos para que a chave de um usuário contenha a do outro como texto ('1' em '<11>')
+    other = None
+    for n in range(12):
+        created = client.post("/api/users/", json={"name": f"U{n}", "email": f"u{n}@example.com"}).json()
+        if str(user["id"]) in str(created["id"]) and created["id"] != user["id"]:
+            other = created
+            break
+    assert other is not None
+
+    _import(client, user["id"], category["id"], ["mercado da Ana", "ub"])
+    _import(client, other["id"], category["id"], ["mercado do outro", "ub outro"])
+
+    assert _descriptions(client, user["id"], q="mercado") == ["mercado da Ana"]
+    assert _descriptions(client, other["id"], q="mercado") == ["mercado do outro"]
+    assert _descriptions(client, user["id"], q="ub") == ["ub"]
+
+    # Trocar a descrição ou o dono atualiza o índice (triggers)
+    ana_id = _search(client, user["id"], q="mercado").json()[0]["id"]
+    patch = client.patch(f"/api/users/{user['id']}/transactions/{ana_id}/", json={"description": "padaria"})
+    assert patch.status_code == 200, patch.text
+    assert _descriptions(client, user["id"], q="mercado") == []
+    assert _descriptions(client, user["id"], q="padaria") == ["padaria"]
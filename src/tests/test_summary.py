@@ -0,0 +1,87 @@
+import sqlite3
+
+from alembic import command
+from sqlalchemy import text
+
+# Resumo calculado do zero a partir das transações, para comparar com a tabela mantida pelas escritas
+FRESH_GROUP_BY = """
+    SELECT owner_id, category_id, date(created_at, 'start of month') AS month, SUM(amount), COUNT(*)
+    FROM transactions GROUP BY owner_id, category_id, month
+"""
+
+
+def _as_dict(rows):
+    return {(owner_id, category_id, str(month)): (round(total, 6), count) for owner_id, category_id, month, total, count in rows if count}
+
+
+def _assert_rollups_match(connection):
+    rollups = connection.execute(text("SELECT owner_id, category_id, month, total_amount, transaction_count FROM transaction_rollups")).all()
+    assert _as_dict(rollups) == _as_dict(connection.execute(text(FRESH_GROUP_BY)).all())
+
+
+def test_writes_keep_rollups_equal_to_a_fresh_group_by(client, db, user, category):
+    other = client.post("/api/categories/", json={"name": "Lazer"}).json()
+    url = f"/api/users/{user['id']}/transactions/"
+
+    created = [client.post(url, json={"description": f"t{n}", "amount": 10 + n, "category_id": category["id"]}).json() for n in range(3)]
+    imported = [
+        {"description": "jan", "amount": 7.5, "category_id": other["id"], "created_at": "2026-01-15T12:00:00"},
+        {"description": "feb", "amount": 2.25, "category_id": category["id"], "created_at": "2026-02-01T00:00:00"},
+    ]
+    assert client.post(url + "bulk", json=imported).status_code == 201
+    _assert_rollups_match(db.connection())
+
+    assert client.patch(url + f"{created[0]['id']}/", json={"amount": 99}).status_code == 200
+    _assert_rollups_match(db.connection())
+
+    assert client.patch(url + f"{created[1]['id']}/", json={"category_id": other["id"]}).status_code == 200
+    _assert_rollups_match(db.connection())
+
+    assert client.patch(url + f"{created[2]['id']}/", json={"description": "renamed"}).status_code == 200
+    assert client.delete(url + f"{created[2]['id']}/").status_code == 204
+    _assert_rollups_match(db.connection())
+
+    summary = client.get(f"/api/users/{user['id']}/summary", params={"group_by": "category"}).json()
+    totals = {item["category_id"]: item["total"] for item in summary}
+    assert totals == {category["id"]: 99 + 2.25, other["id"]: 11 + 7.5}
+
+
+def test_migration_backfills_rollups_of_existing_transactions(alembic_config):
+    config = alembic_config
+    path = config.get_main_option("sqlalchemy.url").removeprefix("sqlite:///")
+
+    #? Um banco que já tinha transações antes dos resumos existirem
+    command.upgrade(config, "0008")
+    with sqlite3.connect(path) as connection:
+        connection.execute("INSERT INTO users (id, name, email) VALUES (1, 'Ana', 'ana@example.com')")
+        connection.execute("INSERT INTO categories (id, name) VALUES (1, 'Mercado'), (2, 'Lazer')")
+        connection.executemany(
+            "INSERT INTO transactions (description, amount, owner_id, category_id, created_at) VALUES (?, ?, 1, ?, ?)",
+            [("a", 1.5, 1, "2026-01-03 10:00:00"), ("b", 2, 1, "2026-01-30 10:00:00"), ("c", 3, 2, "2026-02-01 00:00:00")],
+        )
+
+    command.upgrade(config, "head")
+    with sqlite3.connect(path) as connection:
+        rollups = connection.execute("SELECT owner_id, category_id, month, total_amount, transaction_count FROM transaction_rollups").fetchall()
+        assert _as_dict(rollups) == {(1, 1, "2026-01-01"): (3.5, 2), (1, 2, "2026-02-01"): (3.0, 1)}
+        assert _as_dict(rollups) == _as_dict(connection.execute(FRESH_GROUP_BY).fetchall())
+
+
+def test_summary_period_is_whole_months(client, user, category):
+    url = f"/api/users/{user['id']}/transactions/bulk"
+    imported = [
+        {"description": "jan", "amount": 1, "category_id": category["id"], "created_at": "2026-01-31T23:00:00"},
+        {"description": "feb", "amount": 2, "category_id": category["id"], "created_at": "2026-02-01T00:00:00"},
+        {"description": "mar", "amount": 4, "category_id": category["id"], "created_at": "2026-03-10T00:00:00"},
+    ]
+    assert client.post(url, json=imported).status_code == 201
+
+    summary_url = f"/api/users/{user['id']}/summary"
+    response = client.get(summary_url, params={"group_by": "month", "from": "2026-02-01", "to": "2026-02-28"})
+    assert response.status_code == 200
+    assert [(item["month"], item["total"]) for item in response.json()] == [("2026-02-01", 2)]
+
+    #? Datas no meio do mês seriam alargadas sem aviso para o mês inteiro
+    assert client.get(summary_url, params={"from": "2026-02-15"}).status_code == 400
+    assert client.get(summary_url, params={"to": "2026-02-27"}).status_code == 400
+    assert client.get(summary_url, params={"to": "2024-02-29"}).status_code == 200
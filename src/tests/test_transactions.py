@@ -0,0 +1,181 @@
+from datetime import datetime
+import json
+
+from sqlalchemy import delete
+
+from app import crud, ingest, main, models
+
+
+def _transactions_url(user_id: int) -> str:
+    return f"/api/users/{user_id}/transactions/"
+
+
+# Grava as transações direto no banco, cada uma com o próprio created_at
+def _add_transactions(db, user_id: int, items):
+    db.add_all(models.Transaction(owner_id=user_id, created_at=datetime.fromisoformat(item.pop("created_at")), **item) for item in items)
+    db.commit()
+
+
+### ============ Paginação por cursor ============ ###
+
+def test_cursor_pages_cover_every_transaction_once_in_order(client, db, user, category):
+    #? Várias transações com o mesmo created_at: o id desempata e nenhuma se perde entre páginas
+    items = [
+        {"description": f"t{n}", "amount": n, "category_id": category["id"], "created_at": "2026-01-01T10:00:00" if n < 4 else f"2026-01-0{n - 2}T10:00:00"}
+        for n in range(7)
+    ]
+    _add_transactions(db, user["id"], items)
+
+    seen, after = [], None
+    while True:
+        params = {"limit": 3, **({"after": after} if after else {})}
+        response = client.get(_transactions_url(user["id"]), params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= 3
+        seen.extend(page)
+        after = response.headers.get("x-next-cursor")
+        if after is None:
+            break
+
+    full = client.get(_transactions_url(user["id"])).json()
+    assert len(seen) == 7
+    assert seen == sorted(full, key=lambda t: (t["created_at"], t["id"]))
+
+
+def test_invalid_cursor_is_rejected(client, user):
+    response = client.get(_transactions_url(user["id"]), params={"limit": 2, "after": "not-a-cursor"})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 1, 2, 3, 4, 5, 678)
+    assert crud.decode_cursor(crud.encode_cursor(created_at, 42)) == (created_at, 42)
+
+
+### ============ Streaming NDJSON ============ ###
+
+def test_stream_sends_every_transaction_in_cursor_order(client, db, user, category, monkeypatch):
+    monkeypatch.setattr(main, "STREAM_BATCH_SIZE", 2) # Vários lotes no mesmo corpo
+    items = [
+        {"description": f"ção {n}", "amount": n + 0.5, "category_id": category["id"], "created_at": f"2026-01-0{9 - n}T10:00:00"}
+        for n in range(5)
+    ]
+    _add_transactions(db, user["id"], items)
+
+    response = client.get(_transactions_url(user["id"]) + "stream")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.text.endswith("\n")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    #? Mesmas linhas (e mesmo formato) da listagem, na ordem (created_at, id)
+    full = client.get(_transactions_url(user["id"])).json()
+    assert lines == sorted(full, key=lambda t: (t["created_at"], t["id"]))
+    assert [line["description"] for line in lines] == [f"ção {n}" for n in reversed(range(5))]
+
+
+def test_stream_resumes_after_a_cursor(client, db, user, category):
+    items = [{"description": f"t{n}", "amount": n, "category_id": category["id"], "created_at": f"2026-01-0{n + 1}T10:00:00"} for n in range(4)]
+    _add_transactions(db, user["id"], items)
+    first_page = client.get(_transactions_url(user["id"]), params={"limit": 2})
+
+    response = client.get(_transactions_url(user["id"]) + "stream", params={"after": first_page.headers["x-next-cursor"]})
+    assert [json.loads(line)["description"] for line in response.text.splitlines()] == ["t2", "t3"]
+
+
+def test_stream_rejects_an_invalid_cursor(client, user):
+    response = client.get(_transactions_url(user["id"]) + "stream", params={"after": "nope"})
+    assert (response.status_code, response.json()) == (400, {"detail": "Invalid cursor"})
+
+
+def test_stream_of_user_without_transactions_is_empty(client, user):
+    response = client.get(_transactions_url(user["id"]) + "stream")
+    assert (response.status_code, response.content) == (200, b"")
+
+
+### ============ Importação em lote ============ ###
+
+def test_bulk_reports_rows_with_unknown_category(client, user, category):
+    items = [
+        {"description": "ok", "amount": 1, "category_id": category["id"]},
+        {"description": "bad", "amount": 2, "category_id": 999},
+    ]
+    response = client.post(_transactions_url(user["id"]) + "bulk", json=items)
+    assert response.status_code == 201
+    assert response.json() == {"inserted": 1, "errors": [{"row": 2, "detail": "Category not found"}]}
+
+
+def test_bulk_with_stale_category_cache_keeps_the_row_report(client, db, user, category):
+    other = client.post("/api/categories/", json={"name": "Excluída"}).json()
+    assert client.get("/api/categories/").status_code == 200 # Carrega as duas no cache
+
+    #? Exclusão fora desta API (outro worker): o cache daqui continua com a categoria
+    db.execute(delete(models.Category).where(models.Category.id == other["id"]))
+    db.commit()
+
+    items = [
+        {"description": "ok", "amount": 1, "category_id": category["id"]},
+        {"description": "stale", "amount": 2, "category_id": other["id"]},
+    ]
+    response = client.post(_transactions_url(user["id"]) + "bulk", json=items)
+    assert response.status_code == 201, response.text
+    assert response.json() == {"inserted": 1, "errors": [{"row": 2, "detail": "Category not found"}]}
+    assert [t["description"] for t in client.get(_transactions_url(user["id"])).json()] == ["ok"]
+
+
+def test_bulk_over_the_item_limit_is_413_and_writes_nothing(client, monkeypatch, user, category):
+    monkeypatch.setattr(ingest, "BULK_MAX_ITEMS", 2)
+    url = _transactions_url(user["id"]) + "bulk"
+
+    items = [{"description": f"t{n}", "amount": n, "category_id": category["id"]} for n in range(3)]
+    response = client.post(url, json=items)
+    assert response.status_code == 413
+    assert response.json() == {"detail": "At most 2 transactions per import"}
+
+    csv_body = "description,amount,category_id\n" + "".join(f"t{n},{n},{category['id']}\n" for n in range(3))
+    assert client.post(url, content=csv_body, headers={"content-type": "text/csv"}).status_code == 413
+    assert client.get(_transactions_url(user["id"])).json() == []
+
+    assert client.post(url, json=items[:2]).json() == {"inserted": 2, "errors": []}
+
+
+### ============ Chaves estrangeiras ============ ###
+
+def test_create_with_unknown_category_is_404(client, user):
+    response = client.post(_transactions_url(user["id"]), json={"description": "x", "amount": 1, "category_id": 999})
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Category not found"}
+
+
+def test_create_for_unknown_user_is_404(client, category):
+    response = client.post(_transactions_url(999), json={"description": "x", "amount": 1, "category_id": category["id"]})
+    assert response.status_code == 404
+    assert response.json() == {"detail": "User not found"}
+
+
+def test_create_for_unknown_user_and_category_reports_the_user(client):
+    response = client.post(_transactions_url(999), json={"description": "x", "amount": 1, "category_id": 999})
+    assert response.status_code == 404
+    assert response.json() == {"detail": "User not found"}
+
+
+def test_patch_with_unknown_category_is_404_and_keeps_the_row(client, user, category):
+    created = client.post(_transactions_url(user["id"]), json={"description": "x", "amount": 1, "category_id": category["id"]}).json()
+
+    response = client.patch(_transactions_url(user["id"]) + f"{created['id']}/", json={"amount": 5, "category_id": 999})
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Category not found"}
+
+    row = client.get(_transactions_url(user["id"]) + f"{created['id']}/").json()
+    assert (row["amount"], row["category_id"]) == (1, category["id"])
+
+
+def test_patch_for_unknown_user_is_404(client, user, category):
+    created = client.post(_transactions_url(user["id"]), json={"description": "x", "amount": 1, "category_id": category["id"]}).json()
+
+    #? O UPDATE filtra pelo dono: com outro usuário nenhuma linha é alterada
+    response = client.patch(_transactions_url(999) + f"{created['id']}/", json={"category_id": 999})
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Transaction not found or does not belong to the user."}